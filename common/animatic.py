@@ -0,0 +1,173 @@
+import os
+import re
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from common.logger import init_logger
+from common.tracing import get_tracer
+
+logger = init_logger()
+
+DEFAULT_SCENE_SECONDS = 1.0
+FORMAT_MP4 = 'mp4'
+FORMAT_GIF = 'gif'
+
+
+def scene_seconds(scene, default=DEFAULT_SCENE_SECONDS):
+    """씬 길이 문자열('1초', '2.5초', '3s' 등) → 초"""
+    match = re.search(r'\d+(?:\.\d+)?', str(scene.get('duration', '')))
+    return float(match.group()) if match else default
+
+
+def resolve_image_path(image_info):
+    """generated_images 값(경로 또는 {'image_path'|'error': ...}) → 이미지 경로"""
+    if isinstance(image_info, dict):
+        image_info = image_info.get('image_path')
+    if isinstance(image_info, (str, os.PathLike)) and os.path.exists(image_info):
+        return image_info
+    return None
+
+
+class CrossfadeBlender:
+    """두 프레임 사이 전환 프레임을 uint16 정수 연산으로 계산 (버퍼를 재사용해 전환 길이와 무관한 메모리 사용)
+
+    가중치를 7비트(0~128)로 두면 255 * 128 이 uint16 범위 안에 들어가 float/int32보다 메모리 대역폭이 절반이다.
+    """
+
+    def __init__(self, shape):
+        self._a = np.empty(shape, np.uint16)
+        self._b = np.empty(shape, np.uint16)
+        self._work = np.empty(shape, np.uint16)
+        self._tmp = np.empty(shape, np.uint16)
+        self._out = np.empty(shape, np.uint8)
+
+    def frames(self, a, b, count):
+        """a → b 전환 프레임 count개 (반환된 배열은 다음 프레임 계산 시 덮어씀)"""
+        np.copyto(self._a, a)
+        np.copyto(self._b, b)
+        for i in range(1, count + 1):
+            weight = round(128 * i / (count + 1))
+            np.multiply(self._a, 128 - weight, out=self._work)
+            np.multiply(self._b, weight, out=self._tmp)
+            self._work += self._tmp
+            self._work >>= 7
+            np.copyto(self._out, self._work, casting='unsafe')
+            yield self._out
+
+
+class AnimaticExporter:
+    """씬 이미지와 씬 길이로 animatic(MP4/GIF) 생성
+
+    MP4는 프레임을 한 장씩 ffmpeg 파이프로 보내므로 스토리보드 길이와 관계없이 메모리가 일정하다.
+    GIF는 인코더가 닫힐 때 한 번에 기록하는 형식이라, 정지 구간은 긴 표시 시간을 가진 프레임 하나로 쓰고
+    전환 구간만 프레임을 추가해 보관량을 최소화한다.
+    """
+
+    def __init__(self, width=1920, height=1080, fps=24, crossfade_seconds=0.5, gif_width=480, gif_fps=10):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.crossfade_seconds = crossfade_seconds
+        self.gif_width = gif_width
+        self.gif_fps = gif_fps
+
+    @classmethod
+    def from_env(cls):
+        """ANIMATIC_* 환경 변수로 설정 생성"""
+        return cls(
+            width=int(os.getenv('ANIMATIC_WIDTH', 1920)),
+            height=int(os.getenv('ANIMATIC_HEIGHT', 1080)),
+            fps=int(os.getenv('ANIMATIC_FPS', 24)),
+            crossfade_seconds=float(os.getenv('ANIMATIC_CROSSFADE_SECONDS', 0.5)),
+        )
+
+    def load_frame(self, image_path, size):
+        """이미지를 비율을 유지한 채 출력 크기에 맞춰 레터박스 처리 (이미지가 없으면 검은 화면)"""
+        if image_path is None:
+            return np.zeros((size[1], size[0], 3), np.uint8)
+        with Image.open(image_path) as image:
+            return np.asarray(ImageOps.pad(image.convert('RGB'), size, method=Image.BILINEAR, color=(0, 0, 0)))
+
+    def timeline(self, scenes, images, fps):
+        """[(이미지 경로, 프레임 수)] (씬 길이는 최소 1프레임)"""
+        return [(resolve_image_path(images.get(i)), max(1, round(scene_seconds(scene) * fps)))
+                for i, scene in enumerate(scenes, 1)]
+
+    def iter_segments(self, scenes, images, fps, size):
+        """(프레임, 반복 횟수) 단위로 animatic 전체를 순서대로 생성
+
+        씬마다 이미지를 한 장만 읽고, 다음 씬 이미지는 전환이 필요할 때만 미리 읽는다.
+        전환 구간은 앞 씬 길이의 끝부분을 사용하므로 전체 길이는 씬 길이의 합과 같다.
+        """
+        timeline = self.timeline(scenes, images, fps)
+        blender = CrossfadeBlender((size[1], size[0], 3))
+        fade = round(self.crossfade_seconds * fps)
+        current = None
+        for index, (image_path, frame_count) in enumerate(timeline):
+            current = self.load_frame(image_path, size) if current is None else current
+            following = None
+            fade_count = 0
+            if fade and index + 1 < len(timeline):
+                fade_count = min(fade, frame_count // 2, timeline[index + 1][1] // 2)
+                if fade_count:
+                    following = self.load_frame(timeline[index + 1][0], size)
+
+            yield index + 1, current, frame_count - fade_count
+            if fade_count:
+                for frame in blender.frames(current, following, fade_count):
+                    yield index + 1, frame, 1
+            current = following
+
+    def export(self, scenes, images, output_path, on_scene=None):
+        """animatic 파일 생성 후 경로 반환 (확장자로 MP4/GIF 결정, on_scene(씬 번호, 전체 씬 수) 진행 알림)"""
+        output_format = FORMAT_GIF if output_path.lower().endswith('.gif') else FORMAT_MP4
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with get_tracer().span('job.animatic', stage='animatic', output_format=output_format,
+                               scene_count=len(scenes)) as span:
+            if output_format == FORMAT_GIF:
+                frames = self._write_gif(scenes, images, output_path, on_scene)
+            else:
+                frames = self._write_mp4(scenes, images, output_path, on_scene)
+            span.set_attributes(frames=frames, bytes_written=os.path.getsize(output_path))
+        logger.info(f"animatic 저장: {output_path} ({frames}프레임)")
+        return output_path
+
+    def _notify(self, on_scene, scene_number, total, last):
+        if on_scene and scene_number != last:
+            on_scene(scene_number, total)
+        return scene_number
+
+    def _write_mp4(self, scenes, images, output_path, on_scene):
+        import imageio.v2 as imageio
+        try:
+            writer = imageio.get_writer(output_path, format='FFMPEG', mode='I', fps=self.fps, codec='libx264',
+                                        quality=7, pixelformat='yuv420p', macro_block_size=8,
+                                        ffmpeg_params=['-preset', 'veryfast', '-tune', 'stillimage'])
+        except (ImportError, ValueError) as e:
+            raise RuntimeError(f"MP4 저장에는 imageio-ffmpeg가 필요합니다 (GIF로 저장 가능): {e}") from e
+
+        frames = 0
+        last = None
+        with writer:
+            for scene_number, frame, repeat in self.iter_segments(scenes, images, self.fps,
+                                                                  (self.width, self.height)):
+                last = self._notify(on_scene, scene_number, len(scenes), last)
+                for _ in range(repeat):
+                    writer.append_data(frame)
+                frames += repeat
+        return frames
+
+    def _write_gif(self, scenes, images, output_path, on_scene):
+        import imageio.v3 as iio
+        size = (self.gif_width, round(self.gif_width * self.height / self.width))
+        frame_ms = 1000 / self.gif_fps
+        durations = []
+        last = None
+        with iio.imopen(output_path, 'w', plugin='pillow') as file:
+            for scene_number, frame, repeat in self.iter_segments(scenes, images, self.gif_fps, size):
+                last = self._notify(on_scene, scene_number, len(scenes), last)
+                # 정지 구간은 표시 시간만 늘린 프레임 하나로 기록
+                durations.append(round(frame_ms * repeat))
+                file.write(frame, is_batch=False, duration=list(durations), loop=0)
+        return len(durations)
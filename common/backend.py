@@ -0,0 +1,601 @@
+import os
+import io
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+from google import genai
+from google.genai import types, errors
+
+from common.logger import init_logger
+
+logger = init_logger()
+
+# GEMINI_BACKEND 값
+BACKEND_LIVE = 'live'
+BACKEND_RECORD = 'record'
+BACKEND_REPLAY = 'replay'
+BACKEND_SYNTHETIC = 'synthetic'
+
+DEFAULT_CASSETTE_DIR = './cassettes'
+
+
+class CassetteMissError(KeyError):
+    """replay 모드에서 기록되지 않은 요청"""
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read_upload(file):
+    """files.upload 인자(경로 또는 파일 객체)의 바이트"""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            return f.read()
+    position = file.tell()
+    data = file.read()
+    file.seek(position)
+    return data
+
+
+def _guess_mime_type(data):
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+class _RequestKeys:
+    """요청 내용을 정규화하여 결정적인 cassette 키 생성"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file_hashes = {}  # {업로드된 파일 name: 내용 해시}
+
+    def register_file(self, name, content_hash):
+        with self._lock:
+            self._file_hashes[name] = content_hash
+
+    def normalize(self, value):
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        if isinstance(value, (bytes, bytearray)):
+            return f"sha256:{_sha256(bytes(value))}"
+        if isinstance(value, types.File):
+            with self._lock:
+                return f"file:{self._file_hashes.get(value.name, value.name)}"
+        if isinstance(value, dict):
+            return {str(k): self.normalize(v) for k, v in sorted(value.items(), key=lambda x: str(x[0]))}
+        if isinstance(value, (list, tuple)):
+            return [self.normalize(v) for v in value]
+        if isinstance(value, type) and hasattr(value, 'model_json_schema'):
+            # response_schema로 전달된 pydantic 모델 클래스
+            return self.normalize(value.model_json_schema(by_alias=True))
+        if hasattr(value, 'model_dump'):
+            return self.normalize(value.model_dump(exclude_none=True))
+        return repr(value)
+
+    def key(self, method, **request):
+        normalized = self.normalize(request)
+        digest = _sha256(json.dumps(normalized, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+        return f"{method}_{digest[:24]}", normalized
+
+
+class _CassetteStore:
+    """요청 키별 응답 목록을 JSON 파일로 저장/조회"""
+
+    def __init__(self, cassette_dir):
+        self.cassette_dir = cassette_dir
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._cursor = {}
+        os.makedirs(cassette_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cassette_dir, f"{key}.json")
+
+    def _load(self, key):
+        if key not in self._cache:
+            path = self._path(key)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._cache[key] = json.load(f)
+            else:
+                self._cache[key] = None
+        return self._cache[key]
+
+    def append(self, key, method, request, response):
+        with self._lock:
+            cassette = self._load(key) or {'method': method, 'request': request, 'responses': []}
+            cassette['responses'].append(response)
+            self._cache[key] = cassette
+            temp_path = f"{self._path(key)}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cassette, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, self._path(key))
+
+    def next(self, key):
+        """같은 요청이 반복되면 기록된 응답을 순서대로(마지막 이후 순환) 반환"""
+        with self._lock:
+            cassette = self._load(key)
+            if not cassette or not cassette['responses']:
+                raise CassetteMissError(key)
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return cassette['responses'][index % len(cassette['responses'])]
+
+
+class _RecordReplayModels:
+    """client.models 대체 (record/replay)"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def _call(self, method, response_type, live_fn, **request):
+        key, normalized = self._client.keys.key(method, **request)
+        if self._client.mode == BACKEND_REPLAY:
+            entry = self._client.store.next(key)
+            if 'error' in entry:
+                code = entry['error']['code']
+                error_type = errors.ClientError if 400 <= code < 500 else errors.ServerError
+                raise error_type(code, entry['error']['response_json'])
+            return response_type.model_validate(entry['response'])
+
+        try:
+            response = live_fn(**request)
+        except errors.APIError as e:
+            self._client.store.append(key, method, normalized, {
+                'error': {'code': e.code, 'response_json': {'error': {'code': e.code, 'message': e.message,
+                                                                      'status': e.status}}}})
+            raise
+        self._client.store.append(key, method, normalized,
+                                  {'response': response.model_dump(mode='json', exclude_none=True)})
+        return response
+
+    def generate_content(self, *, model, contents, config=None):
+        live = self._client.live.models.generate_content if self._client.live else None
+        return self._call('generate_content', types.GenerateContentResponse, live,
+                          model=model, contents=contents, config=config)
+
+    def generate_content_stream(self, *, model, contents, config=None):
+        live = self._client.live.models.generate_content if self._client.live else None
+        yield self._call('generate_content', types.GenerateContentResponse, live,
+                         model=model, contents=contents, config=config)
+
+    def generate_images(self, *, model, prompt, config=None):
+        live = self._client.live.models.generate_images if self._client.live else None
+        return self._call('generate_images', types.GenerateImagesResponse, live,
+                          model=model, prompt=prompt, config=config)
+
+    def generate_videos(self, *, model, prompt=None, image=None, video=None, config=None):
+        live = self._client.live.models.generate_videos if self._client.live else None
+        return self._call('generate_videos', types.GenerateVideosOperation, live,
+                          model=model, prompt=prompt, image=image, video=video, config=config)
+
+
+class _RecordReplayOperations:
+    """client.operations 대체 (record/replay)
+
+    완료된 상태만 기록하고 (영상 바이트 포함), replay 모드는 폴링 없이 완료 상태를 바로 반환한다.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def get(self, operation, *, config=None):
+        key, normalized = self._client.keys.key('operations.get', name=operation.name)
+        if self._client.mode == BACKEND_REPLAY:
+            entry = self._client.store.next(key)
+            return types.GenerateVideosOperation.model_validate(entry['response'])
+
+        result = self._client.live.operations.get(operation)
+        if result.done:
+            for generated in getattr(result.response, 'generated_videos', None) or []:
+                # 재생 시 네트워크 없이 저장할 수 있도록 영상 바이트를 함께 기록
+                if generated.video and not generated.video.video_bytes:
+                    try:
+                        generated.video.video_bytes = self._client.live.files.download(file=generated.video)
+                    except Exception as e:
+                        logger.warning(f"영상 바이트를 기록하지 못함 ({operation.name}): {e}")
+            self._client.store.append(key, 'operations.get', normalized,
+                                      {'response': result.model_dump(mode='json', exclude_none=True)})
+        return result
+
+
+class _RecordReplayFiles:
+    """client.files 대체 (record/replay)"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def upload(self, *, file, config=None):
+        data = _read_upload(file)
+        content_hash = _sha256(data)
+        if self._client.mode == BACKEND_REPLAY:
+            uploaded = types.File(name=f"files/{content_hash[:16]}", mime_type=_guess_mime_type(data),
+                                  size_bytes=len(data), uri=f"replay://files/{content_hash[:16]}")
+        else:
+            uploaded = self._client.live.files.upload(file=file, config=config)
+        self._client.keys.register_file(uploaded.name, content_hash)
+        return uploaded
+
+
+class RecordReplayClient:
+    """genai.Client 대체: record 모드는 실제 호출을 cassette에 기록, replay 모드는 기록을 재생"""
+
+    def __init__(self, mode, cassette_dir=None, api_key=None, live=None):
+        self.mode = mode
+        self.cassette_dir = cassette_dir or os.getenv('GEMINI_CASSETTE_DIR', DEFAULT_CASSETTE_DIR)
+        if mode == BACKEND_RECORD and live is None:
+            live = genai.Client(api_key=api_key)
+        self.live = live
+        self.keys = _RequestKeys()
+        self.store = _CassetteStore(self.cassette_dir)
+        self.models = _RecordReplayModels(self)
+        self.files = _RecordReplayFiles(self)
+        self.operations = _RecordReplayOperations(self)
+
+
+class SyntheticConfig:
+    """synthetic 모드 지연 시간/오류 분포 설정
+
+    지연 시간은 (중앙값 초, 로그정규 sigma) 형태의 로그정규 분포를 따른다.
+    """
+
+    def __init__(self, text_latency=(0.8, 0.3), image_latency=(6.0, 0.3), upload_latency=(0.2, 0.2),
+                 error_rate=0.0, rate_limit_rate=0.0, image_size=512, seed=None,
+                 video_latency=(60.0, 0.3), video_size=2 * 1024 * 1024):
+        self.text_latency = text_latency
+        self.image_latency = image_latency
+        self.upload_latency = upload_latency
+        self.video_latency = video_latency  # operation 완료까지 걸리는 시간
+        self.video_size = video_size
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.image_size = image_size
+        self.seed = seed
+
+    @staticmethod
+    def _pair(value, default):
+        if not value:
+            return default
+        median, _, sigma = value.partition(',')
+        return float(median), float(sigma or default[1])
+
+    @classmethod
+    def from_env(cls):
+        """SYNTHETIC_* 환경 변수로 설정 생성"""
+        defaults = cls()
+        seed = os.getenv('SYNTHETIC_SEED')
+        return cls(
+            text_latency=cls._pair(os.getenv('SYNTHETIC_TEXT_LATENCY'), defaults.text_latency),
+            image_latency=cls._pair(os.getenv('SYNTHETIC_IMAGE_LATENCY'), defaults.image_latency),
+            upload_latency=cls._pair(os.getenv('SYNTHETIC_UPLOAD_LATENCY'), defaults.upload_latency),
+            error_rate=float(os.getenv('SYNTHETIC_ERROR_RATE', defaults.error_rate)),
+            rate_limit_rate=float(os.getenv('SYNTHETIC_RATE_LIMIT_RATE', defaults.rate_limit_rate)),
+            image_size=int(os.getenv('SYNTHETIC_IMAGE_SIZE', defaults.image_size)),
+            seed=int(seed) if seed else None,
+            video_latency=cls._pair(os.getenv('SYNTHETIC_VIDEO_LATENCY'), defaults.video_latency),
+            video_size=int(os.getenv('SYNTHETIC_VIDEO_SIZE', defaults.video_size)),
+        )
+
+
+SCORE_CRITERIA = ('메시지 전달력', '창의성 및 독창성', '브랜드/제품 적합성')
+
+
+class _SyntheticModels:
+    """client.models 대체 (synthetic)"""
+
+    def __init__(self, client):
+        self._client = client
+
+    @staticmethod
+    def _prompt_text(contents):
+        texts = []
+        for content in contents if isinstance(contents, (list, tuple)) else [contents]:
+            if isinstance(content, str):
+                texts.append(content)
+            elif isinstance(content, types.Content):
+                texts.extend(part.text for part in content.parts or [] if part.text)
+            elif isinstance(content, types.Part) and content.text:
+                texts.append(content.text)
+        return '\n'.join(texts)
+
+    def _storyboard(self, rng, prompt):
+        match = re.search(r'(\d+)개의 scene', prompt)
+        scene_count = int(match.group(1)) if match else 8
+        scenes = [{
+            'scene_number': i,
+            'duration': '1초',
+            'visual': f'합성 장면 {i}: 제품 클로즈업, 미디엄 샷, 실내 스튜디오',
+            'audio': '경쾌한 배경 음악',
+            'text': f'자막 {i}',
+            'description': f'합성 스토리보드의 {i}번째 장면 설명입니다. (#{rng.randint(1000, 9999)})',
+        } for i in range(1, scene_count + 1)]
+        return {'storyboard1': {
+            'title': '합성 광고',
+            'total duration': f'{scene_count}초',
+            'plot': ['합성 plot'],
+            'mood': ['밝은'],
+            'scenes': scenes,
+            'key_messages': ['핵심 메시지 1', '핵심 메시지 2'],
+            'call_to_action': '지금 만나보세요',
+        }}
+
+    def _score(self, rng):
+        result = {}
+        for criterion in SCORE_CRITERIA:
+            result[criterion] = {'점수': rng.randint(2, 5), '평가 이유': f'{criterion} 합성 평가',
+                                 '개선점': f'{criterion} 합성 개선점'}
+        result['총점'] = sum(result[c]['점수'] for c in SCORE_CRITERIA)
+        return result
+
+    def _response_json(self, rng, prompt):
+        if '"storyboard1"' in prompt:
+            return self._storyboard(rng, prompt)
+        if 'scene_description' in prompt:
+            return {'scene_description': f'합성 이미지 설명 #{rng.randint(1000, 9999)}'}
+        if '총점' in prompt:
+            return self._score(rng)
+        if '기존 프롬프트' in prompt:
+            return {'improved_prompt': '개선된 합성 프롬프트'}
+        return {'plot': '합성 광고 plot입니다.'}
+
+    def generate_content(self, *, model, contents, config=None):
+        rng = self._client.begin_call(self._client.config.text_latency)
+        prompt = self._prompt_text(contents)
+        cached_content = config.get('cached_content') if isinstance(config, dict) else \
+            getattr(config, 'cached_content', None)
+        cached = self._client.caches.text(cached_content) if cached_content else ''
+        text = json.dumps(self._response_json(rng, cached + prompt), ensure_ascii=False)
+        prompt_tokens = max(1, len(cached + prompt) // 3)
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role='model', parts=[types.Part(text=text)]))],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                cached_content_token_count=len(cached) // 3 if cached else None,
+                candidates_token_count=max(1, len(text) // 3),
+                total_token_count=prompt_tokens + max(1, len(text) // 3),
+            ),
+            model_version=model,
+        )
+
+    def generate_content_stream(self, *, model, contents, config=None):
+        yield self.generate_content(model=model, contents=contents, config=config)
+
+    def generate_images(self, *, model, prompt, config=None):
+        rng = self._client.begin_call(self._client.config.image_latency)
+        count = getattr(config, 'number_of_images', None) or 1
+        # Imagen처럼 output_mime_type이 JPEG이면 JPEG, 아니면 PNG로 응답
+        mime_type = getattr(config, 'output_mime_type', None) or 'image/png'
+        quality = getattr(config, 'output_compression_quality', None) or 75
+        images = [types.GeneratedImage(image=types.Image(
+                      image_bytes=self._client.placeholder_image(rng, mime_type, quality), mime_type=mime_type))
+                  for _ in range(count)]
+        return types.GenerateImagesResponse(generated_images=images)
+
+    def generate_videos(self, *, model, prompt=None, image=None, video=None, config=None):
+        # 제출은 짧은 지연 후 바로 반환하고, 완료 시각은 operations.get에서 판정
+        rng = self._client.begin_call(self._client.config.upload_latency)
+        median, sigma = self._client.config.video_latency
+        duration = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        count = getattr(config, 'number_of_videos', None) or 1
+        return self._client.operations.start(duration, count, rng.getrandbits(32))
+
+
+class _SyntheticOperations:
+    """client.operations 대체 (synthetic, 제출 시각 기준으로 완료 여부 판정)"""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+        self._operations = {}  # {name: (완료 시각, 영상 수, seed)}
+        self._count = 0
+
+    def start(self, duration, count, seed):
+        with self._lock:
+            self._count += 1
+            name = f"models/veo/operations/synthetic-{self._count}"
+            self._operations[name] = (time.monotonic() + duration, count, seed)
+        return types.GenerateVideosOperation(name=name, done=False)
+
+    def get(self, operation, *, config=None):
+        self._client.begin_call((0.05, 0.2), can_fail=False)
+        with self._lock:
+            deadline, count, seed = self._operations[operation.name]
+        if time.monotonic() < deadline:
+            return types.GenerateVideosOperation(name=operation.name, done=False)
+
+        videos = [types.GeneratedVideo(video=types.Video(video_bytes=self._client.placeholder_video(seed + i),
+                                                         mime_type='video/mp4'))
+                  for i in range(count)]
+        return types.GenerateVideosOperation(name=operation.name, done=True,
+                                             response=types.GenerateVideosResponse(generated_videos=videos))
+
+
+class _SyntheticFiles:
+    """client.files 대체 (synthetic)"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def upload(self, *, file, config=None):
+        self._client.begin_call(self._client.config.upload_latency, can_fail=False)
+        data = _read_upload(file)
+        content_hash = _sha256(data)
+        return types.File(name=f"files/{content_hash[:16]}", mime_type=_guess_mime_type(data),
+                          size_bytes=len(data), uri=f"synthetic://files/{content_hash[:16]}")
+
+
+class _SyntheticCaches:
+    """client.caches 대체 (synthetic, 프로세스 메모리에 보관, ttl이 지나면 만료)"""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+        self._caches = {}  # {name: (text, 만료 시각)}
+        self._count = 0
+
+    @staticmethod
+    def _ttl_seconds(config):
+        ttl = getattr(config, 'ttl', None)
+        return float(str(ttl).rstrip('s')) if ttl else 3600.0
+
+    @staticmethod
+    def _cached_content(name, model, expire_at, **fields):
+        return types.CachedContent(name=name, model=model,
+                                   expire_time=datetime.fromtimestamp(expire_at, tz=timezone.utc), **fields)
+
+    def create(self, *, model, config=None):
+        self._client.begin_call(self._client.config.text_latency, can_fail=False)
+        text = _SyntheticModels._prompt_text(getattr(config, 'contents', None) or [])
+        expire_at = time.time() + self._ttl_seconds(config)
+        with self._lock:
+            self._count += 1
+            name = f"cachedContents/synthetic-{self._count}"
+            self._caches[name] = (text, expire_at)
+        return self._cached_content(name, model, expire_at, display_name=getattr(config, 'display_name', None),
+                                    usage_metadata=types.CachedContentUsageMetadata(
+                                        total_token_count=max(1, len(text) // 3)))
+
+    def update(self, *, name, config=None):
+        with self._lock:
+            text, _ = self._lookup(name)
+            expire_at = time.time() + self._ttl_seconds(config)
+            self._caches[name] = (text, expire_at)
+        return self._cached_content(name, None, expire_at)
+
+    def delete(self, *, name, config=None):
+        with self._lock:
+            self._caches.pop(name, None)
+
+    def _lookup(self, name):
+        entry = self._caches.get(name)
+        if entry is None or entry[1] <= time.time():
+            self._caches.pop(name, None)
+            raise errors.ClientError(404, {'error': {'code': 404, 'message': f'{name} not found',
+                                                     'status': 'NOT_FOUND'}})
+        return entry
+
+    def text(self, name):
+        with self._lock:
+            return self._lookup(name)[0] + '\n'
+
+
+class SyntheticClient:
+    """네트워크 없이 스키마에 맞는 JSON과 placeholder 이미지를 반환하는 genai.Client 대체"""
+
+    def __init__(self, config=None):
+        self.config = config or SyntheticConfig.from_env()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.models = _SyntheticModels(self)
+        self.files = _SyntheticFiles(self)
+        self.caches = _SyntheticCaches(self)
+        self.operations = _SyntheticOperations(self)
+
+    def begin_call(self, latency, can_fail=True):
+        """호출별 난수 생성기 반환, 설정된 지연 시간만큼 대기하고 확률적으로 오류 발생"""
+        with self._lock:
+            call_seed = self._rng.getrandbits(64)
+        rng = random.Random(call_seed)
+
+        median, sigma = latency
+        if median > 0:
+            time.sleep(rng.lognormvariate(math.log(median), sigma))
+
+        if can_fail:
+            roll = rng.random()
+            if roll < self.config.rate_limit_rate:
+                raise errors.ClientError(429, {'error': {'code': 429, 'message': 'Resource has been exhausted',
+                                                         'status': 'RESOURCE_EXHAUSTED'}})
+            if roll < self.config.rate_limit_rate + self.config.error_rate:
+                raise errors.ServerError(503, {'error': {'code': 503, 'message': 'The model is overloaded',
+                                                         'status': 'UNAVAILABLE'}})
+        return rng
+
+    def placeholder_image(self, rng, mime_type='image/png', quality=75):
+        """무작위 색상의 그라데이션/도형 이미지 (PNG 또는 JPEG)"""
+        from PIL import Image, ImageDraw
+
+        size = self.config.image_size
+        base = tuple(rng.randint(60, 200) for _ in range(3))
+        image = Image.new('RGB', (size, size), base)
+        draw = ImageDraw.Draw(image)
+        for y in range(0, size, 4):
+            shade = tuple(min(255, c + y * 50 // size) for c in base)
+            draw.rectangle([0, y, size, y + 4], fill=shade)
+        for _ in range(6):
+            x0, y0 = rng.randint(0, size - 40), rng.randint(0, size - 40)
+            x1, y1 = x0 + rng.randint(20, size // 3), y0 + rng.randint(20, size // 3)
+            color = tuple(rng.randint(0, 255) for _ in range(3))
+            if rng.random() < 0.5:
+                draw.ellipse([x0, y0, x1, y1], outline=color, width=3)
+            else:
+                draw.rectangle([x0, y0, x1, y1], outline=color, width=3)
+
+        buffer = io.BytesIO()
+        if mime_type == 'image/jpeg':
+            image.save(buffer, 'JPEG', quality=quality)
+        else:
+            image.save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def placeholder_video(self, seed):
+        """MP4 box 구조(ftyp + mdat)만 갖춘 재생 불가 placeholder (다운로드/저장 경로 측정용)"""
+        ftyp = b'\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom'
+        payload = random.Random(seed).randbytes(max(0, self.config.video_size - len(ftyp) - 8))
+        return ftyp + (len(payload) + 8).to_bytes(4, 'big') + b'mdat' + payload
+
+
+def live_http_options():
+    """연결 풀 설정 (예열된 연결을 유휴 상태에서도 GEMINI_KEEPALIVE_SECONDS 동안 유지)"""
+    import httpx
+    limits = httpx.Limits(
+        max_connections=int(os.getenv('GEMINI_MAX_CONNECTIONS', 16)),
+        max_keepalive_connections=int(os.getenv('GEMINI_MAX_CONNECTIONS', 16)),
+        keepalive_expiry=float(os.getenv('GEMINI_KEEPALIVE_SECONDS', 120)),
+    )
+    return types.HttpOptions(client_args={'limits': limits})
+
+
+def create_client(backend=None, api_key=None):
+    """GEMINI_BACKEND(live|record|replay|synthetic)에 맞는 client 생성"""
+    backend = backend or os.getenv('GEMINI_BACKEND', BACKEND_LIVE)
+    if backend == BACKEND_LIVE:
+        return genai.Client(api_key=api_key, http_options=live_http_options())
+    if backend in (BACKEND_RECORD, BACKEND_REPLAY):
+        logger.info(f"Gemini {backend} 모드 (cassette: {os.getenv('GEMINI_CASSETTE_DIR', DEFAULT_CASSETTE_DIR)})")
+        return RecordReplayClient(backend, api_key=api_key)
+    if backend == BACKEND_SYNTHETIC:
+        logger.info("Gemini synthetic 모드")
+        return SyntheticClient()
+    raise ValueError(f"지원하지 않는 GEMINI_BACKEND: {backend}")
+
+
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_client(backend=None, api_key=None):
+    """(backend, api_key)별로 프로세스에서 공유하는 client 반환
+
+    client마다 연결 풀을 따로 가지므로, 공유해야 예열된 연결을 이후 호출이 재사용한다.
+    """
+    backend = backend or os.getenv('GEMINI_BACKEND', BACKEND_LIVE)
+    key = (backend, api_key)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = create_client(backend, api_key=api_key)
+            _shared_clients[key] = client
+        return client
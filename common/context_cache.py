@@ -0,0 +1,172 @@
+import os
+import time
+import atexit
+import hashlib
+import threading
+
+from common.logger import init_logger
+from common.tracing import get_tracer
+
+logger = init_logger()
+
+
+class CachedContentError(RuntimeError):
+    """cached content가 만료/삭제되어 요청이 실패함 (캐시 없이 다시 요청해야 함)"""
+
+
+def is_cached_content_error(error):
+    """cached content 조회 실패(만료, 삭제 등)로 인한 오류 여부"""
+    message = str(error).lower()
+    return 'cachedcontent' in message or 'cached_content' in message or 'cached content' in message
+
+
+class ContextCacheManager:
+    """세션별 Gemini explicit context cache 관리
+
+    (session_id, kind)마다 하나의 cached content를 유지하고, 내용이 바뀌면 새로 만든 뒤
+    이전 캐시를 삭제한다. 만료 시각이 refresh_margin초 안으로 다가오면 ttl을 연장(실패 시 재생성)한다.
+    세션 종료 시 release()로 정리하며, 정리되지 못한 캐시도 ttl이 지나면 만료된다.
+    """
+
+    def __init__(self, enabled=True, ttl_seconds=1800, refresh_margin=60):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = min(refresh_margin, ttl_seconds / 2)
+        self._lock = threading.Lock()
+        # {(session_id, kind): {'content_hash', 'name', 'client', 'created_at', 'expire_time'}}
+        self._entries = {}
+        self._key_locks = {}
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, gemini, session_id, kind, text, model=None):
+        """kind 단위 cached content 이름 반환 (비활성화/미지원/생성 실패 시 None)"""
+        if not self.enabled or not hasattr(gemini.client, 'caches'):
+            return None
+
+        content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        key = (session_id, kind)
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+            now = time.time()
+            if entry is not None and entry['content_hash'] == content_hash:
+                if now < entry['expire_time'] - self.refresh_margin:
+                    return entry['name']
+                # 만료가 가까우면 ttl 연장 (생성에 실패했던 내용은 ttl이 지나면 다시 생성 시도)
+                if entry['name'] and self._extend(entry):
+                    return entry['name']
+
+            with get_tracer().span('context_cache.create', cache='gemini_context', cache_hit=False,
+                                   session_id=session_id, kind=kind) as span:
+                if entry is not None and entry['name']:
+                    self._delete(entry['client'], entry['name'])
+                name, expire_time = self._create(gemini, session_id, kind, text, model)
+                span.set_attribute('created', name is not None)
+            # 생성에 실패한 내용은 ttl 동안 다시 시도하지 않고 일반 프롬프트로 처리
+            with self._lock:
+                self._entries[key] = {'content_hash': content_hash, 'name': name, 'client': gemini.client,
+                                      'created_at': now, 'expire_time': expire_time}
+            return name
+
+    def invalidate(self, session_id, kind, name=None):
+        """요청이 cached content 오류로 실패하면 항목을 버려 다음 호출에서 새로 생성"""
+        key = (session_id, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (name is None or entry['name'] == name):
+                del self._entries[key]
+                logger.warning(f"context cache 무효화: {entry['name']} ({kind}, session={session_id})")
+
+    def _expire_time(self, cache):
+        """서버가 알려준 만료 시각 (없으면 요청한 ttl 기준)"""
+        expire_time = getattr(cache, 'expire_time', None)
+        if expire_time is not None:
+            return expire_time.timestamp()
+        return time.time() + self.ttl_seconds
+
+    def _create(self, gemini, session_id, kind, text, model):
+        from google.genai import types
+        try:
+            cache = gemini.client.caches.create(
+                model=model or gemini.model,
+                config=types.CreateCachedContentConfig(
+                    contents=[text],
+                    display_name=f"{kind}-{session_id}",
+                    ttl=f"{self.ttl_seconds}s",
+                ),
+            )
+            logger.info(f"context cache 생성: {cache.name} ({kind}, session={session_id})")
+            return cache.name, self._expire_time(cache)
+        except Exception as e:
+            # 최소 토큰 수 미달, 미지원 모델 등
+            logger.warning(f"context cache 생성 실패 ({kind}): {e}")
+            return None, time.time() + self.ttl_seconds
+
+    def _extend(self, entry):
+        """cached content ttl 연장 (성공 여부)"""
+        from google.genai import types
+        try:
+            cache = entry['client'].caches.update(
+                name=entry['name'],
+                config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"),
+            )
+        except Exception as e:
+            logger.warning(f"context cache ttl 연장 실패 ({entry['name']}): {e}")
+            return False
+        with self._lock:
+            entry['expire_time'] = self._expire_time(cache)
+        return True
+
+    @staticmethod
+    def _delete(client, name):
+        try:
+            client.caches.delete(name=name)
+        except Exception as e:
+            logger.warning(f"context cache 삭제 실패 ({name}): {e}")
+
+    def release(self, session_id, wait=False):
+        """세션의 모든 cached content 삭제 (기본은 백그라운드 스레드에서 수행)"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == session_id]
+            entries = [self._entries.pop(key) for key in keys]
+        targets = [(entry['client'], entry['name']) for entry in entries if entry['name']]
+        if not targets:
+            return
+
+        def delete_all():
+            for client, name in targets:
+                self._delete(client, name)
+            logger.info(f"context cache {len(targets)}개 삭제 (session={session_id})")
+
+        if wait:
+            delete_all()
+        else:
+            threading.Thread(target=delete_all, name='context-cache-release', daemon=True).start()
+
+    def release_all(self):
+        with self._lock:
+            sessions = {session_id for session_id, _ in self._entries}
+        for session_id in sessions:
+            self.release(session_id, wait=True)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_context_cache():
+    """프로세스 전역 context cache 관리자 반환"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ContextCacheManager(
+                # GEMINI_CONTEXT_CACHE=0 이면 항상 전체 프롬프트 전송
+                enabled=os.getenv('GEMINI_CONTEXT_CACHE', '1') == '1',
+                ttl_seconds=int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', 1800)),
+                refresh_margin=int(os.getenv('GEMINI_CONTEXT_CACHE_REFRESH_MARGIN', 60)),
+            )
+            atexit.register(_manager.release_all)
+        return _manager
@@ -0,0 +1,263 @@
+import os
+import threading
+import functools
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool
+
+from common.logger import init_logger
+from common.metrics import get_registry
+
+logger = init_logger()
+
+# 우선순위 (값이 클수록 먼저 실행)
+PRIORITY_INTERACTIVE = 2  # 단일 씬 재생성 등 사용자 상호작용
+PRIORITY_BULK = 1         # 스토리보드/전체 이미지 생성
+PRIORITY_VALIDATION = 0   # 검증 등 백그라운드 작업
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_BULK: 'bulk',
+    PRIORITY_VALIDATION: 'validation',
+}
+
+
+class _TaskRunnable(QRunnable):
+    """실행기에 제출되는 개별 작업 단위"""
+
+    def __init__(self, executor, fn, priority, name, on_done):
+        super().__init__()
+        # 파이썬 쪽에서 참조를 관리하므로 Qt의 자동 삭제는 끈다
+        self.setAutoDelete(False)
+        self.executor = executor
+        self.fn = fn
+        self.priority = priority
+        self.name = name
+        self.on_done = on_done
+
+    def run(self):
+        self.executor._on_started(self)
+        try:
+            self.fn()
+        except Exception as e:
+            logger.error(f"백그라운드 작업 {self.name} 실패: {e}")
+        finally:
+            self.executor._on_finished(self)
+
+
+class TaskExecutor:
+    """우선순위 기반 전역 백그라운드 작업 실행기"""
+
+    def __init__(self, max_in_flight=None):
+        if max_in_flight is None:
+            max_in_flight = int(os.getenv('MAX_IN_FLIGHT', 4))
+
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_in_flight)
+
+        self._lock = threading.Lock()
+        self._queued = {}   # {runnable: priority}
+        self._running = set()
+        self._completed = 0
+        self._cancelled = 0
+
+        registry = get_registry()
+        registry.gauge('executor_queue_depth', '대기 중인 백그라운드 작업 수', callback=self.queue_depth)
+        registry.gauge('executor_in_flight', '실행 중인 백그라운드 작업 수', callback=self.in_flight)
+        registry.gauge('executor_max_in_flight', '동시 실행 가능한 작업 수', callback=lambda: self.max_in_flight)
+        for priority, name in PRIORITY_NAMES.items():
+            registry.gauge('executor_queue_depth_by_priority', '우선순위별 대기 작업 수',
+                           callback=functools.partial(self.queue_depth, priority), priority=name)
+
+    @property
+    def max_in_flight(self):
+        return self.pool.maxThreadCount()
+
+    def set_max_in_flight(self, max_in_flight):
+        """동시 실행 가능한 작업 수 변경"""
+        self.pool.setMaxThreadCount(max(1, int(max_in_flight)))
+
+    def submit(self, fn, priority=PRIORITY_BULK, name=None, on_done=None):
+        """작업 제출 후 취소 등에 사용할 핸들 반환"""
+        return self.start(self.prepare(fn, priority, name, on_done))
+
+    def prepare(self, fn, priority=PRIORITY_BULK, name=None, on_done=None):
+        """실행 전 작업 핸들 생성 (호출자가 핸들을 먼저 기록한 뒤 start()로 제출)"""
+        return _TaskRunnable(self, fn, priority, name or getattr(fn, '__name__', 'task'), on_done)
+
+    def start(self, runnable):
+        """prepare()로 만든 작업 제출"""
+        with self._lock:
+            self._queued[runnable] = runnable.priority
+        self.pool.start(runnable, runnable.priority)
+        logger.debug(f"작업 제출: {runnable.name} ({PRIORITY_NAMES.get(runnable.priority, runnable.priority)}), "
+                     f"대기 {self.queue_depth()}개")
+        return runnable
+
+    def run_all(self, fns, priority=PRIORITY_VALIDATION, name=None):
+        """fns를 실행기에서 실행하고 결과 목록 반환 (실행 중인 작업 안에서 호출 가능)
+
+        호출 스레드는 아직 시작되지 않은 작업을 대기열에서 꺼내 직접 실행하므로, 모든 작업 스레드가
+        이 호출에서 기다리더라도 교착되지 않고 동시 실행 수도 max_in_flight를 넘지 않는다.
+        """
+        results = [None] * len(fns)
+        errors = [None] * len(fns)
+        done = [threading.Event() for _ in fns]
+
+        def run(i):
+            try:
+                results[i] = fns[i]()
+            except Exception as e:
+                errors[i] = e
+            finally:
+                done[i].set()
+
+        handles = [self.submit(functools.partial(run, i), priority=priority, name=name or 'run_all')
+                   for i in range(len(fns))]
+        for i, handle in enumerate(handles):
+            if self.pool.tryTake(handle):
+                handle.run()
+            done[i].wait()
+
+        for error in errors:
+            if error is not None:
+                raise error
+        return results
+
+    def cancel(self, runnable):
+        """아직 시작되지 않은 작업을 대기열에서 제거"""
+        if not self.pool.tryTake(runnable):
+            return False
+
+        with self._lock:
+            self._queued.pop(runnable, None)
+            self._cancelled += 1
+        if runnable.on_done:
+            runnable.on_done(runnable)
+        return True
+
+    def queue_depth(self, priority=None):
+        """대기 중인 작업 수"""
+        with self._lock:
+            if priority is None:
+                return len(self._queued)
+            return sum(1 for p in self._queued.values() if p == priority)
+
+    def in_flight(self):
+        """실행 중인 작업 수"""
+        with self._lock:
+            return len(self._running)
+
+    def stats(self):
+        """대기열/실행 현황 반환"""
+        with self._lock:
+            queued_by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority in self._queued.values():
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                queued_by_priority[name] = queued_by_priority.get(name, 0) + 1
+
+            return {
+                'max_in_flight': self.max_in_flight,
+                'queued': len(self._queued),
+                'queued_by_priority': queued_by_priority,
+                'in_flight': len(self._running),
+                'completed': self._completed,
+                'cancelled': self._cancelled,
+            }
+
+    def wait_for_done(self, msecs=-1):
+        """모든 작업 종료 대기"""
+        return self.pool.waitForDone(msecs)
+
+    def _on_started(self, runnable):
+        with self._lock:
+            self._queued.pop(runnable, None)
+            self._running.add(runnable)
+
+    def _on_finished(self, runnable):
+        with self._lock:
+            self._running.discard(runnable)
+            self._completed += 1
+        if runnable.on_done:
+            runnable.on_done(runnable)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """프로세스 전역 실행기 반환"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = TaskExecutor()
+        return _executor
+
+
+class BackgroundTask(QObject):
+    """QThread 대신 전역 실행기에서 실행되는 작업 베이스 클래스
+
+    QThread와 같은 start/isRunning/quit/wait 인터페이스를 제공한다.
+    """
+    priority = PRIORITY_BULK
+
+    def __init__(self):
+        super().__init__()
+        self.cancelled = False
+        self.session_id = None  # 토큰 사용량/추적 구간을 묶는 세션 ID
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._handles = []
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def run(self):
+        raise NotImplementedError
+
+    def start(self):
+        """실행기에 작업 제출"""
+        self.cancelled = False
+        self.submit(self.run)
+
+    def submit(self, fn, *args, **kwargs):
+        """이 작업에 속한 하위 작업 제출"""
+        executor = get_executor()
+        handle = executor.prepare(
+            functools.partial(fn, *args, **kwargs),
+            priority=self.priority,
+            name=type(self).__name__,
+            on_done=self._on_done,
+        )
+        # 빠른 작업이 먼저 끝나도 _on_done에서 제거되도록 제출 전에 기록
+        with self._lock:
+            self._pending += 1
+            self._idle.clear()
+            self._handles.append(handle)
+        executor.start(handle)
+        return handle
+
+    def _on_done(self, handle):
+        with self._lock:
+            if handle in self._handles:
+                self._handles.remove(handle)
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.set()
+
+    def isRunning(self):
+        return not self._idle.is_set()
+
+    def cancel(self):
+        """대기 중인 하위 작업 취소 (실행 중인 작업은 cancelled 플래그로 협조적 중단) → 취소된 하위 작업 수"""
+        self.cancelled = True
+        with self._lock:
+            handles = list(self._handles)
+        return sum(1 for handle in handles if get_executor().cancel(handle))
+
+    def quit(self):
+        self.cancel()
+
+    def wait(self, msecs=None):
+        """작업 종료 대기"""
+        timeout = None if msecs is None or msecs < 0 else msecs / 1000
+        return self._idle.wait(timeout)
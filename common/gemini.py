@@ -13,37 +13,111 @@ import base64
 
 from common.logger import timefn
 from common.logger import init_logger
+from common.upload_profile import get_upload_profile
+from common.image_store import get_output_format, sniff_mime_type
+from common.tracing import get_tracer, current_span
+from common.usage import usage_from_response
+from common.backend import get_shared_client
+from common.schema import parse_response, ResponseSchemaError
+from common.context_cache import CachedContentError, is_cached_content_error
 
 logger = init_logger()
 
 
 class Gemini:
-    def __init__(self):
+    def __init__(self, backend=None):
         load_dotenv()
-        self.client = genai.Client(api_key=os.getenv('API_KEY'))
+        # GEMINI_BACKEND: live(기본) | record | replay | synthetic
+        # 연결 풀을 재사용하도록 프로세스 공유 client 사용
+        self.api_key = os.getenv('API_KEY')
+        self.client = get_shared_client(backend, api_key=self.api_key)
         self.model = 'gemini-2.0-flash'  #'gemini-2.5-flash-preview-05-20' | 'gemini-2.5-pro-preview-06-05'
+        self.imagen_model = 'imagen-4.0-generate-preview-06-06'
+        self.veo_model = os.getenv('VEO_MODEL', 'veo-2.0-generate-001')
         self.max_retries = 10
         self.initial_delay = 1
+        # 응답 형식 오류는 같은 요청에서 반복되기 쉬우므로 대기 없이 짧게만 재요청
+        self.max_schema_retries = int(os.getenv('GEMINI_SCHEMA_RETRIES', 1))
+
+    @timefn
+    def warm_up(self, validate=False):
+        """공유 client 연결 예열 (validate=True 이면 API 키와 모델 사용 가능 여부도 확인)
+
+        모델 메타데이터 조회로 DNS/TLS 연결을 미리 열어 두며, 토큰은 소비하지 않는다.
+        live 외 백엔드는 client 생성만으로 예열이 끝난다.
+        """
+        result = {'ok': True, 'errors': {}}
+        if not hasattr(self.client.models, 'get'):
+            return result
+
+        models = [self.model, self.imagen_model] if validate else [self.model]
+        for model in models:
+            try:
+                self.client.models.get(model=model)
+            except Exception as e:
+                result['ok'] = False
+                result['errors'][model] = str(e)
+                logger.warning(f"Gemini 예열 실패 ({model}): {e}")
+        return result
+
+    @staticmethod
+    def _json_config(response_schema=None, cached_content=None):
+        """JSON 응답 설정 (response_schema 지정 시 해당 구조로 생성을 제한)"""
+        config = {"response_mime_type": "application/json"}
+        if response_schema is not None:
+            config["response_schema"] = response_schema
+        if cached_content is not None:
+            # 미리 캐시한 공통 컨텍스트(루브릭 등)를 프롬프트 앞에 붙여 사용
+            config["cached_content"] = cached_content
+        return config
+
+    @staticmethod
+    def _parse(text, response_schema=None):
+        """response_schema가 있으면 검증된 모델 객체, 없으면 원문 반환"""
+        if response_schema is None:
+            return text
+        result = parse_response(response_schema, text)
+        current_span().set_attribute('response_schema', response_schema.__name__)
+        return result
 
     def retry_with_delay(func):
         def wrapper(self, *args, **kwargs):
             delay = self.initial_delay
-            for attempt in range(self.max_retries):
-                try:
-                    return func(self, *args, **kwargs)
-                except Exception as e:
-                    if attempt == self.max_retries - 1:
-                        raise e
-                    logger.error(f"gemini 호출 {attempt + 1}번째 실패: {e}")
-                    time.sleep(delay)
-                    delay *= 2
+            schema_failures = 0
+            with get_tracer().span(f"{func.__name__}.call") as call_span:
+                for attempt in range(self.max_retries):
+                    call_span.set_attributes(attempt=attempt + 1, retry_count=attempt)
+                    try:
+                        return func(self, *args, **kwargs)
+                    except ResponseSchemaError as e:
+                        schema_failures += 1
+                        call_span.set_attribute('schema_failures', schema_failures)
+                        if schema_failures > self.max_schema_retries or attempt == self.max_retries - 1:
+                            raise e
+                        logger.error(f"gemini 응답 형식 오류 {schema_failures}번째, 바로 재요청: {e}")
+                    except Exception as e:
+                        if kwargs.get('cached_content') and is_cached_content_error(e):
+                            # 만료/삭제된 cached content는 다시 보내도 실패하므로 호출자가 캐시 없이 재요청
+                            raise CachedContentError(str(e)) from e
+                        if attempt == self.max_retries - 1:
+                            raise e
+                        logger.error(f"gemini 호출 {attempt + 1}번째 실패: {e}")
+                        time.sleep(delay)
+                        delay *= 2
 
         return wrapper
 
     @retry_with_delay
     @timefn
-    def _call_gemini_image_text(self, prompt, image, text, model=None):
-        target_image = self.client.files.upload(file=image)
+    def _call_gemini_image_text(self, prompt, image, text, model=None, response_schema=None):
+        current_span().set_attributes(model=model if model else self.model, prompt_chars=len(prompt) + len(text))
+        if isinstance(image, (str, os.PathLike)) and os.path.exists(image):
+            # 업로드 설정에 맞춰 축소/재압축한 바이트 전송
+            data, mime_type = get_upload_profile().encode(image)
+            current_span().set_attribute('bytes_uploaded', len(data))
+            target_image = self.client.files.upload(file=BytesIO(data), config={'mime_type': mime_type})
+        else:
+            target_image = self.client.files.upload(file=image)
         response = self.client.models.generate_content(
             model=model if model else self.model,
             contents=[
@@ -51,31 +125,29 @@ class Gemini:
                 target_image,
                 text,
             ],
-            config={
-                "response_mime_type": "application/json",
-                # "response_schema": model_schema(),
-            }
+            config=self._json_config(response_schema)
         )
-        return response.text
+        current_span().set_attributes(**usage_from_response(response))
+        return self._parse(response.text, response_schema)
 
     @retry_with_delay
     @timefn
-    def _call_gemini_text(self, prompt, model=None):
+    def _call_gemini_text(self, prompt, model=None, response_schema=None, cached_content=None):
+        current_span().set_attributes(model=model if model else self.model, prompt_chars=len(prompt))
         response = self.client.models.generate_content(
             model=model if model else self.model,
             contents=[
                 prompt,
             ],
-            config={
-                "response_mime_type": "application/json",
-            }
+            config=self._json_config(response_schema, cached_content)
         )
-        return response.candidates[0].content.parts[0].text
+        current_span().set_attributes(**usage_from_response(response))
+        return self._parse(response.candidates[0].content.parts[0].text, response_schema)
 
     @retry_with_delay
     @timefn
     def _call_gemini_text_stream(self, prompt, model=None):
-
+        current_span().set_attributes(model=model if model else self.model, prompt_chars=len(prompt))
         response = self.client.models.generate_content_stream(
             model=model if model else self.model,
             contents=[
@@ -109,23 +181,99 @@ class Gemini:
 
     @timefn
     def _call_imagen_text(self, prompt):
+        data, _ = self._generate_images(prompt, 1)[0]
+        return Image.open(BytesIO(data))
+
+    @timefn
+    def _call_imagen_bytes(self, prompt):
+        """Imagen 이미지 1장 → (인코딩된 바이트, MIME 타입) (디코딩/재인코딩 없이 그대로 저장할 때 사용)"""
+        return self._generate_images(prompt, 1)[0]
+
+    @timefn
+    def _call_imagen_candidates(self, prompt, number_of_images):
+        """한 번의 Imagen 호출로 후보 이미지 number_of_images장 생성 → [(바이트, MIME 타입)]
+        (안전 필터 등으로 더 적게 올 수 있음)"""
+        return self._generate_images(prompt, number_of_images)
+
+    def _generate_images(self, prompt, number_of_images):
+        output_format = get_output_format()
+        current_span().set_attributes(model=self.imagen_model, prompt_chars=len(prompt),
+                                      number_of_images=number_of_images, output_format=output_format.image_format)
         response = self.client.models.generate_images(
-            model='imagen-4.0-generate-preview-06-06',
+            model=self.imagen_model,
             prompt=prompt,
             config=types.GenerateImagesConfig(
-                number_of_images=1,
+                number_of_images=number_of_images,
+                **output_format.request_config(),
             )
         )
-        image = Image.open(BytesIO(response.generated_images[0].image.image_bytes))
-        return image
+        images = [(generated.image.image_bytes,
+                   generated.image.mime_type or sniff_mime_type(generated.image.image_bytes))
+                  for generated in response.generated_images or []
+                  if generated.image and generated.image.image_bytes]
+        if not images:
+            raise ValueError('Imagen 응답에 이미지가 없습니다.')
+        current_span().set_attribute('bytes_downloaded', sum(len(data) for data, _ in images))
+        return images
 
     @timefn
-    def _call_gemini_multimodal(self, contents, model=None):
+    def _call_gemini_multimodal(self, contents, model=None, response_schema=None):
+        current_span().set_attributes(
+            model=model if model else self.model,
+            prompt_chars=sum(len(c) for c in contents if isinstance(c, str)),
+            bytes_uploaded=sum(len(c.inline_data.data) for c in contents
+                               if getattr(c, 'inline_data', None) is not None and c.inline_data.data),
+        )
         response = self.client.models.generate_content(
             model=model if model else self.model,
             contents=contents,
-            config={
-                "response_mime_type": "application/json"
-            }
+            config=self._json_config(response_schema)
         )
-        return response.text
\ No newline at end of file
+        current_span().set_attributes(**usage_from_response(response))
+        return self._parse(response.text, response_schema)
+
+
+    @timefn
+    def _call_veo_submit(self, prompt, image=None, duration_seconds=None, aspect_ratio='16:9'):
+        """Veo 영상 생성 operation 제출 (완료를 기다리지 않고 operation 반환)"""
+        current_span().set_attributes(model=self.veo_model, prompt_chars=len(prompt))
+        return self.client.models.generate_videos(
+            model=self.veo_model,
+            prompt=prompt,
+            image=image,
+            config=types.GenerateVideosConfig(
+                number_of_videos=1,
+                duration_seconds=duration_seconds,
+                aspect_ratio=aspect_ratio,
+            )
+        )
+
+    def _get_operation(self, operation):
+        """operation 상태 조회 (폴링 빈도가 높아 실행 시간 로그는 남기지 않음)"""
+        return self.client.operations.get(operation)
+
+    @timefn
+    def _download_video(self, video, path, chunk_size=1024 * 1024):
+        """생성된 영상을 청크 단위로 파일에 기록 (전체 바이트를 메모리에 모으지 않음)"""
+        part_path = path + '.part'
+        written = 0
+        try:
+            with open(part_path, 'wb') as f:
+                if video.video_bytes:
+                    data = memoryview(video.video_bytes)
+                    for start in range(0, len(data), chunk_size):
+                        written += f.write(data[start:start + chunk_size])
+                else:
+                    import httpx
+                    with httpx.stream('GET', video.uri, headers={'x-goog-api-key': self.api_key or ''},
+                                      follow_redirects=True, timeout=httpx.Timeout(30, read=300)) as response:
+                        response.raise_for_status()
+                        for chunk in response.iter_bytes(chunk_size):
+                            written += f.write(chunk)
+            os.replace(part_path, path)
+        except Exception:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        current_span().set_attribute('bytes_downloaded', written)
+        return path
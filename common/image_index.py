@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from common.logger import init_logger
+from common.quality import image_hashes, hamming
+
+logger = init_logger()
+
+# 실행 위치와 무관하게 앱의 output 폴더에 저장 (여러 프로젝트가 하나의 색인을 공유)
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'output', 'image_index.sqlite')
+SOURCE_GENERATED = 'generated'
+SOURCE_UPLOADED = 'uploaded'
+
+# pHash 64비트를 16비트 4개 구간으로 나눠 색인 (해밍 거리 3 이하면 적어도 한 구간은 정확히 일치)
+BAND_COUNT = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sha256 TEXT NOT NULL,
+    phash TEXT NOT NULL,
+    dhash TEXT NOT NULL,
+    band0 INTEGER, band1 INTEGER, band2 INTEGER, band3 INTEGER,
+    path TEXT,
+    project TEXT,
+    scene_number INTEGER,
+    source TEXT,
+    created_at REAL,
+    stored INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS images_sha256 ON images (sha256);
+CREATE INDEX IF NOT EXISTS images_band0 ON images (band0);
+CREATE INDEX IF NOT EXISTS images_band1 ON images (band1);
+CREATE INDEX IF NOT EXISTS images_band2 ON images (band2);
+CREATE INDEX IF NOT EXISTS images_band3 ON images (band3);
+CREATE TABLE IF NOT EXISTS scores (
+    sha256 TEXT NOT NULL,
+    phash TEXT NOT NULL,
+    scene_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL,
+    PRIMARY KEY (sha256, scene_hash, model)
+);
+CREATE INDEX IF NOT EXISTS scores_scene ON scores (scene_hash, model);
+"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scene_hash(scene):
+    """검증 결과에 영향을 주는 씬 텍스트의 해시"""
+    fields = {key: scene.get(key, '') for key in ('visual', 'description', 'text', 'audio')}
+    return hashlib.sha256(json.dumps(fields, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _bands(value):
+    return [(value >> (16 * i)) & 0xFFFF for i in range(BAND_COUNT)]
+
+
+class ImageFingerprint:
+    """이미지 내용 해시와 지각 해시"""
+
+    def __init__(self, sha256, phash, dhash):
+        self.sha256 = sha256
+        self.phash = phash
+        self.dhash = dhash
+
+    @classmethod
+    def of(cls, path):
+        return cls(file_sha256(path), *image_hashes(path))
+
+
+class ImageIndex:
+    """프로젝트 전체에 걸친 이미지 pHash/dHash 색인 (SQLite)
+
+    - 생성/업로드된 이미지를 등록하고 같은 세션의 다른 씬과 거의 같은 이미지를 찾는다.
+    - 검증 결과를 (이미지, 씬 텍스트, 모델) 기준으로 보관해, 동일/유사 이미지의 재검증 호출을 생략한다.
+    - 프로젝트 폴더에 같은 이미지가 이미 있으면 하드링크로 저장해 중복 저장을 피한다.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, near_distance=3):
+        self.path = path
+        self.near_distance = min(near_distance, BAND_COUNT - 1)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        # 이전 버전 색인 파일에 store() 저장 여부 열 추가
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(images)')}
+        if 'stored' not in columns:
+            self._conn.execute('ALTER TABLE images ADD COLUMN stored INTEGER DEFAULT 0')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add(self, path, project=None, scene_number=None, source=SOURCE_GENERATED, fingerprint=None):
+        """이미지 등록 후 지문 반환 (같은 경로의 이전 행은 덮어써진 내용이므로 삭제)"""
+        fingerprint = fingerprint or ImageFingerprint.of(path)
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM images WHERE path = ?', (os.path.abspath(path),))
+            self._conn.execute(
+                'INSERT INTO images (sha256, phash, dhash, band0, band1, band2, band3, path, project, '
+                'scene_number, source, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (fingerprint.sha256, f"{fingerprint.phash:016x}", f"{fingerprint.dhash:016x}",
+                 *_bands(fingerprint.phash), os.path.abspath(path), project, scene_number, source, time.time()))
+        return fingerprint
+
+    def _candidates(self, table_sql, phash, params=()):
+        """pHash 구간이 하나라도 같은 행 (SQL 색인으로 후보를 좁힌 뒤 해밍 거리로 확인)"""
+        bands = _bands(phash)
+        where = ' OR '.join(f'band{i} = ?' for i in range(BAND_COUNT))
+        with self._lock:
+            return self._conn.execute(f'{table_sql} AND ({where})', (*params, *bands)).fetchall()
+
+    @staticmethod
+    def _is_current(path, sha256):
+        """경로의 파일이 아직 색인된 내용 그대로인지 여부"""
+        try:
+            return os.path.exists(path) and file_sha256(path) == sha256
+        except OSError:
+            return False
+
+    def _prune(self, rows):
+        """[(sha256, path)] 내용이 바뀌었거나 사라진 경로의 행 삭제"""
+        if rows:
+            with self._lock, self._conn:
+                self._conn.executemany('DELETE FROM images WHERE sha256 = ? AND path = ?', rows)
+
+    def near_duplicates(self, fingerprint, project=None, exclude_scene=None, max_distance=None):
+        """[{'path', 'project', 'scene_number', 'source', 'distance'}] (가까운 순, 현재 파일 내용과 일치하는 행만)"""
+        max_distance = self.near_distance if max_distance is None else max_distance
+        sql = 'SELECT path, project, scene_number, source, phash, dhash, sha256 FROM images WHERE 1=1'
+        params = []
+        if project is not None:
+            sql += ' AND project = ?'
+            params.append(project)
+        matches = {}
+        stale = []
+        for path, row_project, number, source, row_phash, row_dhash, row_sha256 in self._candidates(
+                sql, fingerprint.phash, params):
+            if exclude_scene is not None and number == exclude_scene:
+                continue
+            distance = hamming(fingerprint.phash, int(row_phash, 16))
+            # pHash가 가까워도 dHash가 크게 다르면 다른 이미지로 판단
+            if distance > max_distance or hamming(fingerprint.dhash, int(row_dhash, 16)) > max_distance * 2 + 2:
+                continue
+            # 재생성/교체로 덮어써진 경로의 이전 지문과 비교하지 않도록 현재 내용 확인
+            if not self._is_current(path, row_sha256):
+                stale.append((row_sha256, path))
+                continue
+            key = (path, number)
+            if key not in matches or matches[key]['distance'] > distance:
+                matches[key] = {'path': path, 'project': row_project, 'scene_number': number, 'source': source,
+                                'distance': distance}
+        self._prune(stale)
+        return sorted(matches.values(), key=lambda match: match['distance'])
+
+    def put_score(self, fingerprint, scene_hash_value, model, result):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO scores (sha256, phash, scene_hash, model, result, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (fingerprint.sha256, f"{fingerprint.phash:016x}", scene_hash_value, model,
+                 json.dumps(result, ensure_ascii=False), time.time()))
+
+    def find_score(self, fingerprint, scene_hash_value, model, max_distance=None):
+        """같은 씬 텍스트로 검증한 동일(또는 거의 같은) 이미지의 결과 → (결과, 거리) 또는 (None, None)"""
+        with self._lock:
+            row = self._conn.execute('SELECT result FROM scores WHERE sha256 = ? AND scene_hash = ? AND model = ?',
+                                     (fingerprint.sha256, scene_hash_value, model)).fetchone()
+        if row:
+            return json.loads(row[0]), 0
+
+        max_distance = self.near_distance if max_distance is None else max_distance
+        if max_distance <= 0:
+            return None, None
+        with self._lock:
+            rows = self._conn.execute('SELECT phash, result FROM scores WHERE scene_hash = ? AND model = ?',
+                                      (scene_hash_value, model)).fetchall()
+        best = min(((hamming(fingerprint.phash, int(row_phash, 16)), result) for row_phash, result in rows),
+                   default=None, key=lambda item: item[0])
+        if best is None or best[0] > max_distance:
+            return None, None
+        return json.loads(best[1]), best[0]
+
+    def store(self, source_path, target_path):
+        """source_path를 target_path로 이동 (같은 내용의 파일이 이미 있으면 하드링크로 공간 공유) → 링크 여부
+
+        임시 폴더의 씬 이미지는 재생성 시 제자리에서 덮어써지므로 store()로 저장한 파일만 링크 대상으로 삼고,
+        링크 전에 내용 해시를 다시 확인한다. 내용이 바뀌었거나 사라진 경로의 행은 정리한다.
+        """
+        import shutil
+        sha256 = file_sha256(source_path)
+        source, target = os.path.abspath(source_path), os.path.abspath(target_path)
+        with self._lock:
+            rows = self._conn.execute('SELECT DISTINCT path FROM images WHERE sha256 = ? AND stored = 1',
+                                      (sha256,)).fetchall()
+
+        linked = False
+        stale = []
+        for (existing,) in rows:
+            if existing in (source, target):
+                continue
+            if not self._is_current(existing, sha256):
+                stale.append((sha256, existing))
+                continue
+            try:
+                if os.path.exists(target):
+                    os.remove(target)
+                os.link(existing, target)
+                os.remove(source)
+                linked = True
+            except OSError:
+                pass  # 다른 파일 시스템 등 하드링크 불가
+            break
+        if not linked:
+            shutil.move(source, target)
+
+        self._prune(stale)
+        with self._lock, self._conn:
+            # target 경로의 이전 내용 행은 더 이상 맞지 않음
+            self._conn.execute('DELETE FROM images WHERE path = ? AND sha256 != ?', (target, sha256))
+            self._conn.execute('UPDATE images SET path = ?, stored = 1 WHERE path = ?', (target, source))
+        return linked
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_image_index():
+    """프로세스 전역 이미지 색인 반환 (IMAGE_INDEX=0 이면 None)"""
+    global _index
+    if os.getenv('IMAGE_INDEX', '1') != '1':
+        return None
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = ImageIndex(os.getenv('IMAGE_INDEX_PATH', DEFAULT_INDEX_PATH),
+                                    near_distance=int(os.getenv('IMAGE_INDEX_NEAR_DISTANCE', 3)))
+            except Exception as e:
+                logger.warning(f"이미지 색인을 열 수 없음: {e}")
+                return None
+        return _index
@@ -0,0 +1,147 @@
+import os
+import shutil
+import threading
+from io import BytesIO
+
+from PIL import Image
+
+from common.logger import init_logger
+
+logger = init_logger()
+
+FORMAT_PNG = 'png'
+FORMAT_JPEG = 'jpeg'
+FORMAT_WEBP = 'webp'
+MIME_TYPES = {FORMAT_PNG: 'image/png', FORMAT_JPEG: 'image/jpeg', FORMAT_WEBP: 'image/webp'}
+EXTENSIONS = {'image/png': '.png', 'image/jpeg': '.jpg', 'image/webp': '.webp'}
+# 씬 이미지로 인식하는 확장자 (업로드 원본 확장자 포함)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def sniff_mime_type(data):
+    """이미지 바이트의 MIME 타입 (알 수 없으면 None)"""
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return MIME_TYPES[FORMAT_PNG]
+    if data[:3] == b'\xff\xd8\xff':
+        return MIME_TYPES[FORMAT_JPEG]
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return MIME_TYPES[FORMAT_WEBP]
+    return None
+
+
+def mime_type_of(path):
+    with open(path, 'rb') as f:
+        return sniff_mime_type(f.read(16))
+
+
+class OutputFormat:
+    """생성 이미지 저장 형식
+
+    Imagen이 지원하는 형식(PNG/JPEG)은 API에 그 형식을 요청하고 받은 바이트를 그대로 저장한다.
+    WebP처럼 API가 지원하지 않는 형식만 받은 뒤 한 번 변환한다.
+    """
+
+    # Imagen output_mime_type으로 요청 가능한 형식
+    API_FORMATS = (FORMAT_PNG, FORMAT_JPEG)
+
+    def __init__(self, image_format=FORMAT_PNG, quality=90):
+        self.image_format = image_format if image_format in MIME_TYPES else FORMAT_PNG
+        self.quality = quality
+
+    @property
+    def mime_type(self):
+        return MIME_TYPES[self.image_format]
+
+    def request_config(self):
+        """GenerateImagesConfig에 추가할 출력 형식 설정"""
+        if self.image_format == FORMAT_JPEG:
+            return {'output_mime_type': self.mime_type, 'output_compression_quality': self.quality}
+        if self.image_format in self.API_FORMATS:
+            return {'output_mime_type': self.mime_type}
+        return {}
+
+    def encode(self, data, mime_type=None):
+        """API 응답 바이트 → (저장할 바이트, MIME 타입) (이미 원하는 형식이면 그대로)"""
+        mime_type = mime_type or sniff_mime_type(data)
+        if mime_type == self.mime_type:
+            return data, mime_type
+        with Image.open(BytesIO(data)) as image:
+            buffer = BytesIO()
+            if self.image_format == FORMAT_PNG:
+                image.save(buffer, 'PNG')
+            else:
+                image = image.convert('RGB')
+                image.save(buffer, 'JPEG' if self.image_format == FORMAT_JPEG else 'WEBP', quality=self.quality)
+        return buffer.getvalue(), self.mime_type
+
+
+_output_format = None
+_output_format_lock = threading.Lock()
+
+
+def get_output_format():
+    """프로세스 전역 이미지 저장 형식 (IMAGE_OUTPUT_FORMAT=png|jpeg|webp, IMAGE_OUTPUT_QUALITY)"""
+    global _output_format
+    with _output_format_lock:
+        if _output_format is None:
+            _output_format = OutputFormat(os.getenv('IMAGE_OUTPUT_FORMAT', FORMAT_PNG).lower(),
+                                          quality=int(os.getenv('IMAGE_OUTPUT_QUALITY', 90)))
+        return _output_format
+
+
+def remove_images(stem, keep=None):
+    """stem + 이미지 확장자 파일 삭제 (형식이 바뀐 이전 씬 이미지가 남아 잘못 읽히지 않도록)"""
+    for extension in IMAGE_EXTENSIONS:
+        path = stem + extension
+        if path != keep and os.path.exists(path):
+            os.remove(path)
+
+
+def find_image(stem):
+    """stem + 이미지 확장자 중 존재하는 파일 경로 (없으면 None)"""
+    for extension in IMAGE_EXTENSIONS:
+        if os.path.exists(stem + extension):
+            return stem + extension
+    return None
+
+
+def find_scene_image(folder, scene_number):
+    return find_image(os.path.join(folder, f"scene_{scene_number}"))
+
+
+def write_image(data, stem, mime_type=None):
+    """인코딩된 이미지 바이트를 재인코딩 없이 stem + 형식 확장자로 저장 → 경로"""
+    path = stem + EXTENSIONS.get(mime_type or sniff_mime_type(data), '.png')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    remove_images(stem, keep=path)
+    return path
+
+
+def save_generated_image(generated, stem, output_format=None):
+    """Imagen 응답 (바이트, MIME 타입)을 저장 형식에 맞춰 저장 → 경로"""
+    data, mime_type = (output_format or get_output_format()).encode(*generated)
+    return write_image(data, stem, mime_type)
+
+
+def copy_image(source_path, stem):
+    """이미지를 원본 형식 그대로 stem + 원본 확장자로 복사 → 경로"""
+    extension = os.path.splitext(source_path)[1].lower()
+    path = stem + (extension if extension in IMAGE_EXTENSIONS else '.png')
+    if os.path.abspath(path) != os.path.abspath(source_path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        shutil.copyfile(source_path, path)
+    remove_images(stem, keep=path)
+    return path
+
+
+def ensure_png(path):
+    """PNG가 꼭 필요한 곳에서만 호출 - PNG가 아니면 옆에 PNG 사본을 만들어 경로 반환 (이미 있으면 재사용)"""
+    if mime_type_of(path) == MIME_TYPES[FORMAT_PNG]:
+        return path
+    png_path = os.path.splitext(path)[0] + '.converted.png'
+    if not os.path.exists(png_path) or os.path.getmtime(png_path) < os.path.getmtime(path):
+        with Image.open(path) as image:
+            image.save(png_path, 'PNG')
+    return png_path
@@ -1,69 +1,209 @@
 ## logging
+import os
+import json
+import queue
+import atexit
 import logging
-from colorlog import ColoredFormatter
-import time
+import threading
 import functools
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from colorlog import ColoredFormatter
 
 APP_LOGGER_NAME = 'hnryu'
 
+# 실행 시간 로그에 함께 출력할 구간 속성
+CONTEXT_ATTRIBUTES = ('stage', 'scene_number', 'attempt')
+
+_listener = None
+_handlers = []  # 리스너가 출력하는 콘솔/파일 핸들러
+_init_lock = threading.Lock()
+_log_queue = queue.SimpleQueue()
+_queue_handler = QueueHandler(_log_queue)
+
+
+class SamplingFilter(logging.Filter):
+    """sample_key가 지정된 고빈도 로그를 key별로 일정 비율만 통과
+
+    WARNING 이상은 항상 통과한다.
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, 'sample_key', None)
+        if key is None or record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        if self.every == 0:
+            return False
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class SpanContextFilter(logging.Filter):
+    """호출 스레드의 tracing 구간 ID를 레코드에 기록"""
+
+    def filter(self, record):
+        from common.tracing import current_span
+        span = current_span()
+        record.trace_id = getattr(span, 'trace_id', None)
+        record.span_id = getattr(span, 'span_id', None)
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """JSON-lines 파일 출력 형식"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'func': record.funcName,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key in ('trace_id', 'span_id', 'sample_key'):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
 
 def init_logger(
         log_level=logging.INFO,
-        log_format=None
+        log_format=None,
+        log_file=None,
+        sample_rate=None,
+        force=False
 ):
+    """QueueHandler/QueueListener 기반 로거 초기화
 
-    if log_format is None:
-        log_format = (
-            '%(asctime)s - '
-            '%(name)s - '
-            '%(funcName)s - '
-            '%(log_color)s%(levelname)s - '
-            '%(message)s'
+    호출 스레드는 큐에 레코드만 넣고, 콘솔/파일 출력은 리스너 스레드에서 처리한다.
+    log_file(기본 LOG_FILE 환경 변수)을 지정하면 회전되는 JSON-lines 파일에도 기록한다.
+    sample_rate(기본 LOG_SAMPLE_RATE)는 sample_key가 붙은 고빈도 로그의 통과 비율이다.
+    이미 초기화되어 있으면 핸들러와 수준을 건드리지 않고 로거만 반환한다 (force=True면 재구성).
+    """
+    global _listener, _handlers
+
+    logger = logging.getLogger(APP_LOGGER_NAME)
+    with _init_lock:
+        if _listener is not None and not force:
+            return logger
+
+        if log_format is None:
+            log_format = (
+                '%(asctime)s - '
+                '%(name)s - '
+                '%(funcName)s - '
+                '%(log_color)s%(levelname)s - '
+                '%(message)s'
+            )
+        if log_file is None:
+            log_file = os.getenv('LOG_FILE')
+        if sample_rate is None:
+            sample_rate = float(os.getenv('LOG_SAMPLE_RATE', 1.0))
+
+        formatter = ColoredFormatter(
+            log_format,
+            reset=True,
+            log_colors={
+                'DEBUG': 'cyan',
+                'INFO': 'green',
+                'WARNING': 'yellow',
+                'ERROR': 'red',
+                'CRITICAL': 'bold_red',
+            }
         )
 
-    formatter = ColoredFormatter(
-        log_format,
-        reset=True,
-        log_colors={
-            'DEBUG': 'cyan',
-            'INFO': 'green',
-            'WARNING': 'yellow',
-            'ERROR': 'red',
-            'CRITICAL': 'bold_red',
-        }
-    )
+        # 콘솔 출력 설정
+        ch = logging.StreamHandler()
+        ch.setFormatter(formatter)
+        ch.setLevel(log_level)
+        handlers = [ch]
 
-    logger = logging.getLogger(APP_LOGGER_NAME)
-    logger.setLevel(log_level)
+        # JSON-lines 파일 출력 설정 (크기 기준 회전)
+        if log_file:
+            directory = os.path.dirname(log_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fh = RotatingFileHandler(
+                log_file,
+                maxBytes=int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+                backupCount=int(os.getenv('LOG_BACKUP_COUNT', 5)),
+                encoding='utf-8',
+            )
+            fh.setFormatter(JsonLinesFormatter())
+            fh.setLevel(log_level)
+            handlers.append(fh)
 
-    # 기존 핸들러 제거
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
+        # 호출 스레드는 큐에 넣기만 한다. 큐와 QueueHandler는 재구성해도 유지하므로
+        # 리스너를 교체하는 사이에 들어온 레코드는 새 리스너가 출력한다.
+        if _queue_handler not in logger.handlers:
+            for handler in logger.handlers[:]:
+                logger.removeHandler(handler)
+            logger.addHandler(_queue_handler)
+        for log_filter in _queue_handler.filters[:]:
+            _queue_handler.removeFilter(log_filter)
+        _queue_handler.addFilter(SamplingFilter(sample_rate))
+        _queue_handler.addFilter(SpanContextFilter())
+        logger.setLevel(log_level)
+        logger.propagate = False
 
-    # 콘솔 출력 설정
-    ch = logging.StreamHandler()
-    ch.setFormatter(formatter)
-    ch.setLevel(log_level)
-    logger.addHandler(ch)
+        # 기존 리스너는 남은 레코드를 모두 출력한 뒤 종료하고, 파일 핸들러 등은 닫는다
+        _stop_listener()
+        _listener = QueueListener(_log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _handlers = handlers
 
     return logger
 
 
+def _stop_listener():
+    global _listener, _handlers
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in _handlers:
+        handler.close()
+    _handlers = []
+
+
+def shutdown_logger():
+    """큐에 남은 로그를 모두 출력하고 리스너 종료"""
+    with _init_lock:
+        _stop_listener()
+
+
+atexit.register(shutdown_logger)
+
+
 def is_initialized(logger_name):
     logger = logging.getLogger(logger_name)
     return len(logger.handlers) > 0
 
 
 def timefn(fn):
+    from common.tracing import get_tracer
 
     @functools.wraps(fn)
     def measure_time(*args, **kwargs):
         logger = logging.getLogger(APP_LOGGER_NAME)
-        start_time = time.time()
-        result = fn(*args, **kwargs)
-        end_time = time.time()
-        execution_time = end_time - start_time
-        logger.info(f"함수 {fn.__name__} 실행 시간: {execution_time:.2f}초")
+        with get_tracer().span(fn.__name__) as span:
+            result = fn(*args, **kwargs)
+        if logger.isEnabledFor(logging.INFO):
+            context = ', '.join(f"{key}={span.attributes[key]}" for key in CONTEXT_ATTRIBUTES
+                                if key in span.attributes)
+            logger.info(f"함수 {fn.__name__} 실행 시간: {span.duration:.3f}초" + (f" ({context})" if context else ""),
+                        extra={'sample_key': fn.__name__})
         return result
 
     return measure_time
@@ -0,0 +1,310 @@
+import os
+import math
+import time
+import atexit
+import threading
+from collections import deque
+
+# 성능 지표 패널에서 직접 내보낼 때의 기본 경로 (자동 저장은 METRICS_FILE 지정 시에만)
+DEFAULT_METRICS_FILE = './output/metrics.prom'
+
+
+class Counter:
+    """단조 증가 카운터"""
+    kind = 'counter'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """현재 값 (callback 지정 시 조회 시점에 계산)"""
+    kind = 'gauge'
+
+    def __init__(self, callback=None):
+        self._lock = threading.Lock()
+        self._value = 0
+        self.callback = callback
+
+    @property
+    def value(self):
+        if self.callback is not None:
+            try:
+                return self.callback()
+            except Exception:
+                return 0
+        return self._value
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Histogram:
+    """HDR 방식 로그-선형 버킷 히스토그램
+
+    2의 거듭제곱 구간마다 sub_buckets 개의 선형 버킷을 두어
+    값 범위와 무관하게 약 1/sub_buckets 의 상대 오차를 유지한다.
+    """
+    kind = 'histogram'
+
+    def __init__(self, sub_buckets=32):
+        self._lock = threading.Lock()
+        self.sub_buckets = sub_buckets
+        self.buckets = {}  # {bucket_index: count}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        exponent = math.floor(math.log2(value))
+        sub = int((value / 2 ** exponent - 1) * self.sub_buckets)
+        return exponent * self.sub_buckets + min(sub, self.sub_buckets - 1)
+
+    def _upper_bound(self, index):
+        exponent, sub = divmod(index, self.sub_buckets)
+        return 2 ** exponent * (1 + (sub + 1) / self.sub_buckets)
+
+    def record(self, value):
+        with self._lock:
+            if value <= 0:
+                self.zero_count += 1
+            else:
+                index = self._index(value)
+                self.buckets[index] = self.buckets.get(index, 0) + 1
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        """q(0~100) 분위 값 (버킷 상한 기준, 최댓값으로 제한)"""
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            rank = max(1, math.ceil(self.count * q / 100))
+            seen = self.zero_count
+            if seen >= rank:
+                return 0.0
+            for index in sorted(self.buckets):
+                seen += self.buckets[index]
+                if seen >= rank:
+                    return min(self._upper_bound(index), self.max)
+            return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def cumulative_buckets(self):
+        """Prometheus 형식 누적 버킷 [(상한, 누적 개수)]"""
+        with self._lock:
+            result = []
+            seen = self.zero_count
+            if self.zero_count:
+                result.append((0.0, seen))
+            for index in sorted(self.buckets):
+                seen += self.buckets[index]
+                result.append((self._upper_bound(index), seen))
+            return result
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.min or 0.0,
+            'max': self.max or 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+class Meter:
+    """최근 window 초 동안의 발생 빈도"""
+    kind = 'counter'
+
+    def __init__(self, window=60):
+        self._lock = threading.Lock()
+        self.window = window
+        self.value = 0
+        self._events = deque()
+
+    def mark(self, amount=1):
+        now = time.monotonic()
+        with self._lock:
+            self.value += amount
+            self._events.append((now, amount))
+            self._trim(now)
+
+    def _trim(self, now):
+        while self._events and now - self._events[0][0] > self.window:
+            self._events.popleft()
+
+    def rate_per_minute(self):
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            total = sum(amount for _, amount in self._events)
+        return total * 60 / self.window
+
+
+class MetricsRegistry:
+    """프로세스 내 메트릭 저장소"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # {(name, labels): metric}
+        self._help = {}
+
+    def _get(self, factory, name, help_text, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = factory(**kwargs)
+                self._metrics[key] = metric
+                if help_text:
+                    self._help[name] = help_text
+            return metric
+
+    def counter(self, name, help_text='', **labels):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text='', callback=None, **labels):
+        return self._get(Gauge, name, help_text, labels, callback=callback)
+
+    def histogram(self, name, help_text='', **labels):
+        return self._get(Histogram, name, help_text, labels)
+
+    def meter(self, name, help_text='', **labels):
+        return self._get(Meter, name, help_text, labels)
+
+    def collect(self, name=None):
+        """[(name, labels, metric)] 목록 반환"""
+        with self._lock:
+            items = list(self._metrics.items())
+        return [(n, dict(labels), metric) for (n, labels), metric in sorted(items, key=lambda x: x[0])
+                if name is None or n == name]
+
+    def value(self, name, **labels):
+        """카운터/게이지 값 조회 (없으면 0)"""
+        metric = self._metrics.get((name, tuple(sorted(labels.items()))))
+        return metric.value if metric is not None else 0
+
+    def record_span(self, span):
+        """종료된 tracing 구간을 메트릭으로 집계"""
+        name = span.name
+        attributes = span.attributes
+        seconds = span.duration
+
+        if name.startswith('_call_'):
+            self.histogram('gemini_request_seconds', 'Gemini API 호출 지연 시간', method=name).record(seconds)
+            for kind in ('prompt', 'output', 'cached'):
+                tokens = attributes.get(f'{kind}_tokens')
+                if tokens:
+                    self.counter('gemini_tokens_total', 'Gemini 토큰 사용량', method=name, kind=kind).inc(tokens)
+            if span.status == 'error':
+                self.counter('gemini_errors_total', 'Gemini API 호출 실패 수', method=name).inc()
+                if is_rate_limit_error(span.error):
+                    self.counter('gemini_rate_limited_total', 'Gemini 429(RESOURCE_EXHAUSTED) 응답 수',
+                                 method=name).inc()
+        elif name.endswith('.call'):
+            retries = attributes.get('retry_count', 0)
+            if retries:
+                self.counter('gemini_retries_total', 'Gemini API 재시도 수',
+                             method=name[:-len('.call')]).inc(retries)
+        elif name.split('.')[0] in ('job', 'stage', 'scene'):
+            self.histogram('pipeline_span_seconds', '파이프라인 단계별 소요 시간', span=name).record(seconds)
+
+        if 'cache_hit' in attributes:
+            cache = attributes.get('cache', name)
+            if attributes['cache_hit']:
+                self.counter('cache_hits_total', '캐시 적중 수', cache=cache).inc()
+            else:
+                self.counter('cache_misses_total', '캐시 미적중 수', cache=cache).inc()
+
+        if span.status == 'ok':
+            if name in ('scene.image', 'job.regeneration'):
+                self.meter('images_generated_total', '생성된 이미지 수').mark()
+            elif name == 'scene.validate':
+                self.meter('scenes_validated_total', '검증된 씬 수').mark()
+
+    def to_prometheus(self):
+        """Prometheus text exposition 형식 문자열"""
+        lines = []
+        declared = set()
+        for name, labels, metric in self.collect():
+            if name not in declared:
+                declared.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+
+            if isinstance(metric, Histogram):
+                for upper, count in metric.cumulative_buckets():
+                    lines.append(f"{name}_bucket{_format_labels(labels, le=f'{upper:.6g}')} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {metric.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {metric.value}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=None):
+        """Prometheus 텍스트 파일로 저장 (원자적 교체, 경로가 없고 METRICS_FILE도 비어 있으면 저장 안 함)"""
+        path = path or os.getenv('METRICS_FILE')
+        if not path:
+            return None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+        return path
+
+
+def _format_labels(labels, **extra):
+    merged = dict(labels, **extra)
+    if not merged:
+        return ''
+    body = ','.join(f'{k}="{str(v)}"' for k, v in merged.items())
+    return '{' + body + '}'
+
+
+def is_rate_limit_error(message):
+    """429 / RESOURCE_EXHAUSTED 오류 여부"""
+    if not message:
+        return False
+    message = str(message)
+    return '429' in message or 'RESOURCE_EXHAUSTED' in message
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """프로세스 전역 메트릭 저장소 반환"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+            atexit.register(_registry.write_prometheus)
+        return _registry
@@ -0,0 +1,168 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+from common.logger import init_logger
+from common.tracing import get_tracer
+
+logger = init_logger()
+
+
+def normalize_caption(text):
+    """비교용 자막 정규화 (공백/문장부호 제거, 소문자)"""
+    return re.sub(r'[\W_]+', '', text or '').lower()
+
+
+def caption_coverage(expected, detected):
+    """기대 자막 글자 중 인식 결과에 순서대로 나타난 비율 (0~1)"""
+    expected, detected = normalize_caption(expected), normalize_caption(detected)
+    if not expected:
+        return 1.0
+    if expected in detected:
+        return 1.0
+    matcher = SequenceMatcher(None, expected, detected, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks()) / len(expected)
+
+
+class CaptionChecker:
+    """easyocr 기반 씬 자막 렌더링 점검
+
+    Reader는 프로세스에서 한 번만 로드해 재사용하고(warm_up으로 미리 로드 가능),
+    같은 크기의 이미지끼리 묶어 배치 추론한다. 인식 결과는 이미지 내용 해시로 캐시하므로
+    자막 문구만 바뀐 재검증이나 같은 이미지의 반복 검증은 OCR을 다시 하지 않는다.
+    """
+
+    def __init__(self, enabled=True, languages=('ko', 'en'), gpu=False, batch_size=8, threshold=0.8,
+                 cache_size=256):
+        self.enabled = enabled
+        self.languages = list(languages)
+        self.gpu = gpu
+        self.batch_size = batch_size
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self._reader = None
+        self._unavailable = None
+        self._load_lock = threading.Lock()
+        self._infer_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._cache = OrderedDict()  # {이미지 sha256: 인식된 텍스트}
+
+    @property
+    def available(self):
+        return self.enabled and self._unavailable is None
+
+    def reader(self):
+        """easyocr Reader (최초 호출 시 로드, 미설치/로드 실패 시 None)"""
+        with self._load_lock:
+            if self._reader is None and self._unavailable is None:
+                try:
+                    with get_tracer().span('ocr.load', languages=','.join(self.languages), gpu=self.gpu):
+                        import easyocr
+                        self._reader = easyocr.Reader(self.languages, gpu=self.gpu, verbose=False)
+                    logger.info(f"easyocr Reader 로드 완료 ({', '.join(self.languages)})")
+                except Exception as e:
+                    self._unavailable = str(e)
+                    logger.warning(f"easyocr를 사용할 수 없어 자막 점검을 건너뜀: {e}")
+            return self._reader
+
+    def warm_up(self):
+        """백그라운드 스레드에서 Reader 미리 로드"""
+        if self.enabled and self._reader is None and self._unavailable is None:
+            threading.Thread(target=self.reader, name='ocr-warmup', daemon=True).start()
+
+    @staticmethod
+    def image_hash(image_path):
+        with open(image_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def _cached(self, key):
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _store(self, key, text):
+        with self._cache_lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def recognize(self, image_paths):
+        """{이미지 경로: 인식된 텍스트} (캐시에 없는 이미지만 크기별로 묶어 배치 추론)"""
+        import numpy as np
+        from PIL import Image
+
+        hashes = {path: self.image_hash(path) for path in image_paths}
+        texts = {}
+        groups = {}  # {(높이, 너비): [(경로, BGR 배열)]}
+        for path, key in hashes.items():
+            cached = self._cached(key)
+            if cached is not None:
+                texts[path] = cached
+                continue
+            with Image.open(path) as image:
+                array = np.asarray(image.convert('RGB'))[:, :, ::-1]
+            groups.setdefault(array.shape[:2], []).append((path, np.ascontiguousarray(array)))
+
+        with get_tracer().span('ocr.recognize', cache='ocr', cache_hit=not groups,
+                               images=len(image_paths), cached=len(texts)):
+            reader = self.reader() if groups else None
+            for items in groups.values():
+                if reader is None:
+                    break
+                with self._infer_lock:
+                    results = reader.readtext_batched([array for _, array in items],
+                                                      batch_size=self.batch_size, detail=0)
+                for (path, _), lines in zip(items, results):
+                    text = ' '.join(lines)
+                    self._store(hashes[path], text)
+                    texts[path] = text
+        return texts
+
+    def check(self, items):
+        """[(씬 번호, 이미지 경로, 기대 자막)] → {씬 번호: 점검 결과} (사용 불가 시 빈 dict)"""
+        items = [(scene_number, path, expected) for scene_number, path, expected in items
+                 if normalize_caption(expected) and path and os.path.exists(path)]
+        if not self.enabled or not items:
+            return {}
+
+        texts = self.recognize([path for _, path, _ in items])
+        if self._unavailable is not None:
+            return {}
+
+        results = {}
+        for scene_number, path, expected in items:
+            detected = texts.get(path, '')
+            coverage = caption_coverage(expected, detected)
+            results[scene_number] = {
+                'expected': expected,
+                'detected': detected,
+                'coverage': round(coverage, 2),
+                'passed': coverage >= self.threshold,
+            }
+        return results
+
+
+_checker = None
+_checker_lock = threading.Lock()
+
+
+def get_caption_checker():
+    """프로세스 전역 자막 점검기 반환"""
+    global _checker
+    with _checker_lock:
+        if _checker is None:
+            _checker = CaptionChecker(
+                # OCR_CAPTION_CHECK=0 이면 자막 점검 비활성화
+                enabled=os.getenv('OCR_CAPTION_CHECK', '1') == '1',
+                languages=os.getenv('OCR_LANGUAGES', 'ko,en').split(','),
+                gpu=os.getenv('OCR_GPU', '0') == '1',
+                batch_size=int(os.getenv('OCR_BATCH_SIZE', 8)),
+                threshold=float(os.getenv('OCR_CAPTION_THRESHOLD', 0.8)),
+            )
+        return _checker
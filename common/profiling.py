@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import atexit
+import pstats
+import cProfile
+import functools
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from common.logger import init_logger
+
+logger = init_logger()
+
+# PROFILE_STAGES=1 이면 시작 시점부터 단계별 프로파일링 활성화
+PROFILE_ENV = 'PROFILE_STAGES'
+DEFAULT_PROFILE_DIR = './output/profiles'
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold_stack(frame):
+    """프레임 체인을 flamegraph collapsed-stack 한 줄 형식으로 변환"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """등록된 스레드의 호출 스택을 주기적으로 수집하는 wall-clock 샘플러
+
+    cProfile은 CPU 작업과 네트워크 대기를 구분하기 어려우므로,
+    대기 중인 스택도 함께 잡히는 샘플링 결과를 flamegraph로 남긴다.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets = {}  # {thread ident: Counter}
+        self._thread = None
+
+    def register(self, ident, counter):
+        with self._lock:
+            self._targets[ident] = counter
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def unregister(self, ident):
+        with self._lock:
+            self._targets.pop(ident, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                targets = list(self._targets.items())
+            frames = sys._current_frames()
+            for ident, counter in targets:
+                frame = frames.get(ident)
+                if frame is not None:
+                    counter[fold_stack(frame)] += 1
+
+
+class StageProfile:
+    """단계 하나의 누적 프로파일 (여러 스레드/호출 합산)"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.stats = None
+        self.folded = Counter()
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def add(self, profile, folded, wall_seconds, cpu_seconds):
+        if profile is not None:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+        self.folded.update(folded)
+        self.calls += 1
+        self.wall_seconds += wall_seconds
+        self.cpu_seconds += cpu_seconds
+
+    def summary(self):
+        return {
+            'calls': self.calls,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            # 1에 가까울수록 CPU 작업, 0에 가까울수록 네트워크/IO 대기
+            'cpu_ratio': round(self.cpu_seconds / self.wall_seconds, 3) if self.wall_seconds else 0.0,
+            'samples': sum(self.folded.values()),
+        }
+
+
+class StageProfiler:
+    """세션/단계별 cProfile + 스택 샘플링 수집기"""
+
+    def __init__(self, enabled=False, sample_interval=0.005):
+        self.enabled = enabled
+        self.sampler = StackSampler(sample_interval)
+        self._lock = threading.Lock()
+        self._profiles = {}  # {(session_id, stage): StageProfile}
+        self._local = threading.local()
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        logger.info(f"단계별 프로파일링 {'활성화' if enabled else '비활성화'}")
+
+    @contextmanager
+    def stage(self, stage, session_id=None):
+        """구간 실행을 프로파일링 (비활성화 상태이거나 같은 스레드에서 중첩되면 그대로 실행)"""
+        if not self.enabled or getattr(self._local, 'active', False):
+            yield
+            return
+
+        self._local.active = True
+        ident = threading.get_ident()
+        folded = Counter()
+        profile = cProfile.Profile()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        self.sampler.register(ident, folded)
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ 에서는 cProfile이 동시에 하나만 활성화되므로 샘플링만 수행
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            self.sampler.unregister(ident)
+            wall_seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.thread_time() - cpu_start
+            self._local.active = False
+            with self._lock:
+                record = self._profiles.setdefault((session_id, stage), StageProfile(stage))
+                record.add(profile, folded, wall_seconds, cpu_seconds)
+
+    def sessions(self):
+        with self._lock:
+            return sorted({session_id for session_id, _ in self._profiles}, key=str)
+
+    def write(self, folder, session_id=None):
+        """세션의 단계별 .pstats / .folded 파일과 요약 JSON 저장 후 수집 내역 비우기"""
+        with self._lock:
+            keys = [key for key in self._profiles if key[0] == session_id]
+            records = [self._profiles.pop(key) for key in keys]
+        if not records:
+            return []
+
+        os.makedirs(folder, exist_ok=True)
+        written = []
+        summary = {}
+        for record in records:
+            if record.stats is not None:
+                path = os.path.join(folder, f"{record.stage}.pstats")
+                record.stats.dump_stats(path)
+                written.append(path)
+            # flamegraph.pl / speedscope 에서 바로 읽을 수 있는 collapsed-stack 형식
+            path = os.path.join(folder, f"{record.stage}.folded")
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in record.folded.most_common():
+                    f.write(f"{stack} {count}\n")
+            written.append(path)
+            summary[record.stage] = record.summary()
+
+        path = os.path.join(folder, 'profile_summary.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'session_id': session_id, 'stages': summary}, f, ensure_ascii=False, indent=2)
+        written.append(path)
+        logger.info(f"프로파일 저장: {folder}")
+        return written
+
+    def flush(self):
+        """저장되지 않은 세션 프로파일을 기본 폴더에 저장"""
+        for session_id in self.sessions():
+            try:
+                self.write(os.path.join(os.getenv('PROFILE_DIR', DEFAULT_PROFILE_DIR), str(session_id)), session_id)
+            except Exception as e:
+                logger.error(f"프로파일 저장 실패: {str(e)}")
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """프로세스 전역 프로파일러 반환"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = StageProfiler(
+                enabled=os.getenv(PROFILE_ENV, '').lower() in ('1', 'true', 'yes'),
+                sample_interval=float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005)),
+            )
+            atexit.register(_profiler.flush)
+        return _profiler
+
+
+def profiled(stage):
+    """메서드 실행을 단계 프로파일로 기록 (self.session_id 기준으로 묶음)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            with get_profiler().stage(stage, getattr(self, 'session_id', None)):
+                return fn(self, *args, **kwargs)
+        return wrapper
+    return decorator
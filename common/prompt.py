@@ -1,7 +1,7 @@
-class AppPrompt:
-    def __init__(self):
-        print("AppPrompt")
+import json
+
 
+class AppPrompt:
     def create_plot_prompt(self, data):
         """폼 데이터를 기반으로 프롬프트 생성"""
         prompt = f"""
@@ -75,9 +75,6 @@ class AppPrompt:
 
 
 class StoryPrompt:
-    def __init__(self):
-        print("StoryPrompt")
-
     def description_prompt(self):
         """각 scene 별 description 생성"""
         return """
@@ -123,15 +120,18 @@ class StoryPrompt:
                 }}
         """
 
-    def for_improve_prompt(self, generate_image_prompt):
-        """개선된 프롬프트 생성을 위한 프롬프트"""
-        return f"""
+    def for_improve_prompt(self, generate_image_prompt, evaluation=None):
+        """개선된 프롬프트 생성을 위한 프롬프트 (evaluation: 기준별 {'점수', '평가 이유', '개선점'})"""
+        prompt = f"""
             기존 프롬프트: {generate_image_prompt}
             아래는 위 프롬프트로 생성된 장면에 대한 평가 결과입니다. 제공해주신 평가 기준(메시지 전달력, 창의성 및 독창성, 브랜드/제품 적합성)을 바탕으로 프롬프트를 개선합니다.
             - '점수'가 3점 이상인 경우는 '평가 이유'를 유지하는 방향으로 수정해주세요.
             - '점수'가 2점 이하인 경우는 '평가 이유'와 '개선점'을 반영하여 수정해주세요. 
             위의 요구사항을 반영하여 더 나은 scene 이미지 생성을 위한 프롬프트를 텍스트로 출력해주세요.
           """
+        if evaluation:
+            prompt += f"\n            평가 결과: {json.dumps(evaluation, ensure_ascii=False)}\n"
+        return prompt
 
 
     def image_prompt(self, data):
@@ -141,11 +141,27 @@ class StoryPrompt:
             위 장면에 대한 광고 스케치 이미지를 생성해주세요.
         """
 
+    def video_prompt(self, data):
+        """씬 영상 생성을 위한 프롬프트 (씬 이미지를 첫 프레임으로 사용)"""
+        return f"""
+            {data['visual']}{data['description']}
+            음향: {data.get('audio', '')}
+            위 장면을 광고 영상의 한 컷으로 자연스럽게 움직이도록 만들어주세요.
+        """
+
+    def storyboard_video_prompt(self, storyboard):
+        """스토리보드 전체를 한 편의 영상으로 생성하기 위한 프롬프트"""
+        scenes = '\n'.join(f"            {i}. {scene['visual']} {scene['description']}"
+                            for i, scene in enumerate(storyboard.get('scenes', []), 1))
+        return f"""
+            광고 제목: {storyboard.get('title', '')}
+            분위기: {', '.join(storyboard.get('mood', []))}
+            아래 장면 순서대로 이어지는 광고 영상을 만들어주세요.
+{scenes}
+        """
 
-class ValidPrompt:
-    def __init__(self):
-        print("ValidPrompt")
 
+class ValidPrompt:
     def create_validation_prompt(self, scene_data):
         """검증 프롬프트 생성"""
         return f"""
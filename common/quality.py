@@ -0,0 +1,254 @@
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+from common.logger import init_logger
+from common.tracing import get_tracer
+
+logger = init_logger()
+
+ISSUE_BLANK = '빈 이미지'
+ISSUE_LOW_CONTRAST = '대비 부족'
+ISSUE_BLURRY = '흐림'
+ISSUE_COLORLESS = '색감 부족'
+ISSUE_DUPLICATE = '중복 이미지'
+
+
+def load_gray(image_path, max_side=512):
+    """(RGB float32 배열, 회색조 float32 배열) (0~255, 긴 변을 max_side 이하로 축소)"""
+    with Image.open(image_path) as image:
+        image = image.convert('RGB')
+        image.thumbnail((max_side, max_side), Image.BILINEAR)
+        rgb = np.asarray(image, dtype=np.float32)
+    gray = rgb @ np.array([0.299, 0.587, 0.114], np.float32)
+    return rgb, gray
+
+
+def laplacian_variance(gray):
+    """선명도 (라플라시안 응답의 분산, 작을수록 흐림)"""
+    from skimage.filters import laplace
+    return float(laplace(gray, ksize=3).var())
+
+
+def entropy(gray):
+    """회색조 히스토그램 엔트로피(bit, 0~8, 작을수록 단조로운 이미지)"""
+    counts = np.bincount(gray.astype(np.uint8).ravel(), minlength=256)
+    p = counts[counts > 0] / gray.size
+    return float(abs((p * np.log2(p)).sum()))
+
+
+def colorfulness(rgb):
+    """Hasler-Süsstrunk colorfulness (0에 가까울수록 무채색)"""
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    rg = r - g
+    yb = 0.5 * (r + g) - b
+    return float(np.hypot(rg.std(), yb.std()) + 0.3 * np.hypot(rg.mean(), yb.mean()))
+
+
+def dhash(gray, size=8):
+    """difference hash (size*size 비트 정수)"""
+    small = np.asarray(Image.fromarray(gray.astype(np.uint8)).resize((size + 1, size), Image.BILINEAR),
+                       dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).tobytes().hex(), 16)
+
+
+def phash(gray, size=32):
+    """DCT perceptual hash (64비트 정수)"""
+    from scipy.fft import dctn
+    small = np.asarray(Image.fromarray(gray.astype(np.uint8)).resize((size, size), Image.BILINEAR), np.float32)
+    low = dctn(small, norm='ortho')[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).tobytes().hex(), 16)
+
+
+def image_hashes(image_path):
+    """(pHash, dHash) - 크기/압축이 달라도 같은 이미지는 가까운 값"""
+    _, gray = load_gray(image_path, max_side=256)
+    return phash(gray), dhash(gray)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class QualityGate:
+    """LLM 검증 전에 명백히 잘못된 이미지(빈 화면, 저대비, 심한 흐림, 다른 씬과 중복)를 걸러내는 로컬 점검
+
+    지표는 긴 변 512px로 축소한 이미지에서 NumPy 벡터 연산으로 계산하며, 임계값 0은 해당 점검을 끈다.
+    스케치 이미지는 무채색일 수 있으므로 색감 점검은 기본적으로 꺼져 있다.
+    """
+
+    def __init__(self, enabled=True, min_entropy=1.0, min_contrast=8.0, min_sharpness=5.0,
+                 min_colorfulness=0.0, duplicate_distance=4, auto_regenerate=False):
+        self.enabled = enabled
+        self.min_entropy = min_entropy
+        self.min_contrast = min_contrast
+        self.min_sharpness = min_sharpness
+        self.min_colorfulness = min_colorfulness
+        self.duplicate_distance = duplicate_distance
+        self.auto_regenerate = auto_regenerate
+
+    def measure(self, image_path):
+        """이미지 품질 지표"""
+        rgb, gray = load_gray(image_path)
+        return {
+            'sharpness': round(laplacian_variance(gray), 2),
+            'entropy': round(entropy(gray), 3),
+            'contrast': round(float(gray.std()), 2),
+            'colorfulness': round(colorfulness(rgb), 2),
+            'dhash': dhash(gray),
+        }
+
+    def issues(self, metrics):
+        """임계값을 벗어난 항목 목록"""
+        # 흰 배경의 선화 스케치는 엔트로피가 낮아도 대비가 높으므로, 대비가 부족할 때만 빈 이미지로 판단
+        found = []
+        if self.min_contrast and metrics['contrast'] < self.min_contrast:
+            found.append(ISSUE_BLANK if metrics['entropy'] < self.min_entropy else ISSUE_LOW_CONTRAST)
+        elif self.min_sharpness and metrics['sharpness'] < self.min_sharpness:
+            found.append(ISSUE_BLURRY)
+        if self.min_colorfulness and metrics['colorfulness'] < self.min_colorfulness:
+            found.append(ISSUE_COLORLESS)
+        return found
+
+    def check(self, items):
+        """[(씬 번호, 이미지 경로)] → {씬 번호: {'passed', 'issues', 'metrics', 'duplicate_of'}}
+
+        중복은 앞선 씬과 dHash 해밍 거리가 duplicate_distance 이하인 뒤쪽 씬에 표시한다.
+        """
+        if not self.enabled:
+            return {}
+
+        reports = {}
+        hashes = []  # [(씬 번호, dhash)]
+        with get_tracer().span('quality.check', images=len(items)) as span:
+            for scene_number, image_path in items:
+                if not image_path or not os.path.exists(image_path):
+                    continue
+                try:
+                    metrics = self.measure(image_path)
+                except Exception as e:
+                    logger.warning(f"Scene #{scene_number} 품질 점검 실패: {e}")
+                    continue
+
+                issues = self.issues(metrics)
+                duplicate_of = None
+                if self.duplicate_distance and ISSUE_BLANK not in issues:
+                    for other_number, other_hash in hashes:
+                        if hamming(metrics['dhash'], other_hash) <= self.duplicate_distance:
+                            duplicate_of = other_number
+                            issues.append(ISSUE_DUPLICATE)
+                            break
+                hashes.append((scene_number, metrics['dhash']))
+                metrics['dhash'] = f"{metrics['dhash']:016x}"
+                reports[scene_number] = {'passed': not issues, 'issues': issues, 'metrics': metrics,
+                                         'duplicate_of': duplicate_of}
+            span.set_attribute('rejected', sum(1 for report in reports.values() if not report['passed']))
+        return reports
+
+    @staticmethod
+    def describe(report):
+        """사용자 표시용 문구"""
+        issues = [f"{issue} (Scene #{report['duplicate_of']})" if issue == ISSUE_DUPLICATE else issue
+                  for issue in report['issues']]
+        return ', '.join(issues)
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_quality_gate():
+    """프로세스 전역 품질 점검기 반환 (QUALITY_* 환경 변수로 임계값 조정)"""
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            _gate = QualityGate(
+                # QUALITY_GATE=0 이면 모든 이미지를 그대로 LLM 검증
+                enabled=os.getenv('QUALITY_GATE', '1') == '1',
+                min_entropy=float(os.getenv('QUALITY_MIN_ENTROPY', 1.0)),
+                min_contrast=float(os.getenv('QUALITY_MIN_CONTRAST', 8.0)),
+                min_sharpness=float(os.getenv('QUALITY_MIN_SHARPNESS', 5.0)),
+                min_colorfulness=float(os.getenv('QUALITY_MIN_COLORFULNESS', 0.0)),
+                duplicate_distance=int(os.getenv('QUALITY_DUPLICATE_DISTANCE', 4)),
+                # QUALITY_AUTO_REGENERATE=1 이면 걸러진 씬을 바로 재생성
+                auto_regenerate=os.getenv('QUALITY_AUTO_REGENERATE', '0') == '1',
+            )
+        return _gate
+
+
+def consistency_features(image_path, size=64, bins=4):
+    """(RGB 히스토그램(bins^3, 합 1), pHash 비트(64,)) - 씬 간 스타일 비교용 저비용 특징"""
+    from scipy.fft import dctn
+    with Image.open(image_path) as image:
+        image.draft('RGB', (size * 4, size * 4))
+        small = np.asarray(image.convert('RGB').resize((size, size), Image.BILINEAR))
+    quantized = (small // (256 // bins)).astype(np.int32)
+    index = (quantized[..., 0] * bins + quantized[..., 1]) * bins + quantized[..., 2]
+    histogram = np.bincount(index.ravel(), minlength=bins ** 3).astype(np.float32) / index.size
+
+    gray = small[::2, ::2] @ np.array([0.299, 0.587, 0.114], np.float32)
+    low = dctn(gray, norm='ortho')[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return histogram, bits
+
+
+def similarity_matrix(histograms, bits, hash_weight=0.3):
+    """씬×씬 유사도 행렬 (히스토그램 교집합과 pHash 해밍 유사도의 가중 평균, 0~1)
+
+    histograms: (n, b) / bits: (n, 64) bool
+    """
+    histograms = np.asarray(histograms, np.float32)
+    bits = np.asarray(bits, np.float32)
+    histogram_similarity = np.minimum(histograms[:, None, :], histograms[None, :, :]).sum(axis=2)
+    distance = bits @ (1 - bits).T + (1 - bits) @ bits.T
+    hash_similarity = 1 - distance / bits.shape[1]
+    return (1 - hash_weight) * histogram_similarity + hash_weight * hash_similarity
+
+
+def find_outliers(matrix, z_threshold=2.5, min_gap=0.05):
+    """다른 씬과의 평균 유사도가 전체 분포에서 크게 낮은 씬 인덱스 (median/MAD 기반)"""
+    n = len(matrix)
+    if n < 3:
+        return np.zeros(n, bool), np.ones(n, np.float32)
+    mean_similarity = (matrix.sum(axis=1) - np.diag(matrix)) / (n - 1)
+    median = np.median(mean_similarity)
+    mad = np.median(np.abs(mean_similarity - median)) * 1.4826
+    z = (mean_similarity - median) / max(mad, 1e-6)
+    return (z < -z_threshold) & (mean_similarity < median - min_gap), mean_similarity
+
+
+def check_consistency(items, hash_weight=0.3, z_threshold=2.5):
+    """[(씬 번호, 이미지 경로)] → {씬 번호: {'mean_similarity', 'outlier', 'most_different'}}"""
+    numbers, histograms, bits = [], [], []
+    for scene_number, image_path in items:
+        if not image_path or not os.path.exists(image_path):
+            continue
+        try:
+            histogram, hash_bits = consistency_features(image_path)
+        except Exception as e:
+            logger.warning(f"Scene #{scene_number} 일관성 특징 추출 실패: {e}")
+            continue
+        numbers.append(scene_number)
+        histograms.append(histogram)
+        bits.append(hash_bits)
+    if not numbers:
+        return {}
+
+    with get_tracer().span('quality.consistency', images=len(numbers)) as span:
+        matrix = similarity_matrix(histograms, bits, hash_weight)
+        outliers, mean_similarity = find_outliers(matrix, z_threshold)
+        others = matrix + np.eye(len(numbers)) * 2  # 자기 자신 제외
+        span.set_attribute('outliers', int(outliers.sum()))
+    return {
+        number: {
+            'mean_similarity': round(float(mean_similarity[i]), 3),
+            'outlier': bool(outliers[i]),
+            'most_different': numbers[int(others[i].argmin())] if len(numbers) > 1 else None,
+            'similarities': {other: round(float(matrix[i, j]), 3) for j, other in enumerate(numbers) if j != i},
+        }
+        for i, number in enumerate(numbers)
+    }
@@ -0,0 +1,75 @@
+from typing import List
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+# 검증 평가 기준 (응답 JSON 키)
+SCORE_CRITERIA = ('메시지 전달력', '창의성 및 독창성', '브랜드/제품 적합성')
+
+
+class ResponseSchemaError(ValueError):
+    """응답이 요청한 response_schema와 맞지 않음"""
+
+
+class ResponseModel(BaseModel):
+    """Gemini JSON 응답 모델 공통 설정 (한글/공백 키는 alias로 매핑)"""
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class PlotResponse(ResponseModel):
+    plot: str
+
+
+class Scene(ResponseModel):
+    scene_number: int
+    duration: str
+    visual: str
+    audio: str
+    text: str
+    description: str
+
+
+class Storyboard(ResponseModel):
+    title: str
+    total_duration: str = Field(alias='total duration')
+    plot: List[str]
+    mood: List[str]
+    scenes: List[Scene]
+    key_messages: List[str]
+    call_to_action: str
+
+
+class StoryboardResponse(ResponseModel):
+    storyboard1: Storyboard
+
+
+class SceneDescription(ResponseModel):
+    scene_description: str
+
+
+class CriterionScore(ResponseModel):
+    score: int = Field(alias='점수', ge=0, le=5)
+    reason: str = Field(alias='평가 이유')
+    improvement: str = Field(alias='개선점')
+
+
+class ScoreResponse(ResponseModel):
+    message: CriterionScore = Field(alias='메시지 전달력')
+    creativity: CriterionScore = Field(alias='창의성 및 독창성')
+    brand_fit: CriterionScore = Field(alias='브랜드/제품 적합성')
+    total: int = Field(alias='총점', ge=0, le=15)
+
+    def criteria(self):
+        """{평가 기준: CriterionScore}"""
+        return dict(zip(SCORE_CRITERIA, (self.message, self.creativity, self.brand_fit)))
+
+
+class ImprovedPrompt(ResponseModel):
+    improved_prompt: str
+
+
+def parse_response(model, text):
+    """JSON 응답을 스키마 검증과 함께 파싱 (pydantic-core JSON 디코더 사용)"""
+    try:
+        return model.model_validate_json(text)
+    except ValidationError as e:
+        raise ResponseSchemaError(f"{model.__name__} 응답 형식 오류 ({e.error_count()}개 항목): {e.errors()[0]['msg']}") from e
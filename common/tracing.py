@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import functools
+import contextvars
+
+from common.logger import APP_LOGGER_NAME, CONTEXT_ATTRIBUTES
+
+SERVICE_NAME = 'veo3_content_poc'
+
+# 하위 구간으로 전파되는 속성
+INHERITED_ATTRIBUTES = ('session_id',) + CONTEXT_ATTRIBUTES
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """작업 단위 구간 (job → stage → scene → API attempt)"""
+
+    def __init__(self, tracer, name, parent=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes or {})
+        if parent:
+            # 상위 구간의 session/stage/scene/attempt 정보 상속
+            for key in INHERITED_ATTRIBUTES:
+                if key in parent.attributes:
+                    self.attributes.setdefault(key, parent.attributes[key])
+        self.status = 'ok'
+        self.error = None
+        self.start_unix_ns = time.time_ns()
+        self._start_perf_ns = time.perf_counter_ns()
+        self.duration_ns = None
+        self._token = None
+
+    @property
+    def duration(self):
+        """구간 길이(초), 종료 전이면 현재까지 경과 시간"""
+        if self.duration_ns is None:
+            return (time.perf_counter_ns() - self._start_perf_ns) / 1e9
+        return self.duration_ns / 1e9
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, key, value=1):
+        """숫자형 속성 누적"""
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def record_exception(self, e):
+        self.status = 'error'
+        self.error = f"{type(e).__name__}: {e}"
+
+    def end(self):
+        if self.duration_ns is not None:
+            return
+        self.duration_ns = time.perf_counter_ns() - self._start_perf_ns
+        self.tracer._on_end(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_exception(exc)
+        if self._token is not None:
+            _current_span.reset(self._token)
+            self._token = None
+        self.end()
+        return False
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'start_unix_ns': self.start_unix_ns,
+            'duration_ms': round(self.duration_ns / 1e6, 3) if self.duration_ns is not None else None,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+class _NoopSpan:
+    """현재 구간이 없을 때 사용되는 빈 구간"""
+    name = None
+    attributes = {}
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def add(self, key, value=1):
+        pass
+
+    def record_exception(self, e):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonlSpanExporter:
+    """종료된 구간을 JSONL 파일로 기록 (max_bytes를 넘으면 path.1, path.2, ... 로 회전)"""
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, backup_count=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def export(self, spans):
+        if self.max_bytes > 0 and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + '\n')
+
+
+class OtlpHttpSpanExporter:
+    """OTLP/HTTP(JSON) 호환 수집기로 구간 전송"""
+
+    def __init__(self, endpoint, timeout=5):
+        self.endpoint = endpoint.rstrip('/')
+        if not self.endpoint.endswith('/v1/traces'):
+            self.endpoint += '/v1/traces'
+        self.timeout = timeout
+
+    @staticmethod
+    def _attribute(key, value):
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        return {'key': key, 'value': typed}
+
+    def _to_otlp(self, span):
+        otlp_span = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': 1,
+            'startTimeUnixNano': str(span.start_unix_ns),
+            'endTimeUnixNano': str(span.start_unix_ns + (span.duration_ns or 0)),
+            'attributes': [self._attribute(k, v) for k, v in span.attributes.items()],
+            'status': {'code': 2, 'message': span.error} if span.status == 'error' else {'code': 1},
+        }
+        if span.parent:
+            otlp_span['parentSpanId'] = span.parent.span_id
+        return otlp_span
+
+    def export(self, spans):
+        import requests
+
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [self._attribute('service.name', SERVICE_NAME)]},
+                'scopeSpans': [{
+                    'scope': {'name': 'common.tracing'},
+                    'spans': [self._to_otlp(span) for span in spans],
+                }],
+            }]
+        }
+        requests.post(self.endpoint, json=payload, timeout=self.timeout)
+
+
+class Tracer:
+    """중첩 구간을 생성하고 백그라운드 스레드에서 일괄 내보내기"""
+
+    def __init__(self, exporters=None, batch_size=64, flush_interval=2.0):
+        self.exporters = list(exporters or [])
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._listeners = []
+
+    @property
+    def enabled(self):
+        return bool(self.exporters or self._listeners)
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def add_listener(self, listener):
+        """구간 종료 시 호출될 콜백 등록 (메트릭 집계 등)"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def span(self, name, parent=None, **attributes):
+        """새 구간 생성 (parent 미지정 시 현재 구간의 하위 구간)"""
+        if parent is None:
+            parent = _current_span.get()
+        return Span(self, name, parent=parent, attributes=attributes)
+
+    def _on_end(self, span):
+        for listener in self._listeners:
+            try:
+                listener(span)
+            except Exception:
+                pass
+
+        if not self.exporters:
+            return
+        self._ensure_worker()
+        self._queue.put(span)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch):
+        for exporter in self.exporters:
+            try:
+                exporter.export(batch)
+            except Exception as e:
+                logging.getLogger(APP_LOGGER_NAME).warning(f"span 내보내기 실패 ({type(exporter).__name__}): {e}")
+
+    def flush(self):
+        """대기 중인 구간을 즉시 내보내기"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export(batch)
+
+
+def current_span():
+    """현재 실행 컨텍스트의 구간 (없으면 빈 구간)"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name=None, **attributes):
+    """함수 실행을 구간으로 기록하는 데코레이터"""
+
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(span_name, **attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """환경 변수 설정에 따라 구성된 전역 tracer 반환
+
+    TRACE_FILE: JSONL 출력 경로 (선택, 기본 비활성화)
+    TRACE_MAX_BYTES / TRACE_BACKUP_COUNT: JSONL 파일 회전 크기와 보관 개수 (기본 50MB, 3개)
+    OTLP_ENDPOINT: OTLP/HTTP 수집기 주소 (선택)
+    """
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            exporters = []
+            trace_file = os.getenv('TRACE_FILE')
+            if trace_file:
+                exporters.append(JsonlSpanExporter(
+                    trace_file,
+                    max_bytes=int(os.getenv('TRACE_MAX_BYTES', 50 * 1024 * 1024)),
+                    backup_count=int(os.getenv('TRACE_BACKUP_COUNT', 3)),
+                ))
+            otlp_endpoint = os.getenv('OTLP_ENDPOINT')
+            if otlp_endpoint:
+                exporters.append(OtlpHttpSpanExporter(otlp_endpoint))
+
+            _tracer = Tracer(exporters)
+            atexit.register(_tracer.flush)
+
+            # 구간 종료 시 메트릭/토큰 사용량 집계
+            from common.metrics import get_registry
+            from common.usage import get_ledger
+            _tracer.add_listener(get_registry().record_span)
+            _tracer.add_listener(get_ledger().record_span)
+        return _tracer
@@ -0,0 +1,115 @@
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+
+from PIL import Image
+
+from common.logger import init_logger
+from common.image_store import sniff_mime_type, MIME_TYPES, FORMAT_JPEG, FORMAT_WEBP, FORMAT_PNG
+
+logger = init_logger()
+
+
+class UploadProfile:
+    """멀티모달 요청에 보낼 이미지의 축소/재압축 설정
+
+    긴 변을 max_edge 이하로 줄이고 JPEG/WebP로 다시 인코딩해 업로드 바이트와 이미지 토큰을 줄인다.
+    변환 결과는 (원본 내용 해시, 설정) 기준으로 캐시하므로 같은 이미지를 여러 번 검증해도 한 번만 변환한다.
+    변환 결과가 원본보다 크면 원본을 그대로 보낸다.
+    """
+
+    def __init__(self, enabled=True, max_edge=1024, image_format=FORMAT_JPEG, quality=85, cache_size=128):
+        self.enabled = enabled
+        self.max_edge = max_edge
+        self.image_format = image_format if image_format in MIME_TYPES else FORMAT_JPEG
+        self.quality = quality
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # {(원본 sha256, 설정): (바이트, MIME 타입)}
+
+    @property
+    def key(self):
+        return f"{self.image_format}:{self.max_edge}:{self.quality}"
+
+    def _cached(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _store(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def encode(self, image):
+        """이미지(경로 또는 바이트) → (업로드할 바이트, MIME 타입)"""
+        if isinstance(image, (str, os.PathLike)):
+            with open(image, 'rb') as f:
+                original = f.read()
+        else:
+            original = bytes(image)
+        original_mime_type = sniff_mime_type(original)
+        if not self.enabled and original_mime_type:
+            return original, original_mime_type
+
+        key = (hashlib.sha256(original).hexdigest(), self.key)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        encoded = self._reencode(original)
+        if original_mime_type and len(original) <= len(encoded):
+            result = (original, original_mime_type)
+        else:
+            result = (encoded, MIME_TYPES[self.image_format])
+        self._store(key, result)
+        return result
+
+    def _reencode(self, data):
+        with Image.open(BytesIO(data)) as image:
+            # JPEG는 디코딩 단계에서 미리 축소해 변환 비용을 줄임
+            image.draft('RGB', (self.max_edge, self.max_edge))
+            if self.image_format == FORMAT_PNG:
+                image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            elif image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+                # 투명 배경은 흰 배경으로 합성 (JPEG/WebP 손실 압축 시 검은 배경 방지)
+                rgba = image.convert('RGBA')
+                image = Image.new('RGB', rgba.size, (255, 255, 255))
+                image.paste(rgba, mask=rgba.getchannel('A'))
+            else:
+                image = image.convert('RGB')
+            image.thumbnail((self.max_edge, self.max_edge), Image.BICUBIC)
+
+            buffer = BytesIO()
+            if self.image_format == FORMAT_JPEG:
+                image.save(buffer, 'JPEG', quality=self.quality)
+            elif self.image_format == FORMAT_WEBP:
+                image.save(buffer, 'WEBP', quality=self.quality, method=4)
+            else:
+                image.save(buffer, 'PNG', compress_level=6)
+        return buffer.getvalue()
+
+
+_profile = None
+_profile_lock = threading.Lock()
+
+
+def get_upload_profile():
+    """프로세스 전역 업로드 설정 반환 (UPLOAD_IMAGE_* 환경 변수)"""
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            _profile = UploadProfile(
+                # UPLOAD_IMAGE_PROFILE=0 이면 원본 이미지를 그대로 전송
+                enabled=os.getenv('UPLOAD_IMAGE_PROFILE', '1') == '1',
+                max_edge=int(os.getenv('UPLOAD_IMAGE_MAX_EDGE', 1024)),
+                image_format=os.getenv('UPLOAD_IMAGE_FORMAT', FORMAT_JPEG).lower(),
+                quality=int(os.getenv('UPLOAD_IMAGE_QUALITY', 85)),
+            )
+        return _profile
@@ -0,0 +1,117 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+# usage_metadata 필드 → 구간 속성 이름
+USAGE_FIELDS = {
+    'prompt_token_count': 'prompt_tokens',
+    'candidates_token_count': 'output_tokens',
+    'cached_content_token_count': 'cached_tokens',
+    'thoughts_token_count': 'thoughts_tokens',
+    'total_token_count': 'total_tokens',
+}
+TOKEN_KEYS = tuple(USAGE_FIELDS.values())
+
+
+def usage_from_response(response):
+    """Gemini 응답의 usage_metadata를 dict로 변환 (없으면 빈 dict)"""
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is None:
+        return {}
+    usage = {}
+    for field, key in USAGE_FIELDS.items():
+        value = getattr(metadata, field, None)
+        if value is not None:
+            usage[key] = value
+    return usage
+
+
+def _empty_totals():
+    totals = {key: 0 for key in TOKEN_KEYS}
+    totals['calls'] = 0
+    return totals
+
+
+def _accumulate(totals, usage):
+    for key in TOKEN_KEYS:
+        totals[key] += usage.get(key, 0) or 0
+    totals['calls'] += 1
+
+
+class UsageLedger:
+    """호출/단계/작업 단위 토큰 사용량 집계"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = []
+
+    def record_span(self, span):
+        """토큰 사용량이 기록된 API 호출 구간을 장부에 추가"""
+        attributes = span.attributes
+        if not any(key in attributes for key in TOKEN_KEYS):
+            return
+
+        root = span
+        while root.parent is not None:
+            root = root.parent
+
+        record = {
+            'method': span.name,
+            'model': attributes.get('model'),
+            'job': root.name,
+            'trace_id': span.trace_id,
+            'session_id': attributes.get('session_id'),
+            'stage': attributes.get('stage'),
+            'scene_number': attributes.get('scene_number'),
+            'duration_ms': round(span.duration * 1000, 1),
+        }
+        record.update({key: attributes.get(key, 0) for key in TOKEN_KEYS})
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self, session_id=None):
+        """전체/단계별/메서드별/작업별 합계"""
+        with self._lock:
+            records = [r for r in self.records if session_id is None or r['session_id'] == session_id]
+
+        total = _empty_totals()
+        by_stage, by_method, by_job = {}, {}, {}
+        for record in records:
+            _accumulate(total, record)
+            _accumulate(by_stage.setdefault(record['stage'] or 'unknown', _empty_totals()), record)
+            _accumulate(by_method.setdefault(record['method'], _empty_totals()), record)
+            _accumulate(by_job.setdefault(f"{record['job']}:{record['trace_id'][:8]}", _empty_totals()), record)
+
+        return {
+            'session_id': session_id,
+            'total': total,
+            'by_stage': by_stage,
+            'by_method': by_method,
+            'by_job': by_job,
+            'calls': records,
+        }
+
+    def write_report(self, path, session_id=None):
+        """토큰 사용량 보고서를 JSON으로 저장"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        report = self.summary(session_id)
+        report['created_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    """프로세스 전역 토큰 장부 반환"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger()
+        return _ledger
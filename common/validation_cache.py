@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import threading
+
+from common.logger import init_logger
+
+logger = init_logger()
+
+VALIDATION_CACHE_FILE = 'validation_cache.json'
+DEFAULT_SESSION_CACHE_DIR = './output/validation_cache'
+
+
+def cache_key(image_sha256, scene_hash, rubric_version, model):
+    return f"{image_sha256}:{scene_hash}:{rubric_version}:{model}"
+
+
+class ValidationCache:
+    """프로젝트별 씬 검증 결과 캐시 (JSON 파일)
+
+    키는 (이미지 바이트 해시, 씬 텍스트 해시, 루브릭 버전, 모델)이므로 이미지나 씬 내용, 평가 기준,
+    모델 중 하나라도 바뀐 씬만 다시 검증한다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # 파일 쓰기 직렬화 (늦게 찍은 스냅샷이 먼저 쓴 내용을 덮지 않도록)
+        self._entries = self._load(path)
+
+    @staticmethod
+    def _load(path):
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('entries', {})
+        except Exception as e:
+            logger.warning(f"검증 캐시를 읽을 수 없어 새로 시작: {path} ({e})")
+            return {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        return dict(entry['result']) if entry else None
+
+    def put(self, key, result):
+        with self._write_lock:
+            with self._lock:
+                self._entries[key] = {'result': result, 'created_at': time.time()}
+                entries = dict(self._entries)
+            self._write(self.path, entries)
+
+    @staticmethod
+    def _write(path, entries):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'entries': entries}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def save_as(self, path):
+        """다른 위치(프로젝트 폴더)의 캐시에 현재 항목을 합쳐 저장"""
+        with self._write_lock:
+            with self._lock:
+                entries = dict(self._entries)
+            merged = self._load(path)
+            merged.update(entries)
+            self._write(path, merged)
+        return path
+
+
+def cache_path_for(project_folder=None, session_id=None):
+    """프로젝트 폴더가 있으면 그 안에, 없으면 세션별 기본 위치에 캐시 저장"""
+    if project_folder:
+        return os.path.join(project_folder, VALIDATION_CACHE_FILE)
+    folder = os.getenv('VALIDATION_CACHE_DIR', DEFAULT_SESSION_CACHE_DIR)
+    return os.path.join(folder, f"{session_id or 'default'}.json")
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_validation_cache(path):
+    """경로별 캐시 인스턴스 (VALIDATION_CACHE=0 이면 None)"""
+    if os.getenv('VALIDATION_CACHE', '1') != '1' or not path:
+        return None
+    key = os.path.abspath(path)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ValidationCache(path)
+        return _caches[key]
@@ -0,0 +1,243 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from common.logger import init_logger
+from common.tracing import get_tracer
+
+logger = init_logger()
+
+# VideoJob.state
+STATE_PENDING = 'pending'
+STATE_SUBMITTING = 'submitting'
+STATE_RUNNING = 'running'
+STATE_DOWNLOADING = 'downloading'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+STATE_CANCELLED = 'cancelled'
+
+
+def _is_rate_limited(e):
+    return getattr(e, 'code', None) == 429 or 'RESOURCE_EXHAUSTED' in str(e)
+
+
+class VideoJob:
+    """영상 한 편(씬 또는 스토리보드 전체)의 생성 상태"""
+
+    def __init__(self, key, prompt, output_path, image=None, duration_seconds=None, scene_number=None):
+        self.key = key
+        self.prompt = prompt
+        self.output_path = output_path
+        self.image = image  # 첫 프레임으로 사용할 types.Image (없으면 text-to-video)
+        self.duration_seconds = duration_seconds
+        self.scene_number = scene_number
+        self.state = STATE_PENDING
+        self.operation = None
+        self.attempts = 0
+        self.polls = 0
+        self.poll_errors = 0
+        self.submitted_at = None
+        self.next_poll_at = None
+        self.interval = None
+        self.error = None
+        self.span = None
+
+
+class VeoScheduler:
+    """Veo long-running operation 스케줄러
+
+    - 동시에 진행 중인 operation 수를 max_concurrent 이하로 유지하며 제출하고,
+      429 응답을 받으면 한도를 현재 진행 수로 낮춘 뒤 잠시 제출을 멈춘다.
+    - 완료 예상 시각(최근 완료 시간의 이동 평균)에 맞춰 폴링 간격을 조절하고,
+      coalesce_window 안에 도래하는 상태 조회는 한 번에 묶어 병렬로 확인한다.
+    - 완료된 영상은 작업 스레드에서 파일로 스트리밍 저장한다.
+    """
+
+    def __init__(self, gemini, max_concurrent=8, min_poll=5.0, max_poll=20.0, expected_seconds=60.0,
+                 backoff=1.5, coalesce_window=2.0, workers=8, max_attempts=3):
+        self.gemini = gemini
+        self.max_concurrent = max_concurrent
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.expected_seconds = expected_seconds
+        self.backoff = backoff
+        self.coalesce_window = coalesce_window
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, gemini):
+        """VEO_* 환경 변수로 스케줄러 생성"""
+        return cls(
+            gemini,
+            max_concurrent=int(os.getenv('VEO_MAX_CONCURRENT', 8)),
+            min_poll=float(os.getenv('VEO_MIN_POLL_SECONDS', 5)),
+            max_poll=float(os.getenv('VEO_MAX_POLL_SECONDS', 20)),
+            expected_seconds=float(os.getenv('VEO_EXPECTED_SECONDS', 60)),
+            workers=int(os.getenv('VEO_WORKERS', 8)),
+        )
+
+    def _observe_duration(self, seconds):
+        """완료까지 걸린 시간을 반영해 예상 시간 갱신 (지수 이동 평균)"""
+        with self._lock:
+            self.expected_seconds = 0.7 * self.expected_seconds + 0.3 * seconds
+
+    def _schedule_poll(self, job, now):
+        """예상 완료 시각까지 남은 시간의 절반씩 다가가고, 지난 뒤에는 간격을 점차 늘림"""
+        remaining = self.expected_seconds - (now - job.submitted_at)
+        if remaining > 0:
+            interval = remaining / 2
+        else:
+            interval = (job.interval or self.min_poll) * self.backoff
+        job.interval = min(self.max_poll, max(self.min_poll, interval))
+        job.next_poll_at = now + job.interval
+
+    def _submit(self, job):
+        with get_tracer().span('video.submit', parent=job.span, attempt=job.attempts):
+            return self.gemini._call_veo_submit(job.prompt, image=job.image,
+                                                duration_seconds=job.duration_seconds)
+
+    def _poll(self, job):
+        return self.gemini._get_operation(job.operation)
+
+    def _download(self, job, video):
+        with get_tracer().span('video.download', parent=job.span):
+            return self.gemini._download_video(video, job.output_path)
+
+    def run(self, jobs, on_update=None, should_cancel=None, parent=None):
+        """모든 작업이 끝날 때까지 실행 (작업이 완료/실패할 때마다 on_update(job) 호출)"""
+        tracer = get_tracer()
+        pending = deque(jobs)
+        running = []      # 상태 조회 대상 operation
+        futures = {}      # {future: (kind, job)}
+        limit = self.max_concurrent
+        submit_after = 0.0
+        rate_limit_delay = self.min_poll
+
+        def finish(job, state, error=None):
+            job.state = state
+            job.error = error
+            if job.span is not None:
+                job.span.set_attributes(state=state, attempts=job.attempts, polls=job.polls)
+                if error:
+                    job.span.status = 'error'
+                    job.span.error = error
+                job.span.end()
+            if on_update:
+                on_update(job)
+
+        def retry_or_fail(job, error):
+            if job.attempts < self.max_attempts:
+                logger.warning(f"영상 생성 재시도 ({job.key}, {job.attempts}회 실패): {error}")
+                job.state = STATE_PENDING
+                pending.append(job)
+            else:
+                finish(job, STATE_FAILED, error)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='veo') as pool:
+            while pending or running or futures:
+                now = time.monotonic()
+                if should_cancel and should_cancel():
+                    # 진행 중인 operation은 서버에서 계속 실행되지만 더 이상 조회하지 않음
+                    for future in futures:
+                        future.cancel()
+                    for job in list(pending) + running + [job for _, job in futures.values()]:
+                        finish(job, STATE_CANCELLED)
+                    pending.clear()
+                    running.clear()
+                    futures.clear()
+                    break
+
+                # 1) 한도 안에서 제출
+                in_flight = len(running) + sum(1 for kind, _ in futures.values() if kind in ('submit', 'poll'))
+                while pending and in_flight < limit and now >= submit_after:
+                    job = pending.popleft()
+                    job.state = STATE_SUBMITTING
+                    job.attempts += 1
+                    if job.span is None:
+                        job.span = tracer.span('scene.video', parent=parent, stage='video',
+                                               scene_number=job.scene_number, video_key=job.key)
+                    futures[pool.submit(self._submit, job)] = ('submit', job)
+                    in_flight += 1
+
+                # 2) 도래한 상태 조회를 한 번에 묶어서 확인
+                due = [job for job in running if job.next_poll_at <= now + self.coalesce_window]
+                for job in due:
+                    running.remove(job)
+                    job.polls += 1
+                    futures[pool.submit(self._poll, job)] = ('poll', job)
+                if due:
+                    logger.debug(f"operation {len(due)}개 상태 조회 (진행 중 {len(running) + len(due)}개)")
+
+                # 3) 다음 폴링 시각 또는 작업 완료까지 대기
+                wake_at = min([job.next_poll_at for job in running] +
+                              ([submit_after] if pending and now < submit_after else []),
+                              default=now + 1.0)
+                timeout = min(1.0, max(0.0, wake_at - time.monotonic()))
+                if futures:
+                    done, _ = wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    done = set()
+                    time.sleep(timeout)
+
+                for future in done:
+                    kind, job = futures.pop(future)
+                    now = time.monotonic()
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if kind == 'submit' and _is_rate_limited(e):
+                            # 할당량 초과: 동시 한도를 낮추고 제출을 잠시 멈춤
+                            job.attempts -= 1
+                            job.state = STATE_PENDING
+                            pending.appendleft(job)
+                            limit = max(1, len(running))
+                            submit_after = now + rate_limit_delay
+                            logger.warning(f"Veo 할당량 초과: 동시 한도 {limit}개, {rate_limit_delay:.1f}초 후 재개")
+                            rate_limit_delay = min(self.max_poll * 3, rate_limit_delay * 2)
+                        elif kind == 'poll' and job.poll_errors < self.max_attempts:
+                            job.poll_errors += 1
+                            running.append(job)
+                            self._schedule_poll(job, now)
+                        elif kind == 'download':
+                            finish(job, STATE_FAILED, f"영상 저장 실패: {e}")
+                        else:
+                            retry_or_fail(job, str(e))
+                        continue
+
+                    if kind == 'submit':
+                        job.operation = result
+                        job.state = STATE_RUNNING
+                        job.submitted_at = now
+                        job.interval = None
+                        running.append(job)
+                        self._schedule_poll(job, now)
+                        rate_limit_delay = self.min_poll
+                    elif kind == 'poll':
+                        job.operation = result
+                        job.poll_errors = 0
+                        if not result.done:
+                            running.append(job)
+                            self._schedule_poll(job, now)
+                            continue
+                        self._observe_duration(now - job.submitted_at)
+                        limit = min(self.max_concurrent, limit + 1)  # 완료될 때마다 한도 회복
+                        if result.error:
+                            retry_or_fail(job, str(result.error.get('message', result.error)))
+                            continue
+                        response = result.response or result.result
+                        videos = response.generated_videos if response else None
+                        if not videos:
+                            # 안전 필터 등으로 영상이 만들어지지 않은 경우
+                            reasons = getattr(response, 'rai_media_filtered_reasons', None) if response else None
+                            finish(job, STATE_FAILED, f"생성된 영상 없음: {reasons or '알 수 없는 이유'}")
+                            continue
+                        job.state = STATE_DOWNLOADING
+                        futures[pool.submit(self._download, job, videos[0].video)] = ('download', job)
+                    else:
+                        finish(job, STATE_DONE)
+
+        return jobs
@@ -1,77 +1,27 @@
 import sys
-import json
+import uuid
+import hashlib
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QLineEdit, QTextEdit, QComboBox, QPushButton,
                              QScrollArea, QFrame, QMessageBox, QGroupBox, QFileDialog,
                              QProgressBar, QInputDialog)
-from PyQt5.QtCore import Qt, QSize, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QSize, QTimer, pyqtSignal
 from PyQt5.QtSvg import QSvgRenderer
 from PyQt5.QtGui import QIcon, QPixmap, QPainter,QFont
-from common.gemini import Gemini
-from common.prompt import AppPrompt
-from storyboard import StoryboardDialog
+from dotenv import load_dotenv
+from common.executor import BackgroundTask, PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_VALIDATION
+from common.tracing import get_tracer
+from common.profiling import profiled
+from metrics_panel import toggle_metrics_panel
 import os
 
 
 
-class ApiThread(QThread):
-    finished = pyqtSignal(object)
-    error = pyqtSignal(str)
-
-    def __init__(self, form_data):
-        super().__init__()
-        self.form_data = form_data
-
-    def run(self):
-        try:
-            gemini = Gemini()
-            # 전체 plot 생성
-            prompt = self.create_plot_prompt(self.form_data)
-            response = gemini._call_gemini_text(prompt)
-
-            # plot 기반 scene description 생성
-            prompt = self.create_storyboard_prompt(self.form_data, response)
-            response = gemini._call_gemini_text(prompt)
-            print(response)
-
-            # 스트림 응답 처리
-            storyboards = json.loads(response)
-            try:
-                self.finished.emit(storyboards)
-            except json.JSONDecodeError:
-                self.finished.emit({"raw_response": response})
-
-        except Exception as e:
-            self.error.emit(str(e))
-
-    def create_plot_prompt(self, data):
-        """폼 데이터를 기반으로 프롬프트 생성"""
-        prompt = f"""
-        아래의 [제품/광고목적/타겟]에 대한 광고 콘티에 대한 plot을 2~3줄 분량으로 작성해주세요.
-
-        제품명: {data['product_name']}
-        제품 설명: {data['product_description']}
-        톤 앤 매너: {data['tone_manner']}
-        """
-        return prompt
-
-    def create_storyboard_prompt(self, data, response):
-        """폼 데이터를 기반으로 프롬프트 생성"""
-        prompt = f"""
-        광고 plot: {response}
-        제품명: {data['product_name']}
-        제품 설명: {data['product_description']}
-        톤 앤 매너: {data['tone_manner']}
-        """
-
-        if not data['reference_files'] is None:
-            prompt += f"참고할 파일들: "
-            for i, file_info in enumerate(data['reference_files'], 1):
-                prompt += f"{i}. {file_info['파일설명']}: {file_info['파일명']}\n"
+# 스토리보드 생성 방식: two_call(plot → 스토리보드 순차 호출) | fused(한 번의 호출로 함께 생성)
+STORYBOARD_MODE_TWO_CALL = 'two_call'
+STORYBOARD_MODE_FUSED = 'fused'
 
-        prompt += """
-        - 위에서 입력받은 광고 plot 정보와 사용자 입력 기반으로 다음 JSON 구조에 맞춰 광고 스토리보드를 생성해 주세요.
-        - 스토리보드 전체 길이는 8초이며 스토리보드 내 8개의 scene이 존재하며 각 scene의 길이는 1초입니다.
+STORYBOARD_OUTPUT_FORMAT = """
         ** 출력 형식 **
         {
           "storyboard1":{
@@ -112,13 +62,167 @@ class ApiThread(QThread):
             }
         """
 
+
+class ApiThread(BackgroundTask):
+    """plot 및 스토리보드 생성 작업"""
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    priority = PRIORITY_BULK
+
+    def __init__(self, form_data, session_id=None, plot=None, mode=None):
+        super().__init__()
+        self.form_data = form_data
+        self.session_id = session_id
+        self.plot = plot  # 미리 생성된 plot이 있으면 plot 호출 생략
+        self.mode = mode or os.getenv('STORYBOARD_MODE', STORYBOARD_MODE_TWO_CALL)
+
+    @profiled('storyboard')
+    def run(self):
+        tracer = get_tracer()
+        try:
+            with tracer.span('job.storyboard', session_id=self.session_id, mode=self.mode,
+                             product_name=self.form_data['product_name']):
+                # google.genai 임포트가 무거우므로 첫 작업 시점에 로드
+                from common.gemini import Gemini
+                gemini = Gemini()
+                storyboards = self.generate_storyboard(gemini)
+
+            # 기존 JSON 키 구조(dict)로 전달
+            self.finished.emit(storyboards.model_dump(by_alias=True))
+
+        except Exception as e:
+            self.error.emit(str(e))
+
+    def generate_storyboard(self, gemini):
+        """설정된 방식으로 스토리보드 생성 (StoryboardResponse)"""
+        from common.schema import PlotResponse, StoryboardResponse
+        tracer = get_tracer()
+
+        # plot과 스토리보드를 한 번에 생성 (미리 생성된 plot이 있으면 two_call 경로가 더 빠름)
+        if self.mode == STORYBOARD_MODE_FUSED and self.plot is None:
+            with tracer.span('stage.storyboard', stage='storyboard', fused=True):
+                return gemini._call_gemini_text(self.create_fused_prompt(self.form_data),
+                                                response_schema=StoryboardResponse)
+
+        # 전체 plot 생성
+        with tracer.span('stage.plot', stage='plot', cache='plot', cache_hit=self.plot is not None):
+            plot = self.plot
+            if plot is None:
+                prompt = self.create_plot_prompt(self.form_data)
+                plot = gemini._call_gemini_text(prompt, response_schema=PlotResponse).plot
+
+        # plot 기반 scene description 생성
+        with tracer.span('stage.storyboard', stage='storyboard'):
+            prompt = self.create_storyboard_prompt(self.form_data, plot)
+            return gemini._call_gemini_text(prompt, response_schema=StoryboardResponse)
+
+    def plot_cache_key(self, data):
+        """plot 프롬프트 기준 입력 해시 (plot에 영향을 주는 입력만 반영)"""
+        return hashlib.sha256(self.create_plot_prompt(data).encode('utf-8')).hexdigest()
+
+    def create_plot_prompt(self, data):
+        """폼 데이터를 기반으로 프롬프트 생성"""
+        prompt = f"""
+        아래의 [제품/광고목적/타겟]에 대한 광고 콘티에 대한 plot을 2~3줄 분량으로 작성해주세요.
+
+        제품명: {data['product_name']}
+        제품 설명: {data['product_description']}
+        톤 앤 매너: {data['tone_manner']}
+        """
         return prompt
 
+    def create_storyboard_prompt(self, data, response):
+        """폼 데이터를 기반으로 프롬프트 생성"""
+        prompt = f"""
+        광고 plot: {response}
+        제품명: {data['product_name']}
+        제품 설명: {data['product_description']}
+        톤 앤 매너: {data['tone_manner']}
+        """
+        prompt += self.create_reference_prompt(data)
+        prompt += """
+        - 위에서 입력받은 광고 plot 정보와 사용자 입력 기반으로 다음 JSON 구조에 맞춰 광고 스토리보드를 생성해 주세요.
+        - 스토리보드 전체 길이는 8초이며 스토리보드 내 8개의 scene이 존재하며 각 scene의 길이는 1초입니다.
+        """
+        prompt += STORYBOARD_OUTPUT_FORMAT
+
+        return prompt
+
+    def create_fused_prompt(self, data):
+        """plot과 스토리보드를 한 번의 호출로 생성하는 프롬프트"""
+        prompt = f"""
+        아래의 [제품/광고목적/타겟]에 대한 광고 콘티를 작성해주세요.
+
+        제품명: {data['product_name']}
+        제품 설명: {data['product_description']}
+        톤 앤 매너: {data['tone_manner']}
+        """
+        prompt += self.create_reference_prompt(data)
+        prompt += """
+        - 먼저 광고 plot을 2~3줄 분량으로 구상하고, 이를 출력 형식의 "plot" 항목에 작성해 주세요.
+        - 구상한 plot과 사용자 입력 기반으로 다음 JSON 구조에 맞춰 광고 스토리보드를 생성해 주세요.
+        - 스토리보드 전체 길이는 8초이며 스토리보드 내 8개의 scene이 존재하며 각 scene의 길이는 1초입니다.
+        """
+        prompt += STORYBOARD_OUTPUT_FORMAT
+
+        return prompt
+
+    def create_reference_prompt(self, data):
+        """참고 파일 목록 프롬프트"""
+        prompt = ""
+        if not data['reference_files'] is None:
+            prompt += f"참고할 파일들: "
+            for i, file_info in enumerate(data['reference_files'], 1):
+                prompt += f"{i}. {file_info['파일설명']}: {file_info['파일명']}\n"
+        return prompt
+
+
+class PlotPrefetchThread(ApiThread):
+    """입력이 안정되면 plot만 미리 생성하는 추측 실행 작업 (가장 낮은 우선순위)"""
+    plot_ready = pyqtSignal(str, str)  # cache_key, plot
+    priority = PRIORITY_VALIDATION
+
+    def run(self):
+        try:
+            from common.gemini import Gemini
+            from common.schema import PlotResponse
+            key = self.plot_cache_key(self.form_data)
+            with get_tracer().span('job.plot_prefetch', stage='plot', speculative=True):
+                plot = Gemini()._call_gemini_text(self.create_plot_prompt(self.form_data),
+                                                  response_schema=PlotResponse).plot
+            if not self.cancelled:
+                self.plot_ready.emit(key, plot)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class WarmupThread(BackgroundTask):
+    """시작 시 Gemini client 생성 및 연결 예열"""
+    completed = pyqtSignal(dict)
+    priority = PRIORITY_INTERACTIVE
+
+    def run(self):
+        try:
+            from common.gemini import Gemini
+            gemini = Gemini()
+            # GEMINI_WARMUP=0: 예열 생략 / GEMINI_WARMUP_VALIDATE=1: API 키·모델 검증
+            if os.getenv('GEMINI_WARMUP', '1') == '0':
+                return
+            validate = os.getenv('GEMINI_WARMUP_VALIDATE', '0') == '1'
+            with get_tracer().span('job.warmup', validate=validate):
+                result = gemini.warm_up(validate=validate)
+            result['validate'] = validate
+            self.completed.emit(result)
+        except Exception as e:
+            self.completed.emit({'ok': False, 'validate': True, 'errors': {'client': str(e)}})
+
 
 class AdContentForm(QWidget):
     def __init__(self):
         super().__init__()
         self.init_ui()
+        self.init_plot_prefetch()
+        self.start_warmup()
 
     def init_ui(self):
         # self.setWindowTitle('pTBWA-PoC: CLOIT - 광고 콘텐츠 생성')
@@ -304,6 +408,10 @@ class AdContentForm(QWidget):
         self.clear_button.clicked.connect(self.clear_form)
         button_layout.addWidget(self.clear_button)
 
+        self.metrics_button = QPushButton('성능 지표')
+        self.metrics_button.clicked.connect(lambda: toggle_metrics_panel(self))
+        button_layout.addWidget(self.metrics_button)
+
         button_layout.addStretch()
 
         self.generate_button = QPushButton('스토리보드 생성')
@@ -334,6 +442,92 @@ class AdContentForm(QWidget):
 
         self.setLayout(main_layout)
 
+    def init_plot_prefetch(self):
+        """PLOT_PREFETCH=1 이면 입력이 멈춘 뒤 plot을 미리 생성 (디바운스)"""
+        load_dotenv()
+        self.plot_cache = {}  # {입력 해시: plot}
+        self.prefetch_key = None  # 생성 중인 plot의 입력 해시
+        self.prefetch_thread = None
+        self.pending_generation = None  # plot 완료를 기다리는 (form_data, key)
+        self.prefetch_enabled = os.getenv('PLOT_PREFETCH', '0') == '1'
+        if not self.prefetch_enabled:
+            return
+
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(int(os.getenv('PLOT_PREFETCH_DEBOUNCE_MS', 1500)))
+        self.prefetch_timer.timeout.connect(self.prefetch_plot)
+        # 입력이 바뀔 때마다 타이머를 다시 시작
+        self.product_name.textChanged.connect(lambda *_: self.prefetch_timer.start())
+        self.product_description.textChanged.connect(lambda *_: self.prefetch_timer.start())
+        self.tone_manner.currentTextChanged.connect(lambda *_: self.prefetch_timer.start())
+
+    def get_plot_inputs(self):
+        """plot 생성에 필요한 입력 (하나라도 비어 있으면 None)"""
+        data = {
+            "product_name": self.product_name.text().strip(),
+            "product_description": self.product_description.toPlainText().strip(),
+            "tone_manner": self.tone_manner.currentText(),
+        }
+        if not data['product_name'] or not data['product_description']:
+            return None
+        if not data['tone_manner'].strip() or data['tone_manner'] == "선택하세요":
+            return None
+        return data
+
+    def prefetch_plot(self):
+        """현재 입력으로 plot 미리 생성"""
+        form_data = self.get_plot_inputs()
+        if form_data is None:
+            return
+        thread = PlotPrefetchThread(form_data)
+        key = thread.plot_cache_key(form_data)
+        if key in self.plot_cache or key == self.prefetch_key:
+            return
+
+        self.prefetch_key = key
+        thread.plot_ready.connect(self.on_plot_prefetched)
+        thread.error.connect(lambda message, k=key: self.on_plot_prefetch_failed(k, message))
+        self.prefetch_thread = thread
+        thread.start()
+
+    def on_plot_prefetched(self, key, plot):
+        self.plot_cache[key] = plot
+        # 오래된 입력의 plot은 최근 8개만 유지
+        while len(self.plot_cache) > 8:
+            self.plot_cache.pop(next(iter(self.plot_cache)))
+        if self.prefetch_key == key:
+            self.prefetch_key = None
+
+        # 생성 버튼이 먼저 눌린 경우 바로 스토리보드 생성 시작
+        if self.pending_generation and self.pending_generation[1] == key:
+            form_data, _ = self.pending_generation
+            self.pending_generation = None
+            self.start_api_thread(form_data, plot)
+
+    def on_plot_prefetch_failed(self, key, message):
+        if self.prefetch_key == key:
+            self.prefetch_key = None
+        # 미리 생성이 실패하면 일반 경로로 진행
+        if self.pending_generation and self.pending_generation[1] == key:
+            form_data, _ = self.pending_generation
+            self.pending_generation = None
+            self.start_api_thread(form_data)
+
+    def start_warmup(self):
+        """첫 생성 요청이 client 생성/연결 비용을 치르지 않도록 백그라운드에서 예열"""
+        self.warmup_thread = WarmupThread()
+        self.warmup_thread.completed.connect(self.on_warmup_completed)
+        self.warmup_thread.start()
+
+    def on_warmup_completed(self, result):
+        """예열 결과 처리 (검증 모드에서만 실패를 알림)"""
+        if result.get('ok') or not result.get('validate'):
+            return
+        details = '\n'.join(f"- {name}: {error}" for name, error in result.get('errors', {}).items())
+        QMessageBox.warning(self, 'Gemini 연결 확인',
+                            f"API 키 또는 모델을 사용할 수 없습니다.\n{details}")
+
     def clear_form(self):
         """폼 초기화"""
         self.product_name.clear()
@@ -499,8 +693,21 @@ class AdContentForm(QWidget):
         self.generate_button.setEnabled(False)
         self.generate_button.setText('생성 중...')
 
-        # API 호출 스레드 시작
-        self.gemini = ApiThread(form_data)
+        # 미리 생성된 plot이 있으면 재사용, 생성 중이면 완료 후 시작
+        plot = None
+        if self.prefetch_enabled:
+            key = ApiThread(form_data).plot_cache_key(form_data)
+            plot = self.plot_cache.get(key)
+            if plot is None and self.prefetch_key == key:
+                self.pending_generation = (form_data, key)
+                return
+
+        self.start_api_thread(form_data, plot)
+
+    def start_api_thread(self, form_data, plot=None):
+        """API 호출 스레드 시작"""
+        self.session_id = uuid.uuid4().hex[:12]
+        self.gemini = ApiThread(form_data, self.session_id, plot=plot)
         self.gemini.finished.connect(self.on_storyboard_generated)
         self.gemini.error.connect(self.on_api_error)
         self.gemini.start()
@@ -511,8 +718,9 @@ class AdContentForm(QWidget):
         self.generate_button.setEnabled(True)
         self.generate_button.setText("스토리보드 생성")
 
-        # 스토리보드 결과 다이얼로그 표시
-        dialog = StoryboardDialog(storyboard_data, self)
+        # 스토리보드 결과 다이얼로그 표시 (대화상자 모듈은 Gemini/검증 모듈까지 함께 로드하므로 필요할 때 임포트)
+        from storyboard import StoryboardDialog
+        dialog = StoryboardDialog(storyboard_data, self, session_id=self.session_id)
         dialog.exec_()
 
     def on_api_error(self, error_message):
@@ -0,0 +1,380 @@
+"""헤드리스 파이프라인 벤치마크
+
+synthetic(또는 replay) Gemini 백엔드로 plot → 스토리보드 → 씬 이미지 → 검증 전체 경로를
+GUI 없이 실행하고, 단계별 p50/p95/p99, 이미지 처리량, 최대 RSS, CPU 시간을 JSON으로 저장한다.
+
+    python src/benchmark.py --scenes 8,16 --concurrency 1,4,8 --runs 3 --latency-scale 0.1
+    python src/benchmark.py --storyboard-mode two_call,fused
+    python src/benchmark.py --compare ./output/bench/baseline.json
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import math
+import time
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import contextvars
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from common.backend import BACKEND_SYNTHETIC, BACKEND_REPLAY
+from common.logger import APP_LOGGER_NAME
+from common.tracing import get_tracer
+from common.usage import get_ledger
+from common.context_cache import get_context_cache
+
+DEFAULT_OUTPUT_DIR = './output/bench'
+STAGES = ('plot', 'storyboard', 'image', 'validation')
+# plot + 스토리보드 생성 방식 (app.STORYBOARD_MODE_*)
+STORYBOARD_MODES = ('two_call', 'fused')
+
+# 벤치마크 입력 (GUI 폼 데이터와 같은 구조)
+SAMPLE_FORM = {
+    'product_name': '벤치마크 제품',
+    'product_description': '성능 측정을 위한 가상의 무선 이어폰',
+    'tone_manner': '밝고 경쾌한',
+    'reference_files': None,
+}
+
+
+def percentile(values, q):
+    """q(0~100) 분위 값 (nearest-rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * q / 100))
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    """지연 시간 목록 요약 (초)"""
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else 0.0,
+        'min': min(values) if values else 0.0,
+        'max': max(values) if values else 0.0,
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+    }
+
+
+def peak_rss_mb():
+    """프로세스 최대 RSS (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 바이트, Linux는 KB 단위
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+class PipelineBenchmark:
+    """GUI 작업 클래스의 실제 처리 함수를 스레드 풀에서 직접 호출하는 벤치마크"""
+
+    def __init__(self, concurrency, scene_count, work_dir, form_data=None, storyboard_mode='two_call'):
+        self.concurrency = concurrency
+        self.scene_count = scene_count
+        self.storyboard_mode = storyboard_mode
+        self.work_dir = work_dir
+        self.form_data = form_data or SAMPLE_FORM
+        self.samples = {stage: [] for stage in STAGES}  # 작업 단위 지연 시간
+        self.stage_wall = {}  # 단계 전체 소요 시간
+        self.errors = 0
+
+    def run_parallel(self, stage, fn, items):
+        """items를 concurrency 개의 스레드로 처리하고 항목별 지연 시간 기록"""
+        def timed(item):
+            start = time.perf_counter()
+            try:
+                return fn(*item)
+            finally:
+                self.samples[stage].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            # 하위 스레드에서도 현재 tracing 구간을 부모로 사용
+            futures = [pool.submit(contextvars.copy_context().run, timed, item) for item in items]
+            results = [future.result() for future in futures]
+        self.stage_wall[stage] = time.perf_counter() - start
+        return results
+
+    def generate_storyboard(self, api, gemini, job_span):
+        """앱과 같은 ApiThread.generate_storyboard 경로로 스토리보드 생성
+
+        plot/스토리보드 단계 시간은 그 안에서 열리는 stage.plot / stage.storyboard 구간에서 기록한다.
+        """
+        def record(span):
+            stage = span.attributes.get('stage')
+            if span.trace_id == job_span.trace_id and stage in ('plot', 'storyboard') and span.name == f'stage.{stage}':
+                self.samples[stage].append(span.duration)
+                self.stage_wall[stage] = span.duration
+
+        tracer = get_tracer()
+        tracer.add_listener(record)
+        try:
+            return api.generate_storyboard(gemini)
+        finally:
+            tracer.remove_listener(record)
+
+    def run(self, session_id):
+        """전체 파이프라인 1회 실행"""
+        from app import ApiThread
+        from conti import ImageGenerationThread
+        from validator import ValidationThread
+        from common.gemini import Gemini
+
+        tracer = get_tracer()
+        gemini = Gemini()
+        api = ApiThread(self.form_data, session_id=session_id, mode=self.storyboard_mode)
+
+        with tracer.span('job.benchmark', session_id=session_id, concurrency=self.concurrency,
+                         scene_count=self.scene_count, storyboard_mode=self.storyboard_mode) as job_span:
+            storyboards = self.generate_storyboard(api, gemini, job_span)
+            scenes = self.expand_scenes(storyboards.model_dump(by_alias=True))
+
+            with tracer.span('stage.image', stage='image'):
+                generator = ImageGenerationThread(scenes, session_id=session_id, temp_folder=self.work_dir)
+                self.run_parallel('image', generator.generate_scene_image,
+                                  [(scene, scene['scene_number']) for scene in scenes])
+
+            with tracer.span('stage.validation', stage='validation'):
+                validator = ValidationThread(scenes, self.work_dir)
+                validator.session_id = session_id
+                results = self.run_parallel('validation', validator.validate_scene,
+                                            [(scene, scene['scene_number']) for scene in scenes])
+            get_context_cache().release(session_id, wait=True)
+
+        self.errors += sum(1 for result in results if str(result.get('improvements', '')).startswith('검증 중 오류'))
+        return results
+
+    def expand_scenes(self, storyboards):
+        """첫 번째 스토리보드의 씬을 scene_count 개로 맞춤"""
+        key = next(k for k in storyboards if k.startswith('storyboard'))
+        base = storyboards[key].get('scenes', [])
+        scenes = []
+        for i in range(self.scene_count):
+            scene = dict(base[i % len(base)])
+            scene['scene_number'] = i + 1
+            scenes.append(scene)
+        return scenes
+
+
+def run_config(scene_count, concurrency, runs, storyboard_mode='two_call'):
+    """동일 설정을 runs 회 반복 실행하고 결과 요약"""
+    samples = {stage: [] for stage in STAGES}
+    stage_walls = {stage: [] for stage in STAGES}
+    storyboard_walls = []  # plot + 스토리보드 생성 소요 시간
+    wall_times = []
+    errors = 0
+    session_id = f"bench-{storyboard_mode}-{scene_count}x{concurrency}-{int(time.time())}"
+
+    cpu_start = time.process_time()
+    for _ in range(runs):
+        work_dir = tempfile.mkdtemp(prefix='bench_')
+        try:
+            bench = PipelineBenchmark(concurrency, scene_count, work_dir, storyboard_mode=storyboard_mode)
+            start = time.perf_counter()
+            bench.run(session_id)
+            wall_times.append(time.perf_counter() - start)
+            for stage in STAGES:
+                samples[stage].extend(bench.samples[stage])
+                stage_walls[stage].append(bench.stage_wall.get(stage, 0.0))
+            storyboard_walls.append(bench.stage_wall.get('plot', 0.0) + bench.stage_wall.get('storyboard', 0.0))
+            errors += bench.errors
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    cpu_seconds = time.process_time() - cpu_start
+
+    image_wall = sum(stage_walls['image'])
+    usage = get_ledger().summary(session_id)
+    return {
+        'scene_count': scene_count,
+        'concurrency': concurrency,
+        'storyboard_mode': storyboard_mode,
+        'runs': runs,
+        'wall_seconds': summarize(wall_times),
+        'storyboard_seconds': summarize(storyboard_walls),
+        'stages': {stage: {'per_call': summarize(samples[stage]),
+                           'stage_wall': summarize(stage_walls[stage])}
+                   for stage in STAGES},
+        'images_per_minute': scene_count * runs * 60 / image_wall if image_wall else 0.0,
+        'validation_errors': errors,
+        'cpu_seconds': cpu_seconds,
+        'peak_rss_mb': peak_rss_mb(),
+        'tokens': {stage: {key: totals[key] for key in ('prompt_tokens', 'cached_tokens', 'output_tokens', 'calls')}
+                   for stage, totals in usage['by_stage'].items()},
+    }
+
+
+def configure_backend(args):
+    """벤치마크용 Gemini 백엔드 환경 변수 설정"""
+    os.environ['GEMINI_BACKEND'] = args.backend
+    if args.backend == BACKEND_SYNTHETIC:
+        scale = args.latency_scale
+        for name, value in (('TEXT', args.text_latency), ('IMAGE', args.image_latency),
+                            ('UPLOAD', args.upload_latency)):
+            median, sigma = (float(v) for v in value.split(','))
+            os.environ[f'SYNTHETIC_{name}_LATENCY'] = f"{median * scale},{sigma}"
+        os.environ['SYNTHETIC_ERROR_RATE'] = str(args.error_rate)
+        os.environ['SYNTHETIC_RATE_LIMIT_RATE'] = str(args.rate_limit_rate)
+        if args.seed is not None:
+            os.environ['SYNTHETIC_SEED'] = str(args.seed)
+    # 이전 실행의 검증 결과가 재사용되지 않도록 이미지 색인 비활성화
+    os.environ.setdefault('IMAGE_INDEX', '0')
+
+
+def compare(baseline_path, result):
+    """기준 결과 대비 단계별 p95 변화율 출력"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    base_index = {(r['scene_count'], r['concurrency'], r.get('storyboard_mode', 'two_call')): r
+                  for r in baseline['results']}
+
+    print(f"\n기준: {baseline_path} ({baseline['meta'].get('git_revision')})")
+    for current in result['results']:
+        base = base_index.get((current['scene_count'], current['concurrency'], current['storyboard_mode']))
+        if base is None:
+            continue
+        print(f"- scenes={current['scene_count']} concurrency={current['concurrency']} "
+              f"mode={current['storyboard_mode']}")
+        for stage in STAGES:
+            before = base['stages'][stage]['per_call']['p95']
+            after = current['stages'][stage]['per_call']['p95']
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"    {stage:<11} p95 {before:8.3f}s → {after:8.3f}s ({change:+.1f}%)")
+        before = base['images_per_minute']
+        after = current['images_per_minute']
+        print(f"    images/min  {before:8.1f} → {after:8.1f}")
+
+
+def storyboard_tokens(entry):
+    """plot + 스토리보드 단계 토큰 합계"""
+    tokens = [entry['tokens'].get(stage, {}) for stage in ('plot', 'storyboard')]
+    return {key: sum(t.get(key, 0) for t in tokens) for key in ('prompt_tokens', 'cached_tokens', 'output_tokens', 'calls')}
+
+
+def compare_modes(results):
+    """같은 설정에서 two_call 대비 fused 방식의 지연 시간/토큰 차이"""
+    index = {(r['scene_count'], r['concurrency'], r['storyboard_mode']): r for r in results}
+    comparisons = []
+    for (scene_count, concurrency, mode), fused in index.items():
+        two_call = index.get((scene_count, concurrency, 'two_call'))
+        if mode != 'fused' or two_call is None:
+            continue
+        before, after = storyboard_tokens(two_call), storyboard_tokens(fused)
+        comparisons.append({
+            'scene_count': scene_count,
+            'concurrency': concurrency,
+            'two_call_p50': two_call['storyboard_seconds']['p50'],
+            'fused_p50': fused['storyboard_seconds']['p50'],
+            'two_call_tokens': before,
+            'fused_tokens': after,
+        })
+        print(f"- scenes={scene_count} concurrency={concurrency} | plot+스토리보드 p50 "
+              f"{two_call['storyboard_seconds']['p50']:.3f}s → {fused['storyboard_seconds']['p50']:.3f}s | "
+              f"입력 토큰 {before['prompt_tokens']} → {after['prompt_tokens']} | "
+              f"출력 토큰 {before['output_tokens']} → {after['output_tokens']} | "
+              f"호출 {before['calls']} → {after['calls']}")
+    return comparisons
+
+
+def print_result(entry):
+    print(f"- scenes={entry['scene_count']} concurrency={entry['concurrency']} "
+          f"mode={entry['storyboard_mode']} runs={entry['runs']} "
+          f"| 전체 p50 {entry['wall_seconds']['p50']:.2f}s | {entry['images_per_minute']:.1f} images/min "
+          f"| CPU {entry['cpu_seconds']:.2f}s | RSS {entry['peak_rss_mb']:.0f}MB")
+    for stage in STAGES:
+        per_call = entry['stages'][stage]['per_call']
+        print(f"    {stage:<11} p50 {per_call['p50']:.3f}s  p95 {per_call['p95']:.3f}s  p99 {per_call['p99']:.3f}s")
+
+
+def parse_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='헤드리스 파이프라인 벤치마크')
+    parser.add_argument('--scenes', type=parse_list, default=[8], help='씬 개수 목록 (예: 8,16)')
+    parser.add_argument('--concurrency', type=parse_list, default=[1, 4], help='동시 실행 수 목록 (예: 1,4,8)')
+    parser.add_argument('--runs', type=int, default=3, help='설정별 반복 횟수')
+    parser.add_argument('--storyboard-mode', type=lambda v: [m for m in v.split(',') if m], default=['two_call'],
+                        help='스토리보드 생성 방식 목록 (two_call,fused)')
+    parser.add_argument('--backend', default=BACKEND_SYNTHETIC, choices=[BACKEND_SYNTHETIC, BACKEND_REPLAY])
+    parser.add_argument('--text-latency', default='0.8,0.3', help='텍스트 호출 지연 "중앙값,sigma" (초)')
+    parser.add_argument('--image-latency', default='6.0,0.3', help='이미지 생성 지연 "중앙값,sigma" (초)')
+    parser.add_argument('--upload-latency', default='0.2,0.2', help='파일 업로드 지연 "중앙값,sigma" (초)')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='지연 시간 배율 (빠른 측정용)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='5xx 오류 주입 비율')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='429 오류 주입 비율')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help='결과 JSON 경로')
+    parser.add_argument('--compare', default=None, help='비교할 기준 결과 JSON')
+    parser.add_argument('--verbose', action='store_true', help='INFO 로그 출력')
+    args = parser.parse_args(argv)
+
+    configure_backend(args)
+    # 로거는 파이프라인 모듈 임포트 시 초기화되므로 그 이후에 수준 조정
+    import app, conti, validator  # noqa: F401
+    if not args.verbose:
+        logging.getLogger(APP_LOGGER_NAME).setLevel(logging.WARNING)
+
+    result = {
+        'meta': {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'backend': args.backend,
+            'latency': {'text': args.text_latency, 'image': args.image_latency,
+                        'upload': args.upload_latency, 'scale': args.latency_scale},
+            'error_rate': args.error_rate,
+            'rate_limit_rate': args.rate_limit_rate,
+        },
+        'results': [],
+    }
+
+    for mode in args.storyboard_mode:
+        if mode not in STORYBOARD_MODES:
+            parser.error(f"지원하지 않는 스토리보드 생성 방식: {mode}")
+    for scene_count in args.scenes:
+        for concurrency in args.concurrency:
+            for mode in args.storyboard_mode:
+                entry = run_config(scene_count, concurrency, args.runs, storyboard_mode=mode)
+                result['results'].append(entry)
+                print_result(entry)
+
+    if len(args.storyboard_mode) > 1:
+        print("\n스토리보드 생성 방식 비교 (two_call → fused)")
+        result['storyboard_mode_comparison'] = compare_modes(result['results'])
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {output}")
+
+    if args.compare:
+        compare(args.compare, result)
+
+
+if __name__ == '__main__':
+    main()
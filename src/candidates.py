@@ -0,0 +1,65 @@
+import os
+import functools
+import contextvars
+
+from common.tracing import get_tracer
+from common.executor import get_executor, PRIORITY_VALIDATION
+from common.logger import init_logger
+
+logger = init_logger()
+
+
+def candidate_count():
+    """씬당 Imagen 후보 수 (IMAGEN_CANDIDATES, 1이면 best-of-N 비활성화)"""
+    return max(1, min(4, int(os.getenv('IMAGEN_CANDIDATES', 1))))
+
+
+class CandidateScorer:
+    """best-of-N 후보 이미지 채점
+
+    로컬 품질 점검에서 빈/흐린/서로 중복인 후보를 먼저 걸러 Gemini 호출을 줄이고,
+    남은 후보는 전역 실행기에서 검증 우선순위로 동시에 채점한다 (MAX_IN_FLIGHT 제한 공유). 채점 결과는 검증 결과 캐시에 남으므로
+    선택된 이미지를 나중에 검증할 때 다시 호출하지 않는다.
+    """
+
+    def __init__(self, scenes_data, temp_folder='./temp', cache_path=None, session_id=None):
+        from validator import ValidationThread
+        self.validator = ValidationThread(scenes_data, temp_folder, cache_path=cache_path)
+        self.validator.session_id = session_id
+
+    def prefilter(self, image_paths):
+        """{후보 순번: 품질 점검 결과} (품질 점검이 꺼져 있으면 빈 dict)"""
+        from common.quality import get_quality_gate
+        return get_quality_gate().check(list(enumerate(image_paths)))
+
+    def score(self, scene, image_paths, parent=None):
+        """[{'image_path', 'score', 'result', 'quality'}] (점수 높은 순)"""
+        from common.quality import QualityGate
+        scene_number = scene['scene_number']
+        with get_tracer().span('scene.candidates', parent=parent, scene_number=scene_number,
+                               candidates=len(image_paths)) as span:
+            quality = self.prefilter(image_paths)
+            passed = [i for i in range(len(image_paths)) if quality.get(i, {'passed': True})['passed']]
+            span.set_attribute('prefiltered', len(image_paths) - len(passed))
+
+            def validate(i):
+                return self.validator.validate_scene(scene, scene_number, image_path=image_paths[i])
+
+            # 하위 작업에서도 현재 tracing 구간을 부모로 사용
+            tasks = [functools.partial(contextvars.copy_context().run, validate, i) for i in passed]
+            results = dict(zip(passed, get_executor().run_all(tasks, priority=PRIORITY_VALIDATION,
+                                                              name=type(self).__name__)))
+
+        candidates = []
+        for i, image_path in enumerate(image_paths):
+            result = results.get(i)
+            if result is None:
+                reason = QualityGate.describe(quality[i]) if i in quality else ''
+                score = 0.0
+            else:
+                reason = ''
+                score = result.get('total_score', 0)
+            candidates.append({'image_path': image_path, 'score': score, 'result': result,
+                               'quality': quality.get(i), 'rejected': reason})
+        # 점수가 같으면 Imagen이 먼저 돌려준 후보 우선
+        return sorted(candidates, key=lambda candidate: -candidate['score'])
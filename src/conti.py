@@ -1,52 +1,136 @@
 import os
-import shutil
-from PyQt5.QtCore import QThread, pyqtSignal
+import threading
+from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
 from PIL import Image
 from common.gemini import Gemini
 from common.prompt import StoryPrompt
+from common.executor import BackgroundTask, PRIORITY_BULK, PRIORITY_INTERACTIVE
+from common.tracing import get_tracer
+from common.profiling import profiled
+from common.image_store import save_generated_image, copy_image, remove_images, sniff_mime_type, ensure_png
+from candidates import CandidateScorer, candidate_count
 
 storyPrompt = StoryPrompt()
 
 
-class ImageGenerationThread(QThread):
+def index_scene_image(image_path, session_id, scene_number, source='generated'):
+    """이미지를 색인에 등록하고 같은 세션의 다른 씬과 거의 같은 이미지면 해당 씬 번호 반환"""
+    from common.image_index import get_image_index
+    index = get_image_index()
+    if index is None or not image_path:
+        return None
+    try:
+        fingerprint = index.add(image_path, project=session_id, scene_number=scene_number, source=source)
+        if session_id is None:
+            return None
+        matches = index.near_duplicates(fingerprint, project=session_id, exclude_scene=scene_number)
+        return matches[0]['scene_number'] if matches else None
+    except Exception as e:
+        print(f"이미지 색인 등록 실패: {e}")
+        return None
+
+
+class ImageGenerationThread(BackgroundTask):
+    """전체 씬 이미지 생성 작업 (씬마다 하위 작업으로 제출)"""
     scene_completed = pyqtSignal(int, object, str)
+    near_duplicate = pyqtSignal(int, int)  # (씬 번호, 거의 같은 이미지를 가진 씬 번호)
+    candidates_ready = pyqtSignal(int, list)  # (씬 번호, 점수 순 후보 목록) - best-of-N 모드
     generation_completed = pyqtSignal()
+    priority = PRIORITY_BULK
 
-    def __init__(self, scenes):
+    def __init__(self, scenes, session_id=None, cache_path=None, temp_folder='./temp'):
         super().__init__()
         self.scenes = scenes
+        self.session_id = session_id
         self.gemini = Gemini()
-        self.temp_folder = './temp'
+        self.temp_folder = temp_folder
+        self._remaining = 0
+        self._remaining_lock = threading.Lock()
+        self.job_span = None
+
+        # best-of-N: 한 번의 호출로 후보 여러 장을 받아 채점 후 최고 점수 선택 (나머지는 교체용 후보로 보관)
+        self.candidate_count = candidate_count()
+        self.alternatives = {}  # {씬 번호: [후보]}
+        self.scorer = CandidateScorer(scenes, self.temp_folder, cache_path, session_id) \
+            if self.candidate_count > 1 else None
 
         os.makedirs(self.temp_folder, exist_ok=True)
 
+    def start(self):
+        """씬별 이미지 생성 작업을 실행기에 제출"""
+        self.cancelled = False
+        self._remaining = len(self.scenes)
+        self.job_span = get_tracer().span('job.image_generation', stage='image', session_id=self.session_id,
+                                          scene_count=len(self.scenes))
+        if not self.scenes:
+            self.job_span.end()
+            self.generation_completed.emit()
+            return
+
+        for i, scene in enumerate(self.scenes):
+            self.submit(self.run_scene, scene, i + 1)
+
     def run(self):
-        """각 씬에 대해 이미지 생성"""
+        """각 씬에 대해 이미지 생성 (현재 스레드에서 순차 실행)"""
+        self._remaining = len(self.scenes)
+        self.job_span = get_tracer().span('job.image_generation', stage='image', session_id=self.session_id,
+                                          scene_count=len(self.scenes))
         for i, scene in enumerate(self.scenes):
-            try:
-                image_path = self.generate_scene_image(scene, i + 1)
-                self.scene_completed.emit(i + 1, image_path, "")
-            except Exception as e:
-                self.scene_completed.emit(i + 1, None, str(e))
-            finally:
-                import gc
-                gc.collect()
-        self.generation_completed.emit()
+            self.run_scene(scene, i + 1)
+
+    @profiled('image')
+    def run_scene(self, scene, scene_number):
+        """단일 씬 이미지 생성"""
+        try:
+            if self.cancelled:
+                return
+            with get_tracer().span('scene.image', parent=self.job_span, scene_number=scene_number):
+                image_path = self.generate_scene_image(scene, scene_number)
+            self.scene_completed.emit(scene_number, image_path, "")
+            if scene_number in self.alternatives:
+                self.candidates_ready.emit(scene_number, self.alternatives[scene_number])
+            duplicate_of = index_scene_image(image_path, self.session_id, scene_number)
+            if duplicate_of is not None:
+                self.near_duplicate.emit(scene_number, duplicate_of)
+        except Exception as e:
+            self.scene_completed.emit(scene_number, None, str(e))
+        finally:
+            import gc
+            gc.collect()
+            self._on_scene_finished()
+
+    def cancel(self):
+        """대기 중인 씬 작업 취소 (실행되지 않은 씬도 완료로 계산해 job 구간을 종료)"""
+        cancelled = super().cancel()
+        if cancelled:
+            self._on_scene_finished(cancelled)
+        return cancelled
+
+    def _on_scene_finished(self, count=1):
+        with self._remaining_lock:
+            self._remaining -= count
+            is_last = self._remaining == 0
+        if is_last:
+            self.job_span.end()
+            if not self.cancelled:
+                self.generation_completed.emit()
 
     def generate_scene_image(self, scene, scene_number):
         """실제 이미지 생성 함수 (Imagen4 API 사용)"""
         prompt = self.create_scene_image_prompt(scene)
-        temp_path = os.path.join(self.temp_folder, f"scene_{scene_number}.png")
+        stem = os.path.join(self.temp_folder, f"scene_{scene_number}")
 
         try:
+            if self.scorer is not None:
+                return self.generate_best_of_n(scene, scene_number, prompt, stem)
             if self.gemini:
-                sketch_image = self.gemini._call_imagen_text(prompt)
-                sketch_image.save(temp_path, 'PNG')
-            else:
-                dummy_image = Image.new('RGB', (512, 512), color='lightgray')
-                dummy_image.save(temp_path, 'PNG')
+                # 응답 바이트를 디코딩/재인코딩 없이 저장 형식 그대로 기록
+                return save_generated_image(self.gemini._call_imagen_bytes(prompt), stem)
 
+            temp_path = stem + '.png'
+            dummy_image = Image.new('RGB', (512, 512), color='lightgray')
+            dummy_image.save(temp_path, 'PNG')
             return temp_path
         except Exception as e:
             raise Exception(f"이미지 생성 실패: {str(e)}")
@@ -54,14 +138,27 @@ class ImageGenerationThread(QThread):
             import gc
             gc.collect()
 
+    def generate_best_of_n(self, scene, scene_number, prompt, stem):
+        """후보 N장을 한 번에 생성해 채점하고 최고 점수 후보를 씬 이미지로 사용"""
+        candidates_folder = os.path.join(self.temp_folder, 'candidates')
+        image_paths = [save_generated_image(generated, os.path.join(candidates_folder, f"scene_{scene_number}_{i}"))
+                       for i, generated in enumerate(
+                           self.gemini._call_imagen_candidates(prompt, self.candidate_count), 1)]
+
+        scene = dict(scene, scene_number=scene_number)
+        candidates = self.scorer.score(scene, image_paths)
+        self.alternatives[scene_number] = candidates
+        return copy_image(candidates[0]['image_path'], stem)
+
     def create_scene_image_prompt(self, scene):
         """씬 정보를 바탕으로 이미지 생성 프롬프트 생성"""
         return storyPrompt.image_prompt(scene)
 
 
-class ImageRegenerationThread(QThread):
-    """이미지 재생성 스레드"""
+class ImageRegenerationThread(BackgroundTask):
+    """이미지 재생성 작업 (상호작용 우선순위)"""
     regeneration_completed = pyqtSignal(int, object, str)
+    priority = PRIORITY_INTERACTIVE
 
     def __init__(self, scene_data, scene_number, improved_prompt=None):
         super().__init__()
@@ -83,18 +180,19 @@ class ImageRegenerationThread(QThread):
     def run(self):
         """이미지 재생성 실행"""
         try:
-            # 기존 이미지 파일 삭제 (있다면)
-            existing_file = os.path.join(self.temp_folder, f"scene_{self.scene_number}.png")
-            if os.path.exists(existing_file):
-                os.remove(existing_file)
+            # 기존 이미지 파일 삭제 (저장 형식과 관계없이)
+            remove_images(os.path.join(self.temp_folder, f"scene_{self.scene_number}"))
 
             # 개선된 프롬프트가 있는 경우 사용
-            if self.improved_prompt and 'improved_description' in self.scene_data:
-                new_image_path = self.regenerate_with_improved_prompt()
-            else:
-                new_image_path = self.regenerate_scene_image()
+            with get_tracer().span('job.regeneration', stage='regeneration', session_id=self.session_id,
+                                   scene_number=self.scene_number, improved=bool(self.improved_prompt)):
+                if self.improved_prompt and 'improved_description' in self.scene_data:
+                    new_image_path = self.regenerate_with_improved_prompt()
+                else:
+                    new_image_path = self.regenerate_scene_image()
 
             self.regeneration_completed.emit(self.scene_number, new_image_path, "")
+            index_scene_image(new_image_path, self.session_id, self.scene_number)
 
         except Exception as e:
             self.regeneration_completed.emit(self.scene_number, None, str(e))
@@ -112,12 +210,12 @@ class ImageRegenerationThread(QThread):
         enhanced_scene_data['description'] = improved_description
 
         prompt = self.create_enhanced_prompt(enhanced_scene_data)
-        temp_path = os.path.join(self.temp_folder, f"scene_{self.scene_number}.png")
+        stem = os.path.join(self.temp_folder, f"scene_{self.scene_number}")
+        temp_path = stem + '.png'
 
         try:
             if self.gemini:
-                sketch_image = self.gemini._call_imagen_text(prompt)
-                sketch_image.save(temp_path, 'PNG')
+                temp_path = save_generated_image(self.gemini._call_imagen_bytes(prompt), stem)
             else:
                 # 더미 이미지 생성 (테스트용) - 개선된 버전임을 나타내는 색상
                 import random
@@ -134,13 +232,13 @@ class ImageRegenerationThread(QThread):
     def regenerate_scene_image(self):
         """씬 이미지 재생성"""
         prompt = self.create_regeneration_prompt()
-        temp_path = os.path.join(self.temp_folder, f"scene_{self.scene_number}.png")
+        stem = os.path.join(self.temp_folder, f"scene_{self.scene_number}")
+        temp_path = stem + '.png'
 
         try:
             if self.gemini:
                 # 실제 Imagen4 API 호출
-                sketch_image = self.gemini._call_imagen_text(prompt)
-                sketch_image.save(temp_path, 'PNG')
+                temp_path = save_generated_image(self.gemini._call_imagen_bytes(prompt), stem)
             else:
                 # 더미 이미지 생성 (테스트용) - 색상을 다르게 해서 재생성 표시
                 import random
@@ -258,6 +356,118 @@ class ImageRegenerationThread(QThread):
             return None
 
 
+class VideoGenerationThread(BackgroundTask):
+    """씬별(또는 스토리보드 전체) Veo 영상 생성 작업
+
+    operation 제출/상태 조회/다운로드는 VeoScheduler가 자체 작업 스레드에서 처리하므로
+    실행기 슬롯은 하나만 사용한다.
+    """
+    clip_completed = pyqtSignal(object, object, str)  # (씬 번호 또는 'storyboard', 영상 경로, 오류)
+    progress = pyqtSignal(int, int)
+    generation_completed = pyqtSignal()
+    priority = PRIORITY_BULK
+
+    MODE_SCENE = 'scene'
+    MODE_STORYBOARD = 'storyboard'
+
+    def __init__(self, scenes, images=None, session_id=None, mode=MODE_SCENE, storyboard=None):
+        super().__init__()
+        self.scenes = scenes
+        self.images = images or {}  # {scene_number: 이미지 경로} (첫 프레임으로 사용)
+        self.session_id = session_id
+        self.mode = mode
+        self.storyboard = storyboard or {}
+        self.gemini = Gemini()
+        self.video_folder = os.path.join('./temp', 'videos')
+        self._done = 0
+
+        os.makedirs(self.video_folder, exist_ok=True)
+
+    @staticmethod
+    def scene_duration(scene):
+        """씬 길이 문자열('3초', '2.5초' 등) → Veo가 지원하는 길이(VEO_MIN_SECONDS~VEO_MAX_SECONDS초)"""
+        from common.animatic import scene_seconds
+        seconds = round(scene_seconds(scene, default=0))
+        return min(int(os.getenv('VEO_MAX_SECONDS', 8)), max(int(os.getenv('VEO_MIN_SECONDS', 5)), seconds))
+
+    @staticmethod
+    def load_image(path):
+        from google.genai import types
+        if not isinstance(path, str) or not os.path.exists(path):
+            return None
+        # Veo 첫 프레임은 PNG/JPEG만 받으므로 그 외 형식일 때만 PNG로 변환
+        with open(path, 'rb') as f:
+            data = f.read()
+        mime_type = sniff_mime_type(data)
+        if mime_type not in ('image/png', 'image/jpeg'):
+            with open(ensure_png(path), 'rb') as f:
+                data = f.read()
+            mime_type = 'image/png'
+        return types.Image(image_bytes=data, mime_type=mime_type)
+
+    def create_jobs(self):
+        from common.video import VideoJob
+        if self.mode == self.MODE_STORYBOARD:
+            return [VideoJob('storyboard', storyPrompt.storyboard_video_prompt(self.storyboard),
+                             os.path.join(self.video_folder, 'storyboard.mp4'),
+                             duration_seconds=int(os.getenv('VEO_MAX_SECONDS', 8)))]
+
+        return [VideoJob(i, storyPrompt.video_prompt(scene), os.path.join(self.video_folder, f"scene_{i}.mp4"),
+                         image=self.load_image(self.images.get(i)), duration_seconds=self.scene_duration(scene),
+                         scene_number=i)
+                for i, scene in enumerate(self.scenes, 1)]
+
+    def run(self):
+        """모든 영상 operation을 동시에 제출하고 완료될 때마다 결과 전달"""
+        from common.video import VeoScheduler, STATE_DONE, STATE_FAILED, STATE_CANCELLED
+        jobs = self.create_jobs()
+        self._done = 0
+
+        def on_update(job):
+            self._done += 1
+            if job.state == STATE_DONE:
+                self.clip_completed.emit(job.key, job.output_path, "")
+            elif job.state != STATE_CANCELLED:
+                self.clip_completed.emit(job.key, None, job.error or '영상 생성 실패')
+            self.progress.emit(self._done, len(jobs))
+
+        with get_tracer().span('job.video_generation', stage='video', session_id=self.session_id,
+                               mode=self.mode, clip_count=len(jobs)) as job_span:
+            try:
+                VeoScheduler.from_env(self.gemini).run(jobs, on_update=on_update,
+                                                       should_cancel=lambda: self.cancelled, parent=job_span)
+            except Exception as e:
+                for job in jobs:
+                    if job.state not in (STATE_DONE, STATE_FAILED, STATE_CANCELLED):
+                        self.clip_completed.emit(job.key, None, str(e))
+        if not self.cancelled:
+            self.generation_completed.emit()
+
+
+class AnimaticExportThread(BackgroundTask):
+    """씬 이미지로 animatic(MP4/GIF) 내보내기 작업"""
+    scene_progress = pyqtSignal(int, int)
+    export_completed = pyqtSignal(object, str)  # (저장 경로, 오류)
+    priority = PRIORITY_INTERACTIVE
+
+    def __init__(self, scenes, images, output_path, session_id=None):
+        super().__init__()
+        self.scenes = scenes
+        self.images = dict(images)
+        self.output_path = output_path
+        self.session_id = session_id
+
+    def run(self):
+        from common.animatic import AnimaticExporter
+        try:
+            with get_tracer().span('job.animatic_export', stage='animatic', session_id=self.session_id):
+                path = AnimaticExporter.from_env().export(self.scenes, self.images, self.output_path,
+                                                          on_scene=self.scene_progress.emit)
+            self.export_completed.emit(path, "")
+        except Exception as e:
+            self.export_completed.emit(None, str(e))
+
+
 class ImageUpload:
 
     @staticmethod
@@ -303,26 +513,8 @@ class ImageUpload:
             # 임시 폴더 생성
             os.makedirs(temp_folder, exist_ok=True)
 
-            # 파일 확장자 가져오기
-            _, ext = os.path.splitext(file_path)
-
-            # 대상 파일 경로 생성
-            temp_file_path = os.path.join(temp_folder, f"scene_{scene_number}{ext}")
-
-            # 파일 복사
-            shutil.copy2(file_path, temp_file_path)
-
-            if ext.lower() != '.png':
-                png_path = os.path.join(temp_folder, f"scene_{scene_number}.png")
-                with Image.open(temp_file_path) as img:
-                    # RGBA 모드로 변환 (투명도 지원)
-                    if img.mode != 'RGBA':
-                        img = img.convert('RGBA')
-                    img.save(png_path, 'PNG')
-
-                # 원본 파일 삭제
-                # os.remove(temp_file_path)
-                temp_file_path = png_path
+            # 원본 형식 그대로 복사 (PNG 변환은 PNG가 꼭 필요한 곳에서 ensure_png로 수행)
+            temp_file_path = copy_image(file_path, os.path.join(temp_folder, f"scene_{scene_number}"))
 
             return temp_file_path, "이미지가 성공적으로 업로드되었습니다."
 
@@ -0,0 +1,102 @@
+"""시작 시간 예산 점검
+
+`python -X importtime`으로 app 모듈 임포트 비용을 측정하고, 첫 화면 표시 전에
+무거운 모듈(google.genai, cv2, 대화상자 모듈)이 로드되지 않는지 확인한다.
+예산을 넘으면 종료 코드 1을 반환하므로 CI나 커밋 전 점검에 그대로 사용할 수 있다.
+
+    python src/import_budget.py
+    python src/import_budget.py --budget-ms 300 --window
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+
+# 첫 화면 표시 전에 로드되면 안 되는 모듈
+DEFERRED_MODULES = ('google.genai', 'cv2', 'common.gemini', 'storyboard', 'validator', 'conti')
+
+WINDOW_SCRIPT = """
+import time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+app = QApplication([])
+from app import AdContentForm
+window = AdContentForm()
+window.show()
+app.processEvents()
+print(f"{(time.perf_counter() - start) * 1000:.1f}")
+"""
+
+
+def run_python(args, env=None):
+    merged = dict(os.environ)
+    merged['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT_DIR, merged.get('PYTHONPATH')]))
+    merged.update(env or {})
+    return subprocess.run([sys.executable] + args, cwd=SRC_DIR, env=merged,
+                          capture_output=True, text=True)
+
+
+def parse_importtime(stderr):
+    """-X importtime 출력 → {모듈: (self_us, cumulative_us)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def check_imports(module, budget_ms, top):
+    result = run_python(['-X', 'importtime', '-c', f'import {module}'])
+    if result.returncode != 0:
+        print(result.stderr)
+        return False
+
+    modules = parse_importtime(result.stderr)
+    total_ms = modules[module][1] / 1000
+    print(f"{module} 임포트: {total_ms:.1f}ms (예산 {budget_ms:.0f}ms)")
+    print(f"  누적 시간 상위 {top}개 모듈:")
+    for name, (_, cumulative_us) in sorted(modules.items(), key=lambda x: -x[1][1])[:top]:
+        print(f"    {cumulative_us / 1000:8.1f}ms  {name}")
+
+    ok = total_ms <= budget_ms
+    loaded = [name for name in DEFERRED_MODULES if name in modules]
+    if loaded:
+        print(f"  지연 로드 대상 모듈이 시작 시 임포트됨: {', '.join(loaded)}")
+        ok = False
+    return ok
+
+
+def check_window(budget_ms):
+    result = run_python(['-c', WINDOW_SCRIPT], env={'QT_QPA_PLATFORM': os.getenv('QT_QPA_PLATFORM', 'offscreen')})
+    if result.returncode != 0:
+        print(result.stderr)
+        return False
+    elapsed_ms = float(result.stdout.strip().splitlines()[-1])
+    print(f"첫 화면 표시: {elapsed_ms:.1f}ms (예산 {budget_ms:.0f}ms)")
+    return elapsed_ms <= budget_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='시작 시간 예산 점검')
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', 400)))
+    parser.add_argument('--window', action='store_true', help='첫 화면 표시 시간도 측정')
+    parser.add_argument('--window-budget-ms', type=float, default=float(os.getenv('WINDOW_BUDGET_MS', 1000)))
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    ok = check_imports(args.module, args.budget_ms, args.top)
+    if args.window:
+        ok = check_window(args.window_budget_ms) and ok
+
+    print('통과' if ok else '실패')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import os
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QGroupBox,
+                             QMessageBox, QCheckBox)
+from PyQt5.QtCore import Qt, QTimer
+
+from common.metrics import get_registry, DEFAULT_METRICS_FILE
+from common.profiling import get_profiler
+
+
+class MetricsPanel(QWidget):
+    """실시간 성능 지표 패널 (부모 창 옆에 떠 있는 도구 창)"""
+
+    def __init__(self, parent=None, refresh_interval=1000):
+        super().__init__(parent, Qt.Tool)
+        self.registry = get_registry()
+        self.init_ui()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(refresh_interval)
+        self.refresh()
+
+    def init_ui(self):
+        self.setWindowTitle('성능 지표')
+        self.setGeometry(620, 100, 520, 520)
+
+        layout = QVBoxLayout()
+
+        # 처리량 요약
+        summary_group = QGroupBox('처리량')
+        summary_layout = QVBoxLayout()
+        self.summary_label = QLabel()
+        self.summary_label.setStyleSheet("QLabel { font-size: 12px; padding: 5px; }")
+        summary_layout.addWidget(self.summary_label)
+        summary_group.setLayout(summary_layout)
+        layout.addWidget(summary_group)
+
+        # Gemini 메서드별 지연 시간
+        latency_group = QGroupBox('Gemini 호출 지연 시간 (초)')
+        latency_layout = QVBoxLayout()
+        self.latency_table = self.create_table(['메서드', '호출', 'p50', 'p95', 'p99', '최대'])
+        latency_layout.addWidget(self.latency_table)
+        latency_group.setLayout(latency_layout)
+        layout.addWidget(latency_group)
+
+        # 파이프라인 단계별 소요 시간
+        stage_group = QGroupBox('단계별 소요 시간 (초)')
+        stage_layout = QVBoxLayout()
+        self.stage_table = self.create_table(['단계', '횟수', 'p50', 'p95', 'p99', '최대'])
+        stage_layout.addWidget(self.stage_table)
+        stage_group.setLayout(stage_layout)
+        layout.addWidget(stage_group)
+
+        # 버튼
+        button_layout = QHBoxLayout()
+        self.profile_checkbox = QCheckBox('단계별 프로파일링')
+        self.profile_checkbox.setToolTip('각 단계를 cProfile/스택 샘플링으로 기록하여 저장 시 프로젝트 폴더의 profiles/에 남깁니다')
+        self.profile_checkbox.setChecked(get_profiler().enabled)
+        self.profile_checkbox.toggled.connect(get_profiler().set_enabled)
+        button_layout.addWidget(self.profile_checkbox)
+        button_layout.addStretch()
+        export_button = QPushButton('Prometheus 내보내기')
+        export_button.clicked.connect(self.export_prometheus)
+        button_layout.addWidget(export_button)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def create_table(self, headers):
+        """지표 테이블 생성"""
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for col in range(1, len(headers)):
+            table.horizontalHeader().setSectionResizeMode(col, QHeaderView.ResizeToContents)
+        return table
+
+    def fill_histogram_table(self, table, metric_name, label_key):
+        """히스토그램 지표로 테이블 채우기"""
+        rows = self.registry.collect(metric_name)
+        table.setRowCount(len(rows))
+        for row, (_, labels, histogram) in enumerate(rows):
+            snapshot = histogram.snapshot()
+            values = [labels.get(label_key, ''), str(snapshot['count'])]
+            values += [f"{snapshot[key]:.2f}" for key in ('p50', 'p95', 'p99', 'max')]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row, col, item)
+
+    def total(self, metric_name):
+        """라벨 구분 없이 합산한 값"""
+        return sum(metric.value for _, _, metric in self.registry.collect(metric_name))
+
+    def token_total(self, kind):
+        """종류별 누적 토큰 수"""
+        return sum(metric.value for _, labels, metric in self.registry.collect('gemini_tokens_total')
+                   if labels.get('kind') == kind)
+
+    def rate(self, metric_name):
+        rows = self.registry.collect(metric_name)
+        return sum(metric.rate_per_minute() for _, _, metric in rows)
+
+    def refresh(self):
+        """지표 갱신"""
+        self.summary_label.setText(
+            f"이미지 생성: {self.rate('images_generated_total'):.1f}장/분 "
+            f"(누적 {self.total('images_generated_total')}장) | "
+            f"검증: {self.rate('scenes_validated_total'):.1f}씬/분 "
+            f"(누적 {self.total('scenes_validated_total')}씬)\n"
+            f"재시도: {self.total('gemini_retries_total')}회 | "
+            f"429: {self.total('gemini_rate_limited_total')}회 | "
+            f"오류: {self.total('gemini_errors_total')}회 | "
+            f"캐시 적중: {self.total('cache_hits_total')} / 미적중: {self.total('cache_misses_total')}\n"
+            f"토큰: 입력 {self.token_total('prompt')} / 출력 {self.token_total('output')} / "
+            f"캐시 {self.token_total('cached')}\n"
+            f"작업 대기열: {self.registry.value('executor_queue_depth')} | "
+            f"실행 중: {self.registry.value('executor_in_flight')} / "
+            f"{self.registry.value('executor_max_in_flight')}"
+        )
+        self.fill_histogram_table(self.latency_table, 'gemini_request_seconds', 'method')
+        self.fill_histogram_table(self.stage_table, 'pipeline_span_seconds', 'span')
+
+    def export_prometheus(self):
+        """Prometheus 텍스트 파일로 저장"""
+        try:
+            # 자동 저장(METRICS_FILE)이 꺼져 있어도 직접 내보내기는 기본 위치에 저장
+            path = self.registry.write_prometheus(os.getenv('METRICS_FILE') or DEFAULT_METRICS_FILE)
+            QMessageBox.information(self, '내보내기 완료', f'메트릭이 저장되었습니다:\n{path}')
+        except Exception as e:
+            QMessageBox.critical(self, '내보내기 오류', f'메트릭 저장 중 오류가 발생했습니다:\n{str(e)}')
+
+    def closeEvent(self, event):
+        """패널 종료 시 최신 지표를 파일로 저장"""
+        try:
+            self.registry.write_prometheus()
+        except Exception:
+            pass
+        event.accept()
+
+
+def toggle_metrics_panel(owner):
+    """owner 창에 연결된 성능 지표 패널 표시/숨김"""
+    panel = getattr(owner, 'metrics_panel', None)
+    if panel is None:
+        panel = MetricsPanel(owner)
+        owner.metrics_panel = panel
+
+    if panel.isVisible():
+        panel.hide()
+    else:
+        panel.refresh()
+        panel.show()
+        panel.raise_()
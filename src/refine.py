@@ -0,0 +1,429 @@
+"""검증 점수 기반 씬 이미지 자동 개선
+
+씬마다 검증 → 프롬프트 개선 → 재생성 → 재검증을 사람 개입 없이 반복한다. 점수가 기준에 도달하거나,
+반복 횟수/시간/API 호출 예산을 모두 쓰거나, 점수가 더 오르지 않으면 멈추며, 씬별로 가장 점수가 높았던
+이미지를 최종 결과로 남긴다. 씬들은 병렬로 개선되고 시간/호출 예산은 스토리보드 전체가 공유한다.
+
+    python src/refine.py ./output/<프로젝트>/<스토리보드>.json --threshold 4.0 --max-iterations 3
+    python src/refine.py storyboard.json --max-calls 60 --max-seconds 300 --output-dir ./output/refined
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import argparse
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import pyqtSignal
+
+from common.gemini import Gemini
+from common.prompt import StoryPrompt
+from common.schema import ImprovedPrompt, SCORE_CRITERIA
+from common.executor import BackgroundTask, PRIORITY_BULK
+from common.animatic import resolve_image_path
+from common.image_store import save_generated_image, copy_image
+from common.tracing import get_tracer
+from common.logger import init_logger
+
+logger = init_logger()
+storyPrompt = StoryPrompt()
+
+# 씬 개선 종료 사유
+STOP_THRESHOLD = 'threshold'
+STOP_MAX_ITERATIONS = 'max_iterations'
+STOP_PLATEAU = 'plateau'
+STOP_TIME_BUDGET = 'time_budget'
+STOP_CALL_BUDGET = 'call_budget'
+STOP_CANCELLED = 'cancelled'
+STOP_NO_IMAGE = 'no_image'
+
+# 단계별 API 호출 수 (예산 예약 단위)
+CALLS_IMPROVE = 1
+CALLS_IMAGE = 1
+CALLS_VALIDATE = 2  # 장면 설명 추출 + 비교 평가
+
+
+class RefineBudget:
+    """자동 개선 종료 조건과 예산 (시간/호출 예산은 같은 예산을 쓰는 모든 씬이 공유)
+
+    max_seconds, max_calls가 0이면 해당 예산은 제한하지 않고, patience가 0이면 조기 종료하지 않는다.
+    """
+
+    def __init__(self, threshold=4.0, max_iterations=3, max_seconds=600.0, max_calls=0, patience=2,
+                 min_delta=0.1):
+        self.threshold = threshold
+        self.max_iterations = max_iterations
+        self.max_seconds = max_seconds
+        self.max_calls = max_calls
+        self.patience = patience
+        self.min_delta = min_delta
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._pending_initial = 0  # 아직 기존 이미지 평가를 하지 않은 씬 수
+        self._started = time.monotonic()
+
+    @classmethod
+    def from_env(cls):
+        """REFINE_* 환경 변수로 예산 생성"""
+        return cls(
+            threshold=float(os.getenv('REFINE_THRESHOLD', 4.0)),
+            max_iterations=int(os.getenv('REFINE_MAX_ITERATIONS', 3)),
+            max_seconds=float(os.getenv('REFINE_MAX_SECONDS', 600)),
+            max_calls=int(os.getenv('REFINE_MAX_CALLS', 0)),
+            patience=int(os.getenv('REFINE_PATIENCE', 2)),
+            min_delta=float(os.getenv('REFINE_MIN_DELTA', 0.1)),
+        )
+
+    def start(self, scene_count=0):
+        """예산 사용량 초기화 (scene_count개 씬의 기존 이미지 평가 호출은 미리 확보)"""
+        with self._lock:
+            self._calls = 0
+            self._pending_initial = scene_count
+            self._started = time.monotonic()
+
+    @property
+    def calls(self):
+        return self._calls
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self._started
+
+    def out_of_time(self):
+        return self.max_seconds > 0 and self.elapsed >= self.max_seconds
+
+    def reserve(self, count, initial=False):
+        """호출 count회 예약 (예산을 넘으면 예약하지 않고 False)
+
+        먼저 시작한 씬이 재생성으로 예산을 다 써서 나머지 씬이 평가조차 못 받는 일이 없도록,
+        재생성 반복은 남은 씬들의 기존 이미지 평가 몫을 제외한 예산 안에서만 예약한다.
+        """
+        with self._lock:
+            if initial:
+                self._pending_initial = max(0, self._pending_initial - 1)
+            held = self._pending_initial * CALLS_VALIDATE
+            if self.max_calls > 0 and self._calls + count + held > self.max_calls:
+                return False
+            self._calls += count
+            return True
+
+    def refund(self, count):
+        """예약했지만 실제로 호출하지 않은 횟수 반환 (캐시 적중 등)"""
+        with self._lock:
+            self._calls = max(0, self._calls - count)
+
+
+class SceneRefiner:
+    """씬 하나의 생성 → 검증 → 개선 → 재생성 반복 (스레드 안전, 여러 씬에서 동시에 호출 가능)"""
+
+    def __init__(self, scenes_data, budget=None, work_folder='./temp/refine', cache_path=None, session_id=None):
+        from validator import ValidationThread
+        self.budget = budget or RefineBudget.from_env()
+        self.work_folder = work_folder
+        self.session_id = session_id
+        self.gemini = Gemini()
+        # 검증 결과 캐시/이미지 색인을 그대로 사용하므로 바뀌지 않은 이미지는 다시 평가하지 않음
+        self.validator = ValidationThread(scenes_data, work_folder, cache_path=cache_path)
+        self.validator.session_id = session_id
+        os.makedirs(work_folder, exist_ok=True)
+
+    def evaluate(self, scene, image_path):
+        """로컬 품질 점검 후 검증 (품질 점검 실패 시 Gemini 호출 없이 0점)"""
+        from common.quality import get_quality_gate
+        report = get_quality_gate().check([(scene['scene_number'], image_path)]).get(scene['scene_number'])
+        if report is not None and not report['passed']:
+            return self.validator.quality_rejected_result(scene, report), False
+        result = self.validator.validate_scene(scene, scene['scene_number'], image_path=image_path)
+        called = not (result.get('cached') or result.get('reused'))
+        return result, called
+
+    def improve(self, prompt, result):
+        """검증 결과를 반영한 이미지 생성 프롬프트"""
+        evaluation = {key: {'점수': result.get('scores', {}).get(key, 0),
+                            '평가 이유': result.get('reasons', {}).get(key, '')} for key in SCORE_CRITERIA}
+        evaluation['개선점'] = result.get('improvements', '')
+        with get_tracer().span('stage.improve', stage='improve'):
+            improved = self.gemini._call_gemini_text(storyPrompt.for_improve_prompt(prompt, evaluation),
+                                                     response_schema=ImprovedPrompt)
+        return improved.improved_prompt
+
+    def generate(self, prompt, scene_number, iteration):
+        """후보 이미지 생성 → 경로"""
+        with get_tracer().span('stage.image', stage='image'):
+            generated = self.gemini._call_imagen_bytes(prompt)
+        return save_generated_image(generated, os.path.join(self.work_folder, f"scene_{scene_number}_iter{iteration}"))
+
+    def stop_reason(self, best, stale, iteration, should_cancel=None):
+        budget = self.budget
+        if should_cancel and should_cancel():
+            return STOP_CANCELLED
+        if best['score'] >= budget.threshold:
+            return STOP_THRESHOLD
+        if iteration >= budget.max_iterations:
+            return STOP_MAX_ITERATIONS
+        if budget.patience and stale >= budget.patience:
+            return STOP_PLATEAU
+        if budget.out_of_time():
+            return STOP_TIME_BUDGET
+        return None
+
+    def refine_scene(self, scene, image_path, output_path=None, should_cancel=None, on_iteration=None, parent=None):
+        """씬 자동 개선 후 보고서 반환 (최고 점수 이미지를 output_path에 저장, 확장자는 이미지 형식에 맞춤)
+
+        on_iteration(씬 번호, 반복 번호, 점수) 진행 알림. 반복 0은 기존 이미지 평가이다.
+        """
+        scene_number = scene['scene_number']
+        output_path = output_path or image_path
+        budget = self.budget
+        history = []
+
+        with get_tracer().span('scene.refine', parent=parent, scene_number=scene_number) as span:
+            prompt = scene.get('improved_description') or storyPrompt.image_prompt(scene)
+            if not budget.reserve(CALLS_VALIDATE, initial=True):
+                return self.report(scene_number, None, history, STOP_CALL_BUDGET, 0)
+            result, called = self.evaluate(scene, image_path)
+            if not called:
+                budget.refund(CALLS_VALIDATE)
+            best = {'iteration': 0, 'score': result.get('total_score', 0), 'image_path': image_path,
+                    'prompt': prompt, 'result': result}
+            history.append({'iteration': 0, 'score': best['score'], 'image_path': image_path})
+            if on_iteration:
+                on_iteration(scene_number, 0, best['score'])
+
+            iteration = 0
+            stale = 0  # 의미 있는 점수 향상이 없었던 연속 반복 수
+            while True:
+                stop = self.stop_reason(best, stale, iteration, should_cancel)
+                if stop:
+                    break
+                # 개선 → 생성 → 검증을 끝까지 할 수 있을 때만 반복 시작
+                if not budget.reserve(CALLS_IMPROVE + CALLS_IMAGE + CALLS_VALIDATE):
+                    stop = STOP_CALL_BUDGET
+                    break
+                iteration += 1
+
+                with get_tracer().span('refine.iteration', scene_number=scene_number,
+                                       iteration=iteration) as iteration_span:
+                    # 예약했지만 아직 시도하지 않은 호출 수 (실패 시 반환)
+                    unused = CALLS_IMPROVE + CALLS_IMAGE + CALLS_VALIDATE
+                    try:
+                        # 항상 지금까지 가장 좋은 결과를 기준으로 개선
+                        unused -= CALLS_IMPROVE
+                        candidate_prompt = self.improve(best['prompt'], best['result'])
+                        unused -= CALLS_IMAGE
+                        candidate_path = self.generate(candidate_prompt, scene_number, iteration)
+                        unused -= CALLS_VALIDATE
+                        result, called = self.evaluate(scene, candidate_path)
+                        if not called:
+                            budget.refund(CALLS_VALIDATE)
+                    except Exception as e:
+                        budget.refund(unused)
+                        logger.warning(f"Scene #{scene_number} 개선 {iteration}회차 실패: {e}")
+                        history.append({'iteration': iteration, 'score': None, 'error': str(e)})
+                        stale += 1
+                        continue
+                    score = result.get('total_score', 0)
+                    iteration_span.set_attribute('score', score)
+
+                history.append({'iteration': iteration, 'score': score, 'image_path': candidate_path,
+                                'prompt': candidate_prompt})
+                stale = 0 if score >= best['score'] + budget.min_delta else stale + 1
+                if score > best['score']:
+                    best = {'iteration': iteration, 'score': score, 'image_path': candidate_path,
+                            'prompt': candidate_prompt, 'result': result}
+                if on_iteration:
+                    on_iteration(scene_number, iteration, score)
+
+            # 출력 확장자는 선택된 이미지의 저장 형식을 따름
+            output_path = copy_image(best['image_path'], os.path.splitext(output_path)[0])
+            span.set_attributes(iterations=iteration, best_score=best['score'], stop_reason=stop)
+
+        best['image_path'] = output_path
+        return self.report(scene_number, best, history, stop, iteration)
+
+    @staticmethod
+    def report(scene_number, best, history, stop_reason, iterations):
+        best = best or {}
+        return {
+            'scene_number': scene_number,
+            'best_score': best.get('score', 0),
+            'best_iteration': best.get('iteration'),
+            'initial_score': history[0]['score'] if history else None,
+            'image_path': best.get('image_path'),
+            'prompt': best.get('prompt'),
+            'result': best.get('result'),
+            'iterations': iterations,
+            'stop_reason': stop_reason,
+            'history': history,
+        }
+
+
+class AutoRefineThread(BackgroundTask):
+    """스토리보드 전체 자동 개선 작업 (씬마다 하위 작업으로 제출)"""
+    iteration_completed = pyqtSignal(int, int, float)  # 씬 번호, 반복 번호, 점수
+    scene_refined = pyqtSignal(int, dict)  # 씬 번호, 개선 보고서
+    refine_completed = pyqtSignal(list)  # 전체 보고서
+    priority = PRIORITY_BULK
+
+    def __init__(self, scenes, images, session_id=None, cache_path=None, budget=None, temp_folder='./temp'):
+        super().__init__()
+        self.scenes = scenes
+        self.images = images
+        self.session_id = session_id
+        self.temp_folder = temp_folder
+        self.budget = budget or RefineBudget.from_env()
+        self.refiner = SceneRefiner(scenes, self.budget, os.path.join(temp_folder, 'refine'), cache_path,
+                                    session_id)
+        self.reports = []
+        self._remaining = 0
+        self._remaining_lock = threading.Lock()
+        self.job_span = None
+
+    def start(self):
+        """씬별 개선 작업을 실행기에 제출"""
+        self.cancelled = False
+        self._begin()
+        if not self.scenes:
+            self._finish()
+            return
+        for scene in self.scenes:
+            self.submit(self.run_scene, scene)
+
+    def run(self):
+        """전체 씬 순차 개선 (현재 스레드)"""
+        self._begin()
+        if not self.scenes:
+            self._finish()
+        for scene in self.scenes:
+            self.run_scene(scene)
+
+    def _begin(self):
+        self.reports = []
+        self._remaining = len(self.scenes)
+        self.budget.start(len(self.scenes))
+        self.job_span = get_tracer().span('job.refine', stage='refine', session_id=self.session_id,
+                                          scene_count=len(self.scenes), threshold=self.budget.threshold)
+
+    def run_scene(self, scene):
+        scene_number = scene['scene_number']
+        try:
+            image_path = resolve_image_path(self.images.get(scene_number))
+            if image_path is None:
+                report = SceneRefiner.report(scene_number, None, [], STOP_NO_IMAGE, 0)
+            else:
+                output_path = os.path.join(self.temp_folder, f"scene_{scene_number}.png")
+                report = self.refiner.refine_scene(scene, image_path, output_path,
+                                                   should_cancel=lambda: self.cancelled,
+                                                   on_iteration=self.iteration_completed.emit,
+                                                   parent=self.job_span)
+                if report['best_iteration']:
+                    from conti import index_scene_image
+                    index_scene_image(report['image_path'], self.session_id, scene_number)
+        except Exception as e:
+            report = SceneRefiner.report(scene_number, None, [], None, 0)
+            report['error'] = str(e)
+        self.reports.append(report)
+        self.scene_refined.emit(scene_number, report)
+        self._on_scene_finished()
+
+    def cancel(self):
+        """대기 중인 씬 작업 취소 (실행되지 않은 씬도 완료로 계산해 job 구간을 종료)"""
+        cancelled = super().cancel()
+        if cancelled:
+            self._on_scene_finished(cancelled)
+        return cancelled
+
+    def _on_scene_finished(self, count=1):
+        with self._remaining_lock:
+            self._remaining -= count
+            is_last = self._remaining == 0
+        if is_last:
+            self._finish()
+
+    def _finish(self):
+        self.job_span.set_attributes(calls=self.budget.calls, elapsed=round(self.budget.elapsed, 2))
+        self.job_span.end()
+        self.refine_completed.emit(sorted(self.reports, key=lambda report: report['scene_number']))
+
+
+def summarize(reports, budget):
+    """개선 결과 요약"""
+    improved = [report for report in reports
+                if report.get('initial_score') is not None and report['best_score'] > report['initial_score']]
+    stop_reasons = {}
+    for report in reports:
+        stop_reasons[report['stop_reason']] = stop_reasons.get(report['stop_reason'], 0) + 1
+    return {
+        'scene_count': len(reports),
+        'improved_scenes': len(improved),
+        'passed_scenes': sum(1 for report in reports if report['best_score'] >= budget.threshold),
+        'api_calls': budget.calls,
+        'elapsed_seconds': round(budget.elapsed, 2),
+        'stop_reasons': stop_reasons,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='검증 점수 기반 씬 이미지 자동 개선 (GUI 없이 실행)')
+    parser.add_argument('storyboard', help="저장된 스토리보드 JSON (scenes, generated_images 포함)")
+    parser.add_argument('--output-dir', default=None, help='개선된 이미지/보고서 저장 폴더 (기본: <프로젝트>/refined)')
+    parser.add_argument('--threshold', type=float, default=None, help='목표 점수 (0~5)')
+    parser.add_argument('--max-iterations', type=int, default=None, help='씬별 최대 재생성 횟수')
+    parser.add_argument('--max-seconds', type=float, default=None, help='전체 시간 예산 (초, 0: 제한 없음)')
+    parser.add_argument('--max-calls', type=int, default=None, help='전체 API 호출 예산 (0: 제한 없음)')
+    parser.add_argument('--patience', type=int, default=None, help='점수 향상이 없을 때 허용하는 연속 반복 수')
+    parser.add_argument('--concurrency', type=int, default=4, help='동시에 개선할 씬 수')
+    args = parser.parse_args(argv)
+
+    with open(args.storyboard, 'r', encoding='utf-8') as f:
+        storyboard = json.load(f)
+    scenes = storyboard.get('scenes', [])
+    images = {int(number): path for number, path in storyboard.get('generated_images', {}).items()}
+    project_folder = storyboard.get('project_folder') or os.path.dirname(os.path.abspath(args.storyboard))
+    output_dir = args.output_dir or os.path.join(project_folder, 'refined')
+    os.makedirs(output_dir, exist_ok=True)
+
+    budget = RefineBudget.from_env()
+    for name in ('threshold', 'max_iterations', 'max_seconds', 'max_calls', 'patience'):
+        if getattr(args, name) is not None:
+            setattr(budget, name, getattr(args, name))
+
+    from common.validation_cache import cache_path_for
+    refiner = SceneRefiner(scenes, budget, os.path.join(output_dir, 'iterations'), cache_path_for(project_folder))
+
+    def refine(scene):
+        scene_number = scene['scene_number']
+        image_path = resolve_image_path(images.get(scene_number))
+        if image_path is None:
+            return SceneRefiner.report(scene_number, None, [], STOP_NO_IMAGE, 0)
+        report = refiner.refine_scene(
+            scene, image_path, os.path.join(output_dir, f"scene_{scene_number}.png"),
+            on_iteration=lambda number, iteration, score: print(f"Scene #{number} {iteration}회차: {score:.1f}"))
+        return report
+
+    budget.start(len(scenes))
+    with get_tracer().span('job.refine', stage='refine', scene_count=len(scenes), threshold=budget.threshold):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            # 하위 스레드에서도 현재 tracing 구간을 부모로 사용
+            futures = [pool.submit(contextvars.copy_context().run, refine, scene) for scene in scenes]
+            reports = [future.result() for future in futures]
+
+    summary = summarize(reports, budget)
+    report_path = os.path.join(output_dir, 'refine_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({'summary': summary, 'scenes': reports}, f, ensure_ascii=False, indent=2)
+
+    for report in reports:
+        print(f"Scene #{report['scene_number']}: {report['initial_score']} → {report['best_score']} "
+              f"({report['iterations']}회, {report['stop_reason']})")
+    print(json.dumps(summary, ensure_ascii=False))
+    print(f"보고서 저장: {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 import os
 import json
-import cv2
+import uuid
 from datetime import datetime
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTextEdit,
                              QPushButton, QLabel, QScrollArea, QFrame,
@@ -10,10 +10,19 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTextEdit,
                              QTableWidgetItem, QHeaderView)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QPixmap, QTextDocument
-from conti import ImageGenerationThread, ImageUpload, ImageRegenerationThread  # , ValidationTextGenerator
+from conti import (ImageGenerationThread, ImageUpload, ImageRegenerationThread, VideoGenerationThread,
+                   AnimaticExportThread, index_scene_image)  # , ValidationTextGenerator
 
 from common.gemini import Gemini
 from validator import StoryboardValidator
+from refine import (AutoRefineThread, RefineBudget, STOP_THRESHOLD, STOP_MAX_ITERATIONS, STOP_PLATEAU,
+                    STOP_TIME_BUDGET, STOP_CALL_BUDGET, STOP_CANCELLED, STOP_NO_IMAGE)
+from metrics_panel import toggle_metrics_panel
+from common.usage import get_ledger
+from common.profiling import get_profiler, profiled
+from common.schema import ImprovedPrompt
+from common.validation_cache import get_validation_cache, cache_path_for
+from common.image_store import IMAGE_EXTENSIONS, copy_image, remove_images
 
 
 class SceneEditWidget(QWidget):
@@ -212,9 +221,10 @@ class WordWrapDelegate(QStyledItemDelegate):
 class StoryboardDialog(QDialog):
     """스토리보드 결과를 표시하는 다이얼로그"""
 
-    def __init__(self, storyboard_data, parent=None):
+    def __init__(self, storyboard_data, parent=None, session_id=None):
         super().__init__(parent)
 
+        self.session_id = session_id or uuid.uuid4().hex[:12]
         self.is_generating = False
         self.loading_widget = None
         self.storyboard_data = storyboard_data
@@ -223,6 +233,12 @@ class StoryboardDialog(QDialog):
         self.generated_images = {}
         self.image_generation_thread = None
         self.regeneration_threads = {}
+        self.scene_alternatives = {}  # {씬 번호: best-of-N 후보 목록 (점수 순)}
+        self.selected_alternatives = {}  # {씬 번호: 현재 사용 중인 후보 순번}
+        self.generated_videos = {}  # {씬 번호 또는 'storyboard': 영상 경로}
+        self.video_generation_thread = None
+        self.animatic_thread = None
+        self.refine_thread = None
         self.status_label = None
         self.validator = StoryboardValidator(self)
 
@@ -289,6 +305,33 @@ class StoryboardDialog(QDialog):
         self.validate_button.setEnabled(False)
         title_section.addWidget(self.validate_button)
 
+        # 영상 생성 버튼 (이미지 생성 완료 후 활성화)
+        self.video_button = QPushButton('영상')
+        self.video_button.setStyleSheet(self.validate_button.styleSheet().replace('#003458', '#6a3d9a'))
+        self.video_button.clicked.connect(self.start_video_generation)
+        self.video_button.setEnabled(False)
+        title_section.addWidget(self.video_button)
+
+        # animatic 내보내기 버튼 (이미지 생성 완료 후 활성화)
+        self.animatic_button = QPushButton('애니매틱')
+        self.animatic_button.setStyleSheet(self.validate_button.styleSheet().replace('#003458', '#2e7d6b'))
+        self.animatic_button.clicked.connect(self.export_animatic)
+        self.animatic_button.setEnabled(False)
+        title_section.addWidget(self.animatic_button)
+
+        # 검증 점수 기반 자동 개선 버튼 (이미지 생성 완료 후 활성화)
+        self.refine_button = QPushButton('자동 개선')
+        self.refine_button.setStyleSheet(self.validate_button.styleSheet().replace('#003458', '#b5651d'))
+        self.refine_button.clicked.connect(self.start_auto_refine)
+        self.refine_button.setEnabled(False)
+        title_section.addWidget(self.refine_button)
+
+        # 성능 지표 패널 버튼
+        self.metrics_button = QPushButton('지표')
+        self.metrics_button.setStyleSheet(self.validate_button.styleSheet().replace('#003458', '#5f6b7a'))
+        self.metrics_button.clicked.connect(lambda: toggle_metrics_panel(self))
+        title_section.addWidget(self.metrics_button)
+
         main_layout.addLayout(title_section)
 
         # 구분선
@@ -675,26 +718,35 @@ class StoryboardDialog(QDialog):
         self.is_generating = True
         self.show_loading_state()
 
+        # 검증 단계의 자막 점검용 OCR 모델을 이미지 생성 중에 미리 로드
+        from common.ocr import get_caption_checker
+        get_caption_checker().warm_up()
+
         # 이미지 생성 스레드 시작
-        self.image_thread = ImageGenerationThread(self.edited_scenes)
-        self.image_thread.scene_completed.connect(self.on_scene_completed)
-        self.image_thread.generation_completed.connect(self.on_generation_completed)
-        self.image_thread.start()
+        self.scene_alternatives.clear()
+        self.selected_alternatives.clear()
+        cache_path = cache_path_for(self.current_project_folder, self.session_id)
+        self.image_generation_thread = ImageGenerationThread(self.edited_scenes, session_id=self.session_id,
+                                                             cache_path=cache_path)
+        self.image_generation_thread.scene_completed.connect(self.on_scene_completed)
+        self.image_generation_thread.near_duplicate.connect(self.on_near_duplicate)
+        self.image_generation_thread.candidates_ready.connect(self.on_candidates_ready)
+        self.image_generation_thread.generation_completed.connect(self.on_generation_completed)
+        self.image_generation_thread.start()
 
     def stop_image_generation(self):
         """이미지 생성 중단"""
         if hasattr(self, 'image_generation_thread') and self.image_generation_thread:
             if self.image_generation_thread.isRunning():
-                self.image_generation_thread.quit()
+                # 대기 중인 씬 작업은 취소하고 실행 중인 씬은 완료될 때까지 대기
+                self.image_generation_thread.cancel()
                 self.image_generation_thread.wait(3000)  # 3초 대기
 
-                if self.image_generation_thread.isRunning():
-                    self.image_generation_thread.terminate()
-                    self.image_generation_thread.wait()
-
         # 상태 초기화
         self.is_generating = False
         self.generated_images.clear()
+        self.scene_alternatives.clear()
+        self.selected_alternatives.clear()
 
         # 임시 파일 정리
         temp_folder = './temp'
@@ -711,8 +763,11 @@ class StoryboardDialog(QDialog):
         self.is_generating = False
         self.hide_loading_state()
 
-        # 검증 버튼 활성화
+        # 검증/영상 버튼 활성화
         self.validate_button.setEnabled(True)
+        self.video_button.setEnabled(True)
+        self.animatic_button.setEnabled(True)
+        self.refine_button.setEnabled(True)
 
         # 결과 표시
         self.display_final_results()
@@ -726,6 +781,7 @@ class StoryboardDialog(QDialog):
             if 'regenerate' in buttons:
                 buttons['regenerate'].setEnabled(enabled)
 
+    @profiled('display')
     def display_final_results(self):
         """최종 결과 표시"""
         for i in reversed(range(self.result_layout.count())):
@@ -780,6 +836,13 @@ class StoryboardDialog(QDialog):
                 lambda checked, scene_data=scene, sn=scene_number: self.regenerate_scene_image(scene_data, sn))
             title_button_layout.addWidget(regenerate_button)
 
+            # best-of-N 후보 교체 버튼 (추가 API 호출 없이 보관된 후보로 교체)
+            if len(self.scene_alternatives.get(scene_number, [])) > 1:
+                alternatives_button = QPushButton(f'후보 ({len(self.scene_alternatives[scene_number])})')
+                alternatives_button.setStyleSheet(self.get_button_style('#f0d9a8'))
+                alternatives_button.clicked.connect(lambda checked, sn=scene_number: self.show_alternatives(sn))
+                title_button_layout.addWidget(alternatives_button)
+
             scene_layout.addLayout(title_button_layout)
 
             # 이미지 위젯
@@ -800,6 +863,10 @@ class StoryboardDialog(QDialog):
             if file_path:
                 # 성공적으로 업로드된 경우
                 self.generated_images[scene_number] = file_path
+                self.clear_alternatives(scene_number)
+                duplicate_of = index_scene_image(file_path, self.session_id, scene_number, source='uploaded')
+                if duplicate_of is not None:
+                    message += f'\n\nScene #{duplicate_of} 이미지와 거의 같은 이미지입니다.'
                 QMessageBox.information(self, '업로드 성공', message)
 
                 # 화면 새로고침
@@ -833,6 +900,7 @@ class StoryboardDialog(QDialog):
 
             if regen_thread:
                 # 재생성 스레드 연결 및 시작
+                regen_thread.session_id = self.session_id
                 regen_thread.regeneration_completed.connect(
                     lambda sn, img_path, error: self.on_regeneration_completed(sn, img_path, error)
                 )
@@ -868,6 +936,7 @@ class StoryboardDialog(QDialog):
             self.status_label.setText(f'Scene #{scene_number} 이미지가 성공적으로 재생성되었습니다.')
             QMessageBox.information(self, '재생성 완료', f'Scene #{scene_number} 이미지가 성공적으로 재생성되었습니다.')
             self.generated_images[scene_number] = image_path
+            self.clear_alternatives(scene_number)
             # 화면 새로고침
             self.display_final_results()
 
@@ -932,6 +1001,73 @@ class StoryboardDialog(QDialog):
         total_scenes = len(self.edited_scenes)
         self.progress_label.setText(f'{self.completed_scenes} / {total_scenes}개 Scene Success!!!')
 
+    def on_candidates_ready(self, scene_number, candidates):
+        self.scene_alternatives[scene_number] = candidates
+        self.selected_alternatives[scene_number] = 0
+
+    def show_alternatives(self, scene_number):
+        """best-of-N 후보 이미지와 점수를 보여주고 선택한 후보로 씬 이미지 교체"""
+        candidates = self.scene_alternatives.get(scene_number, [])
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f'Scene #{scene_number} 후보 이미지')
+        layout = QHBoxLayout(dialog)
+
+        for i, candidate in enumerate(candidates):
+            column = QVBoxLayout()
+            image_label = QLabel()
+            image_label.setFixedSize(240, 240)
+            image_label.setAlignment(Qt.AlignCenter)
+            pixmap = QPixmap(candidate['image_path'])
+            if pixmap.isNull():
+                image_label.setText('이미지 없음')
+            else:
+                image_label.setPixmap(pixmap.scaled(230, 230, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            column.addWidget(image_label)
+
+            if candidate.get('rejected'):
+                score_text = f"품질 점검 제외: {candidate['rejected']}"
+            else:
+                score_text = f"점수 {candidate['score']:.1f} / 5.0"
+            score_label = QLabel(score_text)
+            score_label.setAlignment(Qt.AlignCenter)
+            score_label.setWordWrap(True)
+            column.addWidget(score_label)
+
+            select_button = QPushButton('사용 중' if self.selected_alternatives.get(scene_number) == i else '선택')
+            select_button.setEnabled(self.selected_alternatives.get(scene_number) != i)
+            select_button.setStyleSheet(self.get_button_style('#d8bfd8'))
+            select_button.clicked.connect(
+                lambda checked, index=i: (self.select_alternative(scene_number, index), dialog.accept()))
+            column.addWidget(select_button)
+            layout.addLayout(column)
+
+        dialog.exec_()
+
+    def select_alternative(self, scene_number, index):
+        """보관된 후보로 씬 이미지 교체"""
+        candidate = self.scene_alternatives[scene_number][index]
+        try:
+            # 후보의 저장 형식 그대로 씬 이미지 교체 (다른 확장자의 이전 이미지는 삭제)
+            image_path = copy_image(candidate['image_path'], os.path.join('./temp', f"scene_{scene_number}"))
+        except Exception as e:
+            QMessageBox.critical(self, '후보 교체 실패', f'후보 이미지로 교체할 수 없습니다:\n{str(e)}')
+            return
+        self.generated_images[scene_number] = image_path
+        self.selected_alternatives[scene_number] = index
+        index_scene_image(image_path, self.session_id, scene_number)
+        self.display_final_results()
+
+    def clear_alternatives(self, scene_number):
+        """업로드/재생성으로 씬 이미지가 바뀌면 이전 후보는 더 이상 교체 대상이 아님"""
+        self.scene_alternatives.pop(scene_number, None)
+        self.selected_alternatives.pop(scene_number, None)
+
+    def on_near_duplicate(self, scene_number, duplicate_of):
+        """다른 씬과 거의 같은 이미지가 생성된 경우 알림"""
+        self.status_label.setText(f'Scene #{scene_number} 이미지가 Scene #{duplicate_of}와 거의 같습니다. '
+                                  f'재생성을 권장합니다.')
+        self.status_label.show()
+
     def validate_storyboard(self):
         """스토리보드 검증 실행"""
         if not self.edited_scenes:
@@ -945,13 +1081,144 @@ class StoryboardDialog(QDialog):
             return
 
         # 이미지 파일 확인
-        image_files = [f for f in os.listdir(temp_folder) if f.startswith('scene_') and f.endswith('.png')]
+        image_files = [f for f in os.listdir(temp_folder)
+                       if f.startswith('scene_') and f.lower().endswith(IMAGE_EXTENSIONS)]
         if len(image_files) == 0:
             QMessageBox.warning(self, '검증 불가', '생성된 이미지가 없습니다. 먼저 이미지를 생성해주세요.')
             return
 
         self.validator.evaluate_storyboard(self.edited_scenes)
 
+    def start_video_generation(self):
+        """씬별 또는 스토리보드 전체 Veo 영상 생성 시작"""
+        if self.video_generation_thread and self.video_generation_thread.isRunning():
+            QMessageBox.information(self, '영상 생성', '영상 생성이 이미 진행 중입니다.')
+            return
+
+        modes = {'씬별 영상 (씬 이미지를 첫 프레임으로 사용)': VideoGenerationThread.MODE_SCENE,
+                 '스토리보드 전체 영상': VideoGenerationThread.MODE_STORYBOARD}
+        choice, ok = QInputDialog.getItem(self, '영상 생성', '생성 방식을 선택하세요:', list(modes), 0, False)
+        if not ok:
+            return
+
+        storyboard = dict(self.selected_storyboard or {}, scenes=self.edited_scenes)
+        self.video_generation_thread = VideoGenerationThread(self.edited_scenes, images=self.generated_images,
+                                                             session_id=self.session_id, mode=modes[choice],
+                                                             storyboard=storyboard)
+        self.video_generation_thread.clip_completed.connect(self.on_video_completed)
+        self.video_generation_thread.progress.connect(self.on_video_progress)
+        self.video_generation_thread.generation_completed.connect(self.on_video_generation_completed)
+        self.video_button.setEnabled(False)
+        self.status_label.setText('영상 생성 작업을 제출하고 있습니다...')
+        self.status_label.show()
+        self.video_generation_thread.start()
+
+    def on_video_progress(self, done, total):
+        self.status_label.setText(f'영상 생성 중... ({done} / {total}개 완료)')
+
+    def on_video_completed(self, key, video_path, error_message):
+        if error_message:
+            self.generated_videos[key] = {'error': error_message}
+        else:
+            self.generated_videos[key] = video_path
+
+    def on_video_generation_completed(self):
+        """모든 영상 생성 완료"""
+        self.video_button.setEnabled(True)
+        self.status_label.hide()
+        failed = {key: info['error'] for key, info in self.generated_videos.items() if isinstance(info, dict)}
+        succeeded = len(self.generated_videos) - len(failed)
+        message = f'영상 {succeeded}개가 생성되었습니다.\n저장 시 프로젝트 폴더의 videos 폴더로 이동됩니다.'
+        if failed:
+            message += '\n\n실패:\n' + '\n'.join(f'- {key}: {error}' for key, error in failed.items())
+        QMessageBox.information(self, '영상 생성 완료', message)
+
+    def export_animatic(self):
+        """씬 이미지와 씬 길이로 animatic 미리보기 영상 저장"""
+        from PyQt5.QtWidgets import QFileDialog
+        default_folder = self.current_project_folder or self.output_folder
+        file_path, _ = QFileDialog.getSaveFileName(self, 'animatic 저장', os.path.join(default_folder, 'animatic.mp4'),
+                                                   'MP4 영상 (*.mp4);;GIF 이미지 (*.gif)')
+        if not file_path:
+            return
+        if not file_path.lower().endswith(('.mp4', '.gif')):
+            file_path += '.mp4'
+
+        self.collect_edited_table_data()
+        self.animatic_thread = AnimaticExportThread(self.edited_scenes, self.generated_images, file_path,
+                                                    session_id=self.session_id)
+        self.animatic_thread.scene_progress.connect(
+            lambda scene_number, total: self.status_label.setText(f'animatic 생성 중... ({scene_number} / {total})'))
+        self.animatic_thread.export_completed.connect(self.on_animatic_exported)
+        self.animatic_button.setEnabled(False)
+        self.status_label.setText('animatic 생성 중...')
+        self.status_label.show()
+        self.animatic_thread.start()
+
+    def on_animatic_exported(self, file_path, error_message):
+        self.animatic_button.setEnabled(True)
+        self.status_label.hide()
+        if error_message:
+            QMessageBox.warning(self, 'animatic 저장 실패', f'animatic 생성 중 오류가 발생했습니다:\n{error_message}')
+        else:
+            QMessageBox.information(self, 'animatic 저장 완료', f'animatic이 저장되었습니다:\n{file_path}')
+
+    def start_auto_refine(self):
+        """목표 점수에 도달할 때까지 씬별 검증 → 프롬프트 개선 → 재생성을 자동 반복"""
+        if self.refine_thread and self.refine_thread.isRunning():
+            QMessageBox.information(self, '자동 개선', '자동 개선이 이미 진행 중입니다.')
+            return
+
+        budget = RefineBudget.from_env()
+        threshold, ok = QInputDialog.getDouble(self, '자동 개선', '목표 점수 (0~5):', budget.threshold, 0, 5, 1)
+        if not ok:
+            return
+        budget.threshold = threshold
+
+        cache_path = cache_path_for(self.current_project_folder, self.session_id)
+        self.refine_thread = AutoRefineThread(self.edited_scenes, dict(self.generated_images),
+                                              session_id=self.session_id, cache_path=cache_path, budget=budget)
+        self.refine_thread.iteration_completed.connect(self.on_refine_iteration)
+        self.refine_thread.scene_refined.connect(self.on_scene_refined)
+        self.refine_thread.refine_completed.connect(self.on_refine_completed)
+        self.refine_button.setEnabled(False)
+        self.validate_button.setEnabled(False)
+        self.status_label.setText(f'자동 개선 중... (목표 {threshold:.1f}점, 씬별 최대 {budget.max_iterations}회)')
+        self.status_label.show()
+        self.refine_thread.start()
+
+    def on_refine_iteration(self, scene_number, iteration, score):
+        label = '기존 이미지' if iteration == 0 else f'{iteration}회차'
+        self.status_label.setText(f'자동 개선 중... Scene #{scene_number} {label} 점수 {score:.1f}')
+
+    def on_scene_refined(self, scene_number, report):
+        if report.get('image_path'):
+            self.generated_images[scene_number] = report['image_path']
+            if report.get('best_iteration'):
+                self.clear_alternatives(scene_number)
+
+    def on_refine_completed(self, reports):
+        """자동 개선 완료 후 결과 요약"""
+        self.refine_thread = None
+        self.refine_button.setEnabled(True)
+        self.validate_button.setEnabled(True)
+        self.status_label.hide()
+        self.display_final_results()
+
+        reasons = {STOP_THRESHOLD: '목표 도달', STOP_MAX_ITERATIONS: '최대 반복', STOP_PLATEAU: '점수 정체',
+                   STOP_TIME_BUDGET: '시간 예산 소진', STOP_CALL_BUDGET: '호출 예산 소진', STOP_CANCELLED: '취소',
+                   STOP_NO_IMAGE: '이미지 없음'}
+        lines = []
+        for report in reports:
+            if report.get('error'):
+                lines.append(f"Scene #{report['scene_number']}: 실패 ({report['error']})")
+                continue
+            initial = report['initial_score']
+            initial_text = '-' if initial is None else f'{initial:.1f}'
+            lines.append(f"Scene #{report['scene_number']}: {initial_text} → {report['best_score']:.1f} "
+                         f"({report['iterations']}회, {reasons.get(report['stop_reason'], report['stop_reason'])})")
+        QMessageBox.information(self, '자동 개선 완료', '\n'.join(lines))
+
     def generate_improved_prompt(self, generate_image_prompt: str, evaluation_data: dict) -> str:
         """검증 결과 반영하여 프롬프트 개선"""
         prompt = f"""
@@ -962,8 +1229,8 @@ class StoryboardDialog(QDialog):
             위의 요구사항을 반영하여 더 나은 scene 이미지 생성을 위한 프롬프트를 텍스트로 출력해주세요.
           """
 
-        improved_prompt = self.gemini._call_gemini_text(prompt, self.model)
-        return improved_prompt
+        result = self.gemini._call_gemini_text(prompt, response_schema=ImprovedPrompt)
+        return result.improved_prompt
 
 
     def regenerate_scene_with_prompt(self, scene_number, improved_prompt):
@@ -993,6 +1260,7 @@ class StoryboardDialog(QDialog):
             regen_thread = ImageRegenerationThread(scene_data, scene_number, improved_prompt)
 
             if regen_thread:
+                regen_thread.session_id = self.session_id
                 regen_thread.regeneration_completed.connect(
                     lambda sn, img_path, error: self.on_regeneration_completed(sn, img_path, error)
                 )
@@ -1155,21 +1423,74 @@ class StoryboardDialog(QDialog):
             if not os.path.exists(images_folder):
                 os.makedirs(images_folder)
 
+            from common.image_index import get_image_index
+            index = get_image_index()
             image_paths = {}
             for scene_number, image_info in self.generated_images.items():
                 if isinstance(image_info, str) and os.path.exists(image_info):
-                    new_filename = f"scene_{scene_number}.png"
+                    # 저장 형식(확장자)은 그대로 유지
+                    new_filename = f"scene_{scene_number}{os.path.splitext(image_info)[1].lower()}"
                     new_path = os.path.join(images_folder, new_filename)
-                    import shutil
-                    shutil.move(image_info, new_path)  # 임시 파일 이동
+                    remove_images(os.path.splitext(new_path)[0], keep=image_info)
+                    if index is not None:
+                        # 다른 프로젝트에 같은 이미지가 있으면 하드링크로 저장
+                        index.store(image_info, new_path)
+                    else:
+                        import shutil
+                        shutil.move(image_info, new_path)  # 임시 파일 이동
                     image_paths[scene_number] = new_path
 
+            # best-of-N 후보 이미지 이동 (다시 열었을 때 교체 후보로 사용)
+            image_alternatives = {}
+            for scene_number, candidates in self.scene_alternatives.items():
+                saved = []
+                for candidate in candidates:
+                    if not os.path.exists(candidate['image_path']):
+                        continue
+                    candidates_folder = os.path.join(self.current_project_folder, 'candidates')
+                    os.makedirs(candidates_folder, exist_ok=True)
+                    new_path = os.path.join(candidates_folder, os.path.basename(candidate['image_path']))
+                    import shutil
+                    shutil.move(candidate['image_path'], new_path)
+                    candidate['image_path'] = new_path
+                    saved.append({'image_path': new_path, 'score': candidate['score']})
+                if saved:
+                    image_alternatives[scene_number] = saved
+
+            # 생성된 영상 이동
+            video_paths = {}
+            for key, video_info in self.generated_videos.items():
+                if isinstance(video_info, str) and os.path.exists(video_info):
+                    videos_folder = os.path.join(self.current_project_folder, 'videos')
+                    os.makedirs(videos_folder, exist_ok=True)
+                    new_path = os.path.join(videos_folder, os.path.basename(video_info))
+                    import shutil
+                    shutil.move(video_info, new_path)
+                    video_paths[key] = new_path
+                    self.generated_videos[key] = new_path
+
+            # 프로젝트 폴더 지정 전에 쌓인 검증 결과 캐시를 프로젝트에 합침 (다시 열어도 바뀐 씬만 재검증)
+            session_cache = get_validation_cache(cache_path_for(session_id=self.session_id))
+            if session_cache is not None and len(session_cache):
+                session_cache.save_as(cache_path_for(self.current_project_folder))
+
+            # 세션 토큰 사용량 (호출 단위 상세 내역은 별도 보고서로 저장)
+            token_usage = get_ledger().summary(self.session_id)
+            token_usage.pop('calls')
+            get_ledger().write_report(os.path.join(self.current_project_folder, 'token_usage.json'),
+                                      self.session_id)
+            # 프로파일링이 켜져 있던 경우 단계별 프로파일 저장
+            get_profiler().write(os.path.join(self.current_project_folder, 'profiles'), self.session_id)
+
             final_data = {
                 'title': self.selected_storyboard.get('title'),
                 'scenes': self.edited_scenes,
                 'generated_images': image_paths,  # 이동된 이미지 경로 저장
+                'generated_videos': video_paths,
+                'image_alternatives': image_alternatives,
                 'creation_date': str(datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-                'project_folder': self.current_project_folder
+                'project_folder': self.current_project_folder,
+                'token_usage': token_usage
             }
 
             with open(file_path, 'w', encoding='utf-8') as f:
@@ -1264,6 +1585,12 @@ class StoryboardDialog(QDialog):
 
         # 모든 스레드 정리
         self.stop_image_generation()
+        if self.video_generation_thread and self.video_generation_thread.isRunning():
+            # 서버의 operation은 취소되지 않으므로 상태 조회만 중단
+            self.video_generation_thread.cancel()
+        if self.refine_thread and self.refine_thread.isRunning():
+            # 진행 중인 반복이 끝나면 최고 점수 이미지를 남기고 중단
+            self.refine_thread.cancel()
 
         # 재생성 스레드들 정리
         for thread in self.regeneration_threads.values():
@@ -1271,8 +1598,19 @@ class StoryboardDialog(QDialog):
                 thread.quit()
                 thread.wait()
 
+        self.release_session_resources()
         event.accept()
 
+    def done(self, result):
+        """accept/reject로 닫힐 때도 세션 자원 정리"""
+        self.release_session_resources()
+        super().done(result)
+
+    def release_session_resources(self):
+        """세션 context cache 만료 처리"""
+        from common.context_cache import get_context_cache
+        get_context_cache().release(self.session_id)
+
 
 if __name__ == "__main__":
 
@@ -1,64 +1,178 @@
 import os
-import json
-import cv2
+import hashlib
 
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
                              QPushButton, QTableWidget, QTableWidgetItem,
                              QTextEdit, QGroupBox, QProgressBar, QMessageBox,
                              QHeaderView, QScrollArea, QWidget, QFrame)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QPixmap, QColor
 from common.gemini import Gemini
+from common.executor import BackgroundTask, PRIORITY_VALIDATION
+from common.tracing import get_tracer
+from common.profiling import profiled
+from common.schema import SceneDescription, ScoreResponse, SCORE_CRITERIA
+from common.image_store import find_scene_image
+from common.validation_cache import get_validation_cache, cache_path_for, cache_key
+from common.context_cache import get_context_cache, CachedContentError
 from google.genai.types import Part
 
 
-class ValidationThread(QThread):
-    """스토리보드 검증을 위한 스레드"""
+# 씬 비교 평가 루브릭 (세션 context cache에 함께 저장)
+SCORE_RUBRIC_PROMPT = """
+            **평가 지침**
+            다음 세 가지 기준에 따라 각각 0~5점(0: 전혀 유사하지 않음, 5: 매우 유사함)으로 평가하세요.
+            1. 메시지 전달력: 광고의 핵심 메시지가 스케치에서 명확하게 시각적으로 표현되어 있는가?
+            2. 창의성 및 독창성: 스케치가 기존 광고와 차별화되는 창의적 아이디어와 표현 방식을 보여주는가?
+            3. 브랜드/제품 적합성: 스케치가 브랜드의 정체성, 제품 특성, 타깃 소비자와 잘 부합하는가?
+            세 기준의 점수를 기반으로 전체 비교 총점을 산출하고 각 항목별로 간단한 평가 이유와 개선점을 작성하세요.\n\n
+            
+            **출력 형식**
+            아래의 JSON 형식으로 출력해주세요:
+
+            {
+                "메시지 전달력": {
+                    "점수": 0~5,
+                    "평가 이유": "설명",
+                    "개선점": "설명"
+                },
+                "창의성 및 독창성": {
+                    "점수": 0~5,
+                    "평가 이유": "설명",
+                    "개선점": "설명"
+                },
+                "브랜드/제품 적합성": {
+                    "점수": 0~5,
+                    "평가 이유": "설명",
+                    "개선점": "설명"
+                },
+                "총점": 0~15
+            }
+            """
+
+# 이미지 분석 프롬프트
+SCENE_DESCRIBE_PROMPT = """
+            입력받은 scene 이미지는 광고 영상 중 일부 장면에 대한 이미지입니다.
+            이미지를 보고 해당 scene에 해당하는 설명을 한 문장으로 작성해주세요.
+            부분적인 묘사보다는 핵심 스토리에 대해 작성해주세요.
+
+            출력 예시: {
+            "scene_description": "윤기가 흐르는 닭강정과 반숙란이 담긴 접시가 식욕을 자극하는 광고 영상의 한 장면입니다."
+            }
+            """
+
+# 평가 프롬프트/기준이 바뀌면 달라지는 루브릭 버전 (이전 기준으로 캐시된 검증 결과를 재사용하지 않음)
+RUBRIC_VERSION = hashlib.sha256(
+    (SCORE_RUBRIC_PROMPT + SCENE_DESCRIBE_PROMPT + '|'.join(SCORE_CRITERIA)).encode('utf-8')).hexdigest()[:12]
+
+
+class ValidationThread(BackgroundTask):
+    """스토리보드 검증 작업 (가장 낮은 우선순위)"""
     scene_validated = pyqtSignal(int, dict)  # scene_number, validation_result
+    regeneration_requested = pyqtSignal(int, dict, str)  # 품질 점검에서 걸러진 씬 즉시 재생성 요청
     validation_completed = pyqtSignal(list)  # all_results
     error_occurred = pyqtSignal(str)
+    priority = PRIORITY_VALIDATION
 
-    def __init__(self, scenes_data, temp_folder):
+    def __init__(self, scenes_data, temp_folder, cache_path=None):
         super().__init__()
         self.scenes_data = scenes_data
         self.temp_folder = temp_folder
         self.gemini = Gemini()
+        # 프로젝트별 검증 결과 캐시 (cache_path가 없으면 사용하지 않음)
+        self.cache = get_validation_cache(cache_path)
+
+    @property
+    def score_model(self):
+        """검증 결과 재사용 기준 (모델 + 루브릭 버전)"""
+        return f"{self.gemini.model}:{RUBRIC_VERSION}"
 
+    @profiled('validation')
     def run(self):
+        tracer = get_tracer()
         try:
             validation_results = []
 
-            for scene in self.scenes_data:
-                scene_number = scene['scene_number']
-                result = self.validate_scene(scene, scene_number)
-                validation_results.append(result)
-                self.scene_validated.emit(scene_number, result)
+            with tracer.span('job.validation', stage='validation', session_id=self.session_id,
+                             scene_count=len(self.scenes_data)):
+                # 빈/흐린/중복 이미지는 로컬 품질 점검에서 걸러 Gemini 호출을 생략
+                with tracer.span('stage.quality', stage='quality'):
+                    quality = self.check_quality()
+                rejected = {number for number, report in quality.items() if not report['passed']}
+
+                # 씬 간 색감/구도 일관성 (전체 씬을 한 번에 비교해 동떨어진 씬 표시)
+                with tracer.span('stage.consistency', stage='consistency'):
+                    consistency = self.check_consistency(exclude=rejected)
+
+                # 통과한 씬 이미지 자막을 로컬 OCR로 한 번에 점검
+                with tracer.span('stage.caption', stage='caption'):
+                    captions = self.check_captions(exclude=rejected)
+
+                for scene in self.scenes_data:
+                    scene_number = scene['scene_number']
+                    with tracer.span('scene.validate', scene_number=scene_number) as span:
+                        if scene_number in rejected:
+                            result = self.quality_rejected_result(scene, quality[scene_number])
+                            span.set_attribute('quality_rejected', True)
+                        else:
+                            result = self.validate_scene(scene, scene_number)
+                            self.apply_caption_check(result, captions.get(scene_number))
+                        if scene_number in consistency:
+                            result['consistency'] = consistency[scene_number]
+                        span.set_attribute('total_score', result.get('total_score', 0))
+                    validation_results.append(result)
+                    self.scene_validated.emit(scene_number, result)
 
             self.validation_completed.emit(validation_results)
 
         except Exception as e:
             self.error_occurred.emit(str(e))
 
-    def validate_scene(self, scene_data, scene_number):
-        """개별 씬 검증"""
+    def scene_image_path(self, scene_number):
+        """임시 폴더의 씬 이미지 경로 (저장 형식에 따라 png/jpg/webp, 없으면 png 경로)"""
+        return find_scene_image(self.temp_folder, scene_number) or \
+            os.path.join(self.temp_folder, f"scene_{scene_number}.png")
+
+    def validate_scene(self, scene_data, scene_number, image_path=None):
+        """개별 씬 검증 (image_path가 없으면 임시 폴더의 씬 이미지)"""
         try:
             # 이미지 파일 경로 찾기
-            image_path = os.path.join(self.temp_folder, f"scene_{scene_number}.png")
+            image_path = image_path or self.scene_image_path(scene_number)
 
             if not os.path.exists(image_path):
                 raise FileNotFoundError(f"이미지 파일을 찾을 수 없습니다: {image_path}")
 
+            tracer = get_tracer()
+
+            # 이미지와 씬 내용이 모두 그대로인 씬은 프로젝트 캐시의 이전 결과를 사용
+            cached, result_key = self.find_cached_result(image_path, scene_data, scene_number)
+            if cached is not None:
+                return cached
+
+            # 동일/거의 같은 이미지를 같은 씬 내용으로 검증한 결과가 있으면 재사용
+            indexed, fingerprint = self.find_indexed_score(image_path, scene_data, scene_number)
+            if indexed is not None:
+                self.cache_result(result_key, indexed)
+                return indexed
+
             # 1단계: 이미지에서 실제 장면 설명 추출
-            predicted_description = self.extract_scene_description(image_path)
+            with tracer.span('stage.describe', stage='describe'):
+                predicted_description = self.extract_scene_description(image_path)
 
             # 2단계: 원본 설명과 추출된 설명 비교 평가
-            validation_result = self.compare_descriptions(scene_data, predicted_description, scene_number)
+            with tracer.span('stage.score', stage='score'):
+                validation_result = self.compare_descriptions(scene_data, predicted_description, scene_number)
 
+            # 이미지 분석/비교에 실패한 결과는 재사용하지 않음
+            if 'error' not in validation_result and not predicted_description.startswith('이미지 분석 실패'):
+                self.cache_result(result_key, validation_result)
+                self.index_score(fingerprint, scene_data, validation_result)
             return validation_result
 
         except Exception as e:
             return {
                 'scene_number': scene_number,
+                'error': str(e),
                 'total_score': 0,
                 'scores': {'메시지 전달력': 0, '창의성 및 독창성': 0, '브랜드/제품 적합성': 0},
                 'reasons': {'메시지 전달력': f'오류: {str(e)}',
@@ -69,204 +183,226 @@ class ValidationThread(QThread):
                 'predicted_description': '추출 실패'
             }
 
-    def extract_scene_description(self, image_path):
-        """이미지에서 실제 장면 설명 추출"""
+    def check_quality(self):
+        """로컬 이미지 품질 점검 → {씬 번호: 점검 결과}"""
+        from common.quality import get_quality_gate
         try:
-            # OpenCV로 이미지 읽기
-            image = cv2.imread(image_path)
-            success, encoded_image = cv2.imencode('.png', image)
-            img_bytes = encoded_image.tobytes()
-
-            # 이미지 분석 프롬프트
-            prompt = """
-            입력받은 scene 이미지는 광고 영상 중 일부 장면에 대한 이미지입니다.
-            이미지를 보고 해당 scene에 해당하는 설명을 한 문장으로 작성해주세요.
-            부분적인 묘사보다는 핵심 스토리에 대해 작성해주세요.
+            items = [(scene['scene_number'], self.scene_image_path(scene['scene_number']))
+                     for scene in self.scenes_data]
+            return get_quality_gate().check(items)
+        except Exception as e:
+            print(f"품질 점검 실패: {e}")
+            return {}
 
-            출력 예시: {
-            "scene_description": "윤기가 흐르는 닭강정과 반숙란이 담긴 접시가 식욕을 자극하는 광고 영상의 한 장면입니다."
-            }
+    def check_consistency(self, exclude=()):
+        """씬×씬 유사도 기반 일관성 점검 → {씬 번호: 점검 결과}"""
+        from common.quality import check_consistency
+        try:
+            items = [(scene['scene_number'], self.scene_image_path(scene['scene_number']))
+                     for scene in self.scenes_data if scene['scene_number'] not in exclude]
+            return check_consistency(items)
+        except Exception as e:
+            print(f"일관성 점검 실패: {e}")
+            return {}
+
+    def quality_rejected_result(self, scene_data, report):
+        """품질 점검에서 걸러진 씬의 검증 결과 (설정 시 바로 재생성 요청)"""
+        from common.quality import QualityGate, get_quality_gate
+        scene_number = scene_data['scene_number']
+        reason = f"품질 점검 실패: {QualityGate.describe(report)}"
+        regeneration_prompt = f"""
+            원본 설명: {scene_data.get('description', '')}
+
+            개선사항:
+            {reason} - 장면 내용이 선명하고 다른 씬과 구별되도록 다시 생성해주세요.
             """
+        if get_quality_gate().auto_regenerate:
+            self.regeneration_requested.emit(scene_number, scene_data, regeneration_prompt)
+
+        return {
+            'scene_number': scene_number,
+            'total_score': 0,
+            'scores': {key: 0 for key in SCORE_CRITERIA},
+            'reasons': {key: reason for key in SCORE_CRITERIA},
+            'improvements': reason,
+            'regeneration_prompt': regeneration_prompt,
+            'predicted_description': '품질 점검에서 제외되어 분석하지 않음',
+            'quality_check': report,
+        }
+
+    def check_captions(self, exclude=()):
+        """씬 자막(text)이 이미지에 제대로 렌더링되었는지 점검 → {씬 번호: 점검 결과}"""
+        from common.ocr import get_caption_checker
+        try:
+            items = [(scene['scene_number'], self.scene_image_path(scene['scene_number']),
+                      scene.get('text', '')) for scene in self.scenes_data if scene['scene_number'] not in exclude]
+            return get_caption_checker().check(items)
+        except Exception as e:
+            print(f"자막 점검 실패: {e}")
+            return {}
+
+    @staticmethod
+    def apply_caption_check(result, caption):
+        """자막 점검 결과를 검증 결과에 반영 (불일치 시 개선사항/재생성 프롬프트에 추가)"""
+        if caption is None:
+            return
+        result['caption_check'] = caption
+        if caption['passed']:
+            return
+        issue = f"자막 불일치: '{caption['expected']}' (인식: '{caption['detected'] or '없음'}')"
+        result['improvements'] = f"{issue} | {result['improvements']}"
+        if result.get('regeneration_prompt'):
+            result['regeneration_prompt'] += f"\n            자막 '{caption['expected']}'이 이미지에 정확히 표기되도록 해주세요.\n"
+
+    def find_cached_result(self, image_path, scene_data, scene_number):
+        """프로젝트 캐시에서 (이미지 해시, 씬 해시, 루브릭 버전, 모델)이 같은 검증 결과 조회 → (결과 또는 None, 캐시 키)"""
+        if self.cache is None:
+            return None, None
+        from common.image_index import file_sha256, scene_hash
+        with get_tracer().span('stage.cache_lookup', cache='validation') as span:
+            key = cache_key(file_sha256(image_path), scene_hash(scene_data), RUBRIC_VERSION, self.gemini.model)
+            result = self.cache.get(key)
+            span.set_attribute('cache_hit', result is not None)
+        if result is not None:
+            result.update(scene_number=scene_number, cached=True)
+        return result, key
+
+    def cache_result(self, key, result):
+        """검증 결과를 프로젝트 캐시에 저장"""
+        if self.cache is None or key is None:
+            return
+        try:
+            stored = {name: value for name, value in result.items()
+                      if name not in ('caption_check', 'consistency', 'cached', 'reused', 'reused_distance')}
+            self.cache.put(key, stored)
+        except Exception as e:
+            print(f"검증 결과 캐시 저장 실패: {e}")
+
+    def find_indexed_score(self, image_path, scene_data, scene_number):
+        """이미지 색인에서 재사용 가능한 검증 결과 조회 → (결과 또는 None, 이미지 지문)"""
+        from common.image_index import get_image_index, ImageFingerprint, scene_hash
+        index = get_image_index()
+        if index is None:
+            return None, None
+        with get_tracer().span('stage.index_lookup', cache='validation_index') as span:
+            fingerprint = ImageFingerprint.of(image_path)
+            result, distance = index.find_score(fingerprint, scene_hash(scene_data), self.score_model)
+            span.set_attribute('cache_hit', result is not None)
+        if result is not None:
+            result.update(scene_number=scene_number, reused=True, reused_distance=distance)
+        return result, fingerprint
+
+    def index_score(self, fingerprint, scene_data, result):
+        """검증 결과를 이미지 색인에 저장 (다른 프로젝트의 동일/유사 이미지 검증 시 재사용)"""
+        from common.image_index import get_image_index, scene_hash
+        index = get_image_index()
+        if index is None or fingerprint is None:
+            return
+        try:
+            stored = {key: value for key, value in result.items() if key not in ('caption_check', 'consistency')}
+            index.put_score(fingerprint, scene_hash(scene_data), self.score_model, stored)
+        except Exception as e:
+            print(f"검증 결과 색인 저장 실패: {e}")
 
-            contents = [prompt, Part.from_bytes(data=img_bytes, mime_type="image/png")]
-            response = self.gemini._call_gemini_multimodal(contents)
+    def extract_scene_description(self, image_path):
+        """이미지에서 실제 장면 설명 추출"""
+        try:
+            # 업로드 설정(긴 변 축소 + JPEG/WebP 재압축)으로 인코딩, 같은 이미지는 캐시된 바이트 재사용
+            from common.upload_profile import get_upload_profile
+            img_bytes, mime_type = get_upload_profile().encode(image_path)
 
-            # JSON 파싱
-            try:
-                result = json.loads(response)
-                return result.get("scene_description", "설명 추출 실패")
-            except json.JSONDecodeError:
-                # JSON 파싱 실패 시 텍스트에서 추출 시도
-                return response.text.strip()
+            contents = [SCENE_DESCRIBE_PROMPT, Part.from_bytes(data=img_bytes, mime_type=mime_type)]
+            result = self.gemini._call_gemini_multimodal(contents, response_schema=SceneDescription)
+            return result.scene_description
 
         except Exception as e:
             return f"이미지 분석 실패: {str(e)}"
 
+    def get_score_cache(self):
+        """평가 루브릭 + 스토리보드를 담은 세션 context cache 이름 (없으면 None)"""
+        storyboard = "\n".join(f"Scene {scene.get('scene_number')}: {scene.get('description', '')}"
+                               for scene in self.scenes_data)
+        text = (f"아래는 광고 스토리보드의 scene별 description입니다.\n{storyboard}\n\n"
+                f"각 scene 이미지 검증 시 다음 지침으로 평가합니다.\n{SCORE_RUBRIC_PROMPT}")
+        return get_context_cache().get(self.gemini, self.session_id, 'validation_rubric', text)
+
     def compare_descriptions(self, scene_data, predicted_description, scene_number):
         """원본 설명과 추출된 설명 비교"""
         try:
             # 원본 설명
             original_description = scene_data.get('description', '')
 
-            score_prompt = f"""
+            scene_prompt = f"""
             다음 동일 광고 scene에 대한 description에 대해 비교하려고 합니다.
             - 원본 설명: {original_description}
             - 검증용 설명: {predicted_description}\n\n
-            
-            **평가 지침**
-            다음 세 가지 기준에 따라 각각 0~5점(0: 전혀 유사하지 않음, 5: 매우 유사함)으로 평가하세요.
-            1. 메시지 전달력: 광고의 핵심 메시지가 스케치에서 명확하게 시각적으로 표현되어 있는가?
-            2. 창의성 및 독창성: 스케치가 기존 광고와 차별화되는 창의적 아이디어와 표현 방식을 보여주는가?
-            3. 브랜드/제품 적합성: 스케치가 브랜드의 정체성, 제품 특성, 타깃 소비자와 잘 부합하는가?
-            세 기준의 점수를 기반으로 전체 비교 총점을 산출하고 각 항목별로 간단한 평가 이유와 개선점을 작성하세요.\n\n
-            
-            **출력 형식**
-            아래의 JSON 형식으로 출력해주세요:
-
-            {{
-                "메시지 전달력": {{
-                    "점수": 0~5,
-                    "평가 이유": "설명",
-                    "개선점": "설명"
-                }},
-                "창의성 및 독창성": {{
-                    "점수": 0~5,
-                    "평가 이유": "설명",
-                    "개선점": "설명"
-                }},
-                "브랜드/제품 적합성": {{
-                    "점수": 0~5,
-                    "평가 이유": "설명",
-                    "개선점": "설명"
-                }},
-                "총점": 0~15
-            }}
             """
 
-            response = self.gemini._call_gemini_text(score_prompt)
+            # 세션 context cache(루브릭 + 스토리보드)가 있으면 루브릭을 다시 보내지 않음
+            cached_content = self.get_score_cache()
+            if cached_content:
+                score_prompt = scene_prompt + "앞서 제공된 평가 지침과 출력 형식에 따라 평가해주세요."
+            else:
+                score_prompt = scene_prompt + SCORE_RUBRIC_PROMPT
 
-            # JSON 파싱
+            # response_schema로 구조가 보장되며, 형식이 맞지 않으면 예외로 처리
             try:
-                result = json.loads(response)
-
-                # UI 표시를 위한 형식으로 변환
-                scores = {
-                    '메시지 전달력': result.get('메시지 전달력', {}).get('점수', 0),
-                    '창의성 및 독창성': result.get('창의성 및 독창성', {}).get('점수', 0),
-                    '브랜드/제품 적합성': result.get('브랜드/제품 적합성', {}).get('점수', 0)
-                }
-
-                reasons = {
-                    '메시지 전달력': result.get('메시지 전달력', {}).get('평가 이유', ''),
-                    '창의성 및 독창성': result.get('창의성 및 독창성', {}).get('평가 이유', ''),
-                    '브랜드/제품 적합성': result.get('브랜드/제품 적합성', {}).get('평가 이유', '')
-                }
-
-                improvements = []
-                for key in ['메시지 전달력', '창의성 및 독창성', '브랜드/제품 적합성']:
-                    improvement = result.get(key, {}).get('개선점', '')
-                    if improvement:
-                        improvements.append(f"{key}: {improvement}")
-
-                improvements_text = " | ".join(improvements) if improvements else "개선사항 없음"
-
-                # 총점 계산
-                total_score = sum(scores.values()) / len(scores) if scores else 0
-
-                # 재생성 프롬프트 생성
-                regeneration_prompt = f"""
-                원본 설명: {original_description}
-                추출된 설명: {predicted_description}
-
-                개선사항:
-                {improvements_text}
-
-                위 개선사항을 반영하여 더 나은 이미지를 생성해주세요.
-                """
-
-                return {
-                    'scene_number': scene_number,
-                    'total_score': round(total_score, 1),
-                    'scores': scores,
-                    'reasons': reasons,
-                    'improvements': improvements_text,
-                    'regeneration_prompt': regeneration_prompt,
-                    'predicted_description': predicted_description
-                }
-
-            except json.JSONDecodeError:
-                # JSON 파싱 실패 시 텍스트에서 추출 시도
-                return self.parse_text_response(response, scene_number, predicted_description)
+                result = self.gemini._call_gemini_text(score_prompt, response_schema=ScoreResponse,
+                                                       cached_content=cached_content)
+            except CachedContentError as e:
+                # 캐시가 만료/삭제된 경우 항목을 버리고 루브릭을 직접 담아 다시 요청
+                print(f"context cache 사용 실패, 전체 프롬프트로 재요청: {e}")
+                get_context_cache().invalidate(self.session_id, 'validation_rubric', cached_content)
+                result = self.gemini._call_gemini_text(scene_prompt + SCORE_RUBRIC_PROMPT,
+                                                       response_schema=ScoreResponse)
+            criteria = result.criteria()
+
+            # UI 표시를 위한 형식으로 변환
+            scores = {key: criteria[key].score for key in SCORE_CRITERIA}
+            reasons = {key: criteria[key].reason for key in SCORE_CRITERIA}
+
+            improvements = []
+            for key in SCORE_CRITERIA:
+                improvement = criteria[key].improvement
+                if improvement:
+                    improvements.append(f"{key}: {improvement}")
+
+            improvements_text = " | ".join(improvements) if improvements else "개선사항 없음"
+
+            # 총점 계산
+            total_score = sum(scores.values()) / len(scores) if scores else 0
 
-        except Exception as e:
-            return {
-                'scene_number': scene_number,
-                'total_score': 0,
-                'scores': {'메시지 전달력': 0, '창의성 및 독창성': 0, '브랜드/제품 적합성': 0},
-                'reasons': {'메시지 전달력': f'비교 분석 실패: {str(e)}',
-                            '창의성 및 독창성': f'비교 분석 실패: {str(e)}',
-                            '브랜드/제품 적합성': f'비교 분석 실패: {str(e)}'},
-                'improvements': f'검증 중 오류가 발생했습니다: {str(e)}',
-                'regeneration_prompt': '',
-                'predicted_description': predicted_description
-            }
+            # 재생성 프롬프트 생성
+            regeneration_prompt = f"""
+            원본 설명: {original_description}
+            추출된 설명: {predicted_description}
 
-    def parse_text_response(self, response_text, scene_number, predicted_description):
-        """텍스트 응답에서 점수 추출 시도"""
-        try:
-            # 기본값 설정
-            scores = {'메시지 전달력': 0, '창의성 및 독창성': 0, '브랜드/제품 적합성': 0}
-            reasons = {'메시지 전달력': '파싱 실패', '창의성 및 독창성': '파싱 실패', '브랜드/제품 적합성': '파싱 실패'}
-
-            # 간단한 점수 추출 시도
-            lines = response_text.split('\n')
-            for line in lines:
-                if '메시지 전달력' in line and any(char.isdigit() for char in line):
-                    try:
-                        digits = ''.join(filter(str.isdigit, line))
-                        if digits:
-                            score = int(digits[0])  # 첫 번째 숫자만 사용
-                            scores['메시지 전달력'] = min(score, 5)
-                    except (ValueError, IndexError):
-                        pass
-                elif '창의성' in line and any(char.isdigit() for char in line):
-                    try:
-                        digits = ''.join(filter(str.isdigit, line))
-                        if digits:
-                            score = int(digits[0])  # 첫 번째 숫자만 사용
-                            scores['창의성 및 독창성'] = min(score, 5)
-                    except (ValueError, IndexError):
-                        pass
-                elif '브랜드' in line and any(char.isdigit() for char in line):
-                    try:
-                        digits = ''.join(filter(str.isdigit, line))
-                        if digits:
-                            score = int(digits[0])  # 첫 번째 숫자만 사용
-                            scores['브랜드/제품 적합성'] = min(score, 5)
-                    except (ValueError, IndexError):
-                        pass
+            개선사항:
+            {improvements_text}
 
-            total_score = sum(scores.values()) / len(scores) if scores else 0
+            위 개선사항을 반영하여 더 나은 이미지를 생성해주세요.
+            """
 
             return {
                 'scene_number': scene_number,
                 'total_score': round(total_score, 1),
                 'scores': scores,
                 'reasons': reasons,
-                'improvements': '텍스트 파싱으로 추출된 결과입니다.',
-                'regeneration_prompt': f'Scene {scene_number}을 개선해주세요.',
+                'improvements': improvements_text,
+                'regeneration_prompt': regeneration_prompt,
                 'predicted_description': predicted_description
             }
 
         except Exception as e:
             return {
                 'scene_number': scene_number,
+                'error': str(e),
                 'total_score': 0,
                 'scores': {'메시지 전달력': 0, '창의성 및 독창성': 0, '브랜드/제품 적합성': 0},
-                'reasons': {'메시지 전달력': f'파싱 실패: {str(e)}',
-                            '창의성 및 독창성': f'파싱 실패: {str(e)}',
-                            '브랜드/제품 적합성': f'파싱 실패: {str(e)}'},
-                'improvements': f'파싱 중 오류가 발생했습니다: {str(e)}',
+                'reasons': {'메시지 전달력': f'비교 분석 실패: {str(e)}',
+                            '창의성 및 독창성': f'비교 분석 실패: {str(e)}',
+                            '브랜드/제품 적합성': f'비교 분석 실패: {str(e)}'},
+                'improvements': f'검증 중 오류가 발생했습니다: {str(e)}',
                 'regeneration_prompt': '',
                 'predicted_description': predicted_description
             }
@@ -304,6 +440,9 @@ class ValidationResultDialog(QDialog):
         # 상세 결과 테이블
         self.create_detail_table(layout)
 
+        # 씬 간 일관성 (스타일이 동떨어진 씬)
+        self.create_consistency_section(layout)
+
         # 개선사항 및 재생성 섹션
         self.create_improvement_section(layout)
 
@@ -442,6 +581,10 @@ class ValidationResultDialog(QDialog):
                 total_item.setBackground(QColor(255, 255, 224))  # 연한 노란색
             else:
                 total_item.setBackground(QColor(255, 192, 203))  # 연한 빨간색
+            if result.get('reused'):
+                total_item.setToolTip('동일/유사 이미지의 이전 검증 결과를 재사용했습니다.')
+            elif result.get('cached'):
+                total_item.setToolTip('이미지와 씬 내용이 바뀌지 않아 이전 검증 결과를 사용했습니다.')
             self.detail_table.setItem(row, 4, total_item)
 
             # 추출된 설명
@@ -451,9 +594,12 @@ class ValidationResultDialog(QDialog):
             predicted_item.setToolTip(predicted_desc)  # 전체 텍스트는 툴팁으로
             self.detail_table.setItem(row, 5, predicted_item)
 
-            # 주요 이슈 (가장 낮은 점수의 이유)
+            # 주요 이슈 (자막 불일치 우선, 없으면 가장 낮은 점수의 이유)
             reasons = result['reasons']
-            if scores:
+            caption = result.get('caption_check')
+            if caption and not caption['passed']:
+                main_issue = f"자막 불일치: '{caption['expected']}' → '{caption['detected'] or '인식 안 됨'}'"
+            elif scores:
                 min_score_key = min(scores.keys(), key=lambda k: scores[k])
                 main_issue = f"{min_score_key}: {reasons.get(min_score_key, '')}"
             else:
@@ -478,6 +624,35 @@ class ValidationResultDialog(QDialog):
                 no_regen_label.setStyleSheet("color: #28a745; font-weight: bold;")
                 self.detail_table.setCellWidget(row, 7, no_regen_label)
 
+    def create_consistency_section(self, layout):
+        """다른 씬과 색감/구도가 크게 다른 씬을 재생성 후보로 표시"""
+        outliers = [result for result in self.validation_results
+                    if result.get('consistency', {}).get('outlier')]
+        if not outliers:
+            return
+
+        consistency_group = QGroupBox('씬 간 일관성')
+        consistency_layout = QVBoxLayout()
+        for result in outliers:
+            consistency = result['consistency']
+            row_layout = QHBoxLayout()
+            label = QLabel(f"Scene #{result['scene_number']}: 다른 씬과의 평균 유사도 "
+                           f"{consistency['mean_similarity']:.2f} (가장 다른 씬: #{consistency['most_different']})")
+            label.setWordWrap(True)
+            row_layout.addWidget(label)
+
+            prompt = (result.get('regeneration_prompt') or '') + \
+                "\n            스토리보드의 다른 씬과 색감, 화풍, 인물 표현이 일관되도록 생성해주세요.\n"
+            regen_button = QPushButton('재생성')
+            regen_button.setStyleSheet(self.get_button_style('#e67e22'))
+            regen_button.clicked.connect(
+                lambda checked, sn=result['scene_number'], p=prompt: self.regenerate_scene(sn, p))
+            row_layout.addWidget(regen_button)
+            consistency_layout.addLayout(row_layout)
+
+        consistency_group.setLayout(consistency_layout)
+        layout.addWidget(consistency_group)
+
     def create_improvement_section(self, layout):
         """개선사항 섹션"""
         improvement_group = QGroupBox('개선사항 및 권장사항')
@@ -628,7 +803,10 @@ class StoryboardValidator:
             validation_dialog.show()
 
             # 검증 스레드 시작
-            self.validation_thread = ValidationThread(scenes_data, self.temp_folder)
+            session_id = getattr(self.parent_dialog, 'session_id', None)
+            cache_path = cache_path_for(getattr(self.parent_dialog, 'current_project_folder', None), session_id)
+            self.validation_thread = ValidationThread(scenes_data, self.temp_folder, cache_path=cache_path)
+            self.validation_thread.session_id = session_id
 
             def on_scene_validated(scene_number, result):
                 progress_bar.setValue(progress_bar.value() + 1)
@@ -647,10 +825,9 @@ class StoryboardValidator:
                 self.validation_thread = None
 
             self.validation_thread.scene_validated.connect(on_scene_validated)
+            self.validation_thread.regeneration_requested.connect(self.handle_regeneration_request)
             self.validation_thread.validation_completed.connect(on_validation_completed)
             self.validation_thread.error_occurred.connect(on_error)
-            self.validation_thread.finished.connect(self.validation_thread.quit)
-            self.validation_thread.finished.connect(self.validation_thread.deleteLater)
 
             self.validation_thread.start()
 